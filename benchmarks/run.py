@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""Benchmarks of the recipe and SPEC file handling.
+
+The recipes and the SPEC files are generated,
+so that the results depend only on the code and the machine.
+"""
+
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import click
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                        os.pardir))
+sys.path.insert(0, ROOT_DIR)
+
+import rpmlb  # noqa: E402
+from rpmlb.builder.base import BaseBuilder  # noqa: E402
+from rpmlb.recipe import Recipe  # noqa: E402
+from rpmlb.work import Work  # noqa: E402
+
+#: Name of the benchmarked collection in the generated recipes
+COLLECTION_ID = 'bench'
+
+#: Number of the other collections in the generated recipes
+OTHER_COLLECTIONS = 3
+
+#: Every n-th package has a bootstrap stage built again at the end
+BOOTSTRAP_INTERVAL = 20
+
+#: Number of the macro definitions in the SPEC files per size
+SPEC_MACROS = {'small': 20, 'large': 20000}
+
+#: Number of the packages built by the dummy run of the startup benchmark
+STARTUP_PACKAGES = 3
+
+
+def write_recipe(file_path, size):
+    """Write a recipe with the benchmarked and other collections."""
+
+    with open(file_path, 'w') as recipe_file:
+        for collection in [COLLECTION_ID] + [
+                'other{0}'.format(number)
+                for number in range(OTHER_COLLECTIONS)]:
+            print('{0}:'.format(collection), file=recipe_file)
+            print('  name: {0}'.format(collection), file=recipe_file)
+            print('  requires: []', file=recipe_file)
+            print('  packages:', file=recipe_file)
+            bootstrapped = []
+            for number in range(size):
+                name = 'pkg-{0}'.format(number)
+                if number % BOOTSTRAP_INTERVAL:
+                    print('    - {0}'.format(name), file=recipe_file)
+                    continue
+                bootstrapped.append(name)
+                print('    - {0}:'.format(name), file=recipe_file)
+                print('        replaced_macros:', file=recipe_file)
+                print('          need_bootstrap: 1', file=recipe_file)
+                print('        macros:', file=recipe_file)
+                print('          _with_bootstrap: 1', file=recipe_file)
+            for name in bootstrapped:
+                print('    - {0}'.format(name), file=recipe_file)
+
+
+def write_spec(file_path, size):
+    """Write a SPEC file with macro definitions and a long changelog."""
+
+    with open(file_path, 'w') as spec_file:
+        for number in range(SPEC_MACROS[size]):
+            print('%global macro_{0} value {0}'.format(number),
+                  file=spec_file)
+            if number % 10 == 0:
+                print('%global multi_{0} first \\'.format(number),
+                      file=spec_file)
+                print('    second line', file=spec_file)
+        print('%global need_bootstrap 0', file=spec_file)
+        print('Name: bench', file=spec_file)
+        print('Version: 1.0', file=spec_file)
+        print('Release: 1%{?dist}', file=spec_file)
+        for number in range(SPEC_MACROS[size]):
+            print('BuildRequires: pkg-{0} >= 1.0'.format(number),
+                  file=spec_file)
+        print('%changelog', file=spec_file)
+        for number in range(SPEC_MACROS[size] * 2):
+            print('- Entry {0} of the changelog'.format(number),
+                  file=spec_file)
+
+
+def measure(function, setup=None, repeat=5):
+    """Measure the function.
+
+    Keyword arguments:
+        function: Called with the result of setup.
+        setup: Called before each run, not measured.
+        repeat: Number of the runs.
+
+    Returns:
+        Dictionary of the minimal and median time in seconds.
+    """
+
+    times = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        function(argument)
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times)}
+
+
+@contextmanager
+def quiet_logging():
+    level = logging.root.manager.disable
+    logging.disable(logging.CRITICAL)
+    try:
+        yield
+    finally:
+        logging.disable(level)
+
+
+def run_rpmlb(args, cwd):
+    """Run the command line in a new process, as CI does."""
+
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR)
+    subprocess.check_call([sys.executable, '-m', 'rpmlb'] + args, cwd=cwd,
+                          env=env, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.DEVNULL)
+
+
+def run_startup_benchmarks(tmp_dir, repeat):
+    """Measure the command line startup with --help and a dummy run."""
+
+    results = {}
+    results['startup_help'] = measure(
+        lambda _: run_rpmlb(['--help'], tmp_dir), repeat=repeat)
+
+    startup_dir = os.path.join(tmp_dir, 'startup')
+    source_dir = os.path.join(startup_dir, 'source')
+    recipe_path = os.path.join(startup_dir, 'recipe.yml')
+    os.makedirs(source_dir)
+    with open(recipe_path, 'w') as recipe_file:
+        print('{0}:'.format(COLLECTION_ID), file=recipe_file)
+        print('  name: {0}'.format(COLLECTION_ID), file=recipe_file)
+        print('  requires: []', file=recipe_file)
+        print('  packages:', file=recipe_file)
+        for number in range(STARTUP_PACKAGES):
+            name = 'pkg-{0}'.format(number)
+            print('    - {0}'.format(name), file=recipe_file)
+            os.makedirs(os.path.join(source_dir, name))
+            write_spec(os.path.join(source_dir, name, name + '.spec'),
+                       'small')
+
+    def new_work_dir():
+        return tempfile.mkdtemp(dir=startup_dir)
+
+    results['startup_dummy_run'] = measure(
+        lambda work_dir: run_rpmlb([
+            '--download', 'local', '--source-directory', source_dir,
+            '--build', 'dummy', '--work-directory', work_dir,
+            recipe_path, COLLECTION_ID,
+        ], startup_dir),
+        setup=new_work_dir, repeat=repeat)
+    return results
+
+
+def run_benchmarks(tmp_dir, recipe_sizes, spec_sizes, repeat):
+    results = {}
+
+    for size in recipe_sizes:
+        recipe_path = os.path.join(tmp_dir, 'recipe-{0}.yml'.format(size))
+        write_recipe(recipe_path, size)
+
+        def new_recipe(_=None):
+            return Recipe(recipe_path, COLLECTION_ID)
+
+        results['recipe_init[{0}]'.format(size)] = measure(
+            new_recipe, repeat=repeat)
+        results['recipe_verify[{0}]'.format(size)] = measure(
+            lambda recipe: recipe.verify(), setup=new_recipe, repeat=repeat)
+        results['each_normalized_package[{0}]'.format(size)] = measure(
+            lambda recipe: list(recipe.each_normalized_package()),
+            setup=new_recipe, repeat=repeat)
+
+        work_dir = os.path.join(tmp_dir, 'work-{0}'.format(size))
+        os.makedirs(work_dir)
+        work = Work(new_recipe(), work_directory=work_dir)
+        results['work_each_num_dir[{0}]'.format(size)] = measure(
+            lambda _: list(work.each_num_dir()), repeat=repeat)
+
+    for size in spec_sizes:
+        spec_path = os.path.join(tmp_dir, 'bench-{0}.spec'.format(size))
+        write_spec(spec_path, size)
+        package_dict = {
+            'name': 'bench',
+            'macros': {'_with_bootstrap': 1},
+            'replaced_macros': {'need_bootstrap': 1},
+        }
+
+        def new_package_dir():
+            package_dir = tempfile.mkdtemp(dir=tmp_dir)
+            shutil.copy(spec_path, os.path.join(package_dir, 'bench.spec'))
+            return package_dir
+
+        builder = BaseBuilder()
+        results['prepare[{0}]'.format(size)] = measure(
+            lambda package_dir: builder.prepare(package_dict, package_dir),
+            setup=new_package_dir, repeat=repeat)
+
+        def read_lines():
+            with open(spec_path) as spec_file:
+                return spec_file.readlines()
+
+        results['replace_macros[{0}]'.format(size)] = measure(
+            lambda lines: list(BaseBuilder.replace_macros(
+                lines, package_dict['replaced_macros'])),
+            setup=read_lines, repeat=repeat)
+
+    return results
+
+
+def compare(results, baseline, threshold, min_time):
+    """Print the results against the baseline.
+
+    The benchmarks faster than min_time are too noisy to be regressions.
+
+    Returns:
+        Names of the benchmarks slower than the threshold.
+    """
+
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline['results'].get(name)
+        if base is None:
+            click.echo('{0:36} {1:10.4f}s'.format(name, result['min']))
+            continue
+        ratio = result['min'] / base['min'] if base['min'] else 1.0
+        mark = ''
+        if ratio > threshold and result['min'] >= min_time:
+            mark = ' REGRESSION'
+            regressions.append(name)
+        click.echo('{0:36} {1:10.4f}s {2:10.4f}s {3:6.2f}x{4}'.format(
+            name, result['min'], base['min'], ratio, mark))
+    return regressions
+
+
+def parse_sizes(ctx, param, value):
+    try:
+        return [int(size) for size in value.split(',') if size]
+    except ValueError:
+        raise click.BadParameter('comma separated numbers are expected')
+
+
+@click.command()
+@click.option(
+    '--recipe-sizes', default='10,1000,10000', callback=parse_sizes,
+    help='Comma separated numbers of packages in the generated recipes.',
+)
+@click.option(
+    '--spec-sizes', default='small,large',
+    help='Comma separated sizes of the generated SPEC files.',
+)
+@click.option(
+    '--startup/--no-startup', default=True,
+    help='Run the command line startup benchmarks.',
+)
+@click.option(
+    '--repeat', type=click.IntRange(min=1), default=5,
+    help='Number of runs of each benchmark; the fastest one is reported.',
+)
+@click.option(
+    '--save', type=click.Path(dir_okay=False, writable=True),
+    help='Save the results as a baseline.',
+)
+@click.option(
+    '--compare', 'baseline_path', type=click.Path(exists=True,
+                                                  dir_okay=False),
+    help='Compare the results with a saved baseline.',
+)
+@click.option(
+    '--threshold', type=float, default=1.25,
+    help='Slowdown against the baseline reported as a regression.',
+)
+@click.option(
+    '--min-time', type=float, default=0.005,
+    help='Seconds under which a slowdown is not reported.',
+)
+def main(recipe_sizes, spec_sizes, startup, repeat, save, baseline_path,
+         threshold, min_time):
+    """Run the benchmarks of rpmlb."""
+
+    spec_sizes = [size for size in spec_sizes.split(',') if size]
+    for size in spec_sizes:
+        if size not in SPEC_MACROS:
+            raise click.BadParameter('unknown spec size: {0}'.format(size))
+
+    tmp_dir = tempfile.mkdtemp(prefix='rpmlb-bench-')
+    try:
+        with quiet_logging():
+            results = run_benchmarks(tmp_dir, recipe_sizes, spec_sizes,
+                                     repeat)
+        if startup:
+            results.update(run_startup_benchmarks(tmp_dir, repeat))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    baseline = {'results': {}}
+    if baseline_path:
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+    regressions = compare(results, baseline, threshold, min_time)
+
+    if save:
+        with open(save, 'w') as save_file:
+            json.dump({
+                'rpmlb': rpmlb.__version__,
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            }, save_file, indent=2, sort_keys=True)
+        click.echo('Saved baseline: {0}'.format(save))
+
+    if regressions:
+        click.echo('Regressions: {0}'.format(', '.join(regressions)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,4 +2,4 @@
 
 from . import cli
 
-cli.run.main(prog_name=__package__)
+cli.main.main(prog_name=__package__)
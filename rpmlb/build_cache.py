@@ -0,0 +1,162 @@
+"""Module to manage the built packages cache."""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Any, Iterable, Mapping
+
+from . import utils
+
+LOG = logging.getLogger(__name__)
+
+#: Version of the cache key; change it to invalidate all entries
+KEY_VERSION = '1'
+
+#: Name of the file describing a cache entry
+MANIFEST_FILE_NAME = 'manifest.json'
+
+
+class BuildCache:
+    """A class to store built packages under the hash of their inputs.
+
+    The key covers the edited SPEC file, the lookaside source checksums,
+    any other file of the package such as patches, the macros from
+    the recipe and the builder configuration.
+    """
+
+    def __init__(self, directory: str):
+        if not directory:
+            raise ValueError('directory is required.')
+
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, package_dict: Mapping[str, Any], package_dir: str,
+            config: Mapping[str, Any]) -> str:
+        """Compute the cache key of a prepared package.
+
+        Keyword arguments:
+            package_dict: A dictionary of package metadata.
+            package_dir: The directory of the prepared package.
+            config: The builder configuration affecting the result.
+
+        Returns:
+            Hexadecimal digest of all the inputs.
+        """
+
+        digest = hashlib.sha256()
+        _update_text(digest, 'rpmlb-build-cache-{0}'.format(KEY_VERSION))
+
+        recipe_data = {
+            'name': package_dict['name'],
+            'macros': dict(package_dict.get('macros') or {}),
+            'replaced_macros': dict(package_dict.get('replaced_macros') or {}),
+            'config': config,
+        }
+        _update_text(digest, json.dumps(recipe_data, sort_keys=True,
+                                        default=str))
+
+        name = package_dict['name']
+        spec_name = '{0}.spec'.format(name)
+        ignored = {spec_name, spec_name + '.orig'}
+        # The lookaside sources are covered by their checksums
+        # in the sources file, which is hashed as any other file.
+        for file_name in utils.package_files(package_dir):
+            if file_name in ignored:
+                continue
+            _update_text(digest, file_name)
+            _update_file(digest, os.path.join(package_dir, file_name))
+
+        _update_text(digest, spec_name)
+        _update_file(digest, os.path.join(package_dir, spec_name))
+
+        return digest.hexdigest()
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def restore(self, key: str, package_dir: str) -> bool:
+        """Restore cached files into the package directory.
+
+        Returns:
+            True on a cache hit, False otherwise.
+        """
+
+        entry_dir = self.entry_dir(key)
+        manifest_path = os.path.join(entry_dir, MANIFEST_FILE_NAME)
+        try:
+            with open(manifest_path, 'r') as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return False
+
+        for relative_path in manifest['files']:
+            target_path = os.path.join(package_dir, relative_path)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            utils.link_or_copy(os.path.join(entry_dir, relative_path),
+                               target_path)
+
+        LOG.debug('Restored %d files of %s from %s',
+                  len(manifest['files']), manifest['name'], entry_dir)
+        return True
+
+    def store(self, key: str, package_dir: str, package_dict: Mapping,
+              relative_paths: Iterable[str]):
+        """Store the built files of a package.
+
+        Keyword arguments:
+            key: The cache key of the package.
+            package_dir: The package directory.
+            package_dict: A dictionary of package metadata.
+            relative_paths: Paths of the built files
+                relative to the package directory.
+        """
+
+        entry_dir = self.entry_dir(key)
+        if os.path.isdir(entry_dir):
+            return
+
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='tmp-', dir=self.directory)
+        try:
+            relative_paths = sorted(relative_paths)
+            for relative_path in relative_paths:
+                target_path = os.path.join(tmp_dir, relative_path)
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                # Copy, so that later changes of the built files
+                # never leak into the cache.
+                shutil.copy2(os.path.join(package_dir, relative_path),
+                             target_path)
+
+            manifest = {
+                'name': package_dict['name'],
+                'files': relative_paths,
+            }
+            manifest_path = os.path.join(tmp_dir, MANIFEST_FILE_NAME)
+            with open(manifest_path, 'w') as manifest_file:
+                json.dump(manifest, manifest_file, indent=2)
+
+            # Publish the complete entry at once.
+            os.rename(tmp_dir, entry_dir)
+            LOG.debug('Stored %d files of %s to %s',
+                      len(relative_paths), package_dict['name'], entry_dir)
+        except OSError:
+            if os.path.isdir(entry_dir):
+                # Stored by someone else in the meantime.
+                return
+            raise
+        finally:
+            if os.path.isdir(tmp_dir):
+                shutil.rmtree(tmp_dir)
+
+
+def _update_text(digest, text: str):
+    digest.update(text.encode('utf-8'))
+    digest.update(b'\0')
+
+
+def _update_file(digest, file_path: str):
+    utils.hash_file(file_path, digest)
+    digest.update(b'\0')
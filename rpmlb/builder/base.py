@@ -1,31 +1,70 @@
+import functools
+import hashlib
+import json
 import logging
-import re
+import os
 import sys
+import threading
+import time
+from concurrent import futures
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Iterator, Mapping, Match
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Mapping, Optional
 
-import retrying
+from .. import journal, plugins, report, spec_editor, trace
+from ..retry import Attempt, RetryPolicy
 
-from .. import utils
+if TYPE_CHECKING:
+    # The caches and the SPEC file parser are imported when used,
+    # so that the command line starts fast.
+    from ..build_cache import BuildCache  # noqa: F401
+    from ..source_cache import SourceCache  # noqa: F401
+    from ..spec import Spec, SpecCache  # noqa: F401
 
 LOG = logging.getLogger(__name__)
 
 
-#: Regular expression for finding macro definitions
-MACRO_REGEX = re.compile(
-    r'''^
-    %global\s+                   # beginning of definition
-    (?P<name>[^\s]+)\s+          # one-word name
-    (?P<value>(?:.|(?<=\\)\n)+)  # value including spaces and escaped newlines
-    $''',
-    flags=re.MULTILINE | re.VERBOSE,
-)
+#: Header line of the edited SPEC files
+EDIT_MARKER = '# Edited by rpmlb'
+
+#: Version of the edit stamp; change it when the editing changes
+EDIT_STAMP_VERSION = '1'
+
+#: Log file of the build commands in each numbered directory
+BUILD_LOG_NAME = 'build.log'
 
 
 class BaseBuilder:
     """A base class for the package builder."""
 
+    #: Whether before() does not need the downloaded packages,
+    #: so that it can run in the background during the download.
+    background_before = False
+
+    #: Whether a package is built when build() returns, so that
+    #: the build is reported and recorded in the journal of the work.
+    #: False for the builders finishing the builds in after(),
+    #: which report the results themselves.
+    journal_builds = True
+
+    #: The RetryPolicy of the builds,
+    #: or None to create it from the command line options
+    retry_policy = None
+
+    # The state of a run has class-level defaults and is created when
+    # used, so that a plugin builder overriding __init__() without
+    # calling it keeps working.
+
+    #: Lock of the state shared by the build threads of all the builders
+    _state_lock = threading.Lock()
+
+    _before_future = None  # type: Optional[futures.Future]
+    _source_cache = None  # type: Optional[SourceCache]
+
+    #: Attempts of the builds running or not reported yet,
+    #: by the package directory
+    _attempts = None  # type: Optional[Dict[str, List[Attempt]]]
+
     def __init__(self):
         pass
 
@@ -38,51 +77,315 @@ class BaseBuilder:
 
         Returns:
             Instance of the named builder.
+
+        Raises:
+            ValueError: No builder has the name.
         """
 
-        class_name = 'rpmlb.builder.{0}.{1}Builder'.format(
-            name,
-            utils.camelize(name)
+        return plugins.BUILDERS.create(name)
+
+    def run(self, work, **kwargs):
+        resume = kwargs.get('resume', False)
+        # The journal decides what to skip when resuming automatically.
+        is_resume_num = bool(resume) and resume != journal.AUTO_RESUME
+
+        self.complete_before(work, **kwargs)
+
+        packages = (
+            (package_dict, num_name, package_dir)
+            for package_dict, num_name, package_dir in work.each_package_dir()
+            if not is_resume_num or int(num_name) >= resume
         )
-        instance = utils.get_instance(class_name)
 
-        LOG.debug('Loaded builder with %s', name)
-        return instance
+        cache = self.open_cache(**kwargs)
 
-    def run(self, work, **kwargs):
-        is_resume = kwargs.get('resume', False)
-        resume_num = 0
-        if is_resume:
-            resume_num = kwargs['resume']
+        jobs = kwargs.get('build_jobs') or 1
+        keep_going = kwargs.get('keep_going', False)
+        if jobs > 1 or keep_going:
+            # The scheduler knows the packages depending on a failed one.
+            self.build_concurrently(work, packages, jobs, cache=cache,
+                                    **kwargs)
+        else:
+            for package_dict, num_name, package_dir in packages:
+                with self.package_error_context(work, package_dict, num_name):
+                    self.prepare_and_record(work, package_dict, num_name,
+                                            package_dir, **kwargs)
+                    self.build_and_record(work, package_dict, num_name,
+                                          package_dir, cache=cache, **kwargs)
+
+        with trace.span('after', 'builder'):
+            self.after(work, **kwargs)
+        return not (keep_going and work.report.failed)
+
+    def start_before(self, work, **kwargs):
+        """Start before() in the background if the builder allows it.
+
+        The run() waits for it to finish before the first build.
+        Call finish_before() if the run stops earlier.
+        Nothing is started when resuming, see is_before_skipped().
+        """
+
+        if (not self.background_before or
+                self.is_before_skipped(work, **kwargs)):
+            return
+
+        LOG.info('Starting the process before build in the background.')
+        executor = futures.ThreadPoolExecutor(max_workers=1)
+        self._before_future = executor.submit(
+            trace.span('before', 'builder')(self.before), work, **kwargs)
+        executor.shutdown(wait=False)
+
+    def complete_before(self, work, **kwargs):
+        """Run before(), or wait for the one started in the background.
 
-        if is_resume:
+        Nothing is done when resuming, see is_before_skipped().
+        """
+
+        if self.is_before_skipped(work, **kwargs):
             message = (
                 'Skip the process before build, '
                 'because the resume option was used.'
             )
             LOG.info(message)
+            return
+
+        if self._before_future is not None:
+            LOG.info('Waiting for the process before build.')
+            future, self._before_future = self._before_future, None
+            future.result()
         else:
-            self.before(work, **kwargs)
+            with trace.span('before', 'builder'):
+                self.before(work, **kwargs)
+        work.journal.record(None, None, journal.BEFORE_BUILD)
 
-        for package_dict, num_name in work.each_package_dir():
-            try:
-                if is_resume:
-                    num = int(num_name)
-                    if num < resume_num:
-                        continue
-
-                self.prepare(package_dict)
-                self.build_with_retrying(package_dict, **kwargs)
-            except Exception:
-                message = 'pacakge_dict: {0}, num: {1}, work_dir: {2}'.format(
-                    package_dict, num_name, work.working_dir)
-                error = RuntimeError(message)
-                tb = sys.exc_info()[2]
-                error = error.with_traceback(tb)
-                raise error
-
-        self.after(work, **kwargs)
-        return True
+    def finish_before(self):
+        """Collect the background before() that run() did not wait for.
+
+        Call it when the run stops before the first build, such as
+        after a failed download. The before() is cancelled if it has
+        not started, or waited for, so that its error is logged.
+        """
+
+        future, self._before_future = self._before_future, None
+        if future is None:
+            return
+        if future.cancel():
+            LOG.info('Cancelled the process before build.')
+            return
+
+        LOG.info('Waiting for the process before build.')
+        error = future.exception()
+        if error is not None:
+            LOG.error('The process before build failed: %s: %s',
+                      type(error).__name__, error)
+
+    @staticmethod
+    def is_before_skipped(work, **kwargs) -> bool:
+        """Whether before() is skipped by the resume option.
+
+        It is always skipped when resuming from a position, and
+        when resuming from the journal if it has completed before.
+        """
+
+        resume = kwargs.get('resume', False)
+        if resume == journal.AUTO_RESUME:
+            return work.journal.entry(None, journal.BEFORE_BUILD) is not None
+        return bool(resume)
+
+    @staticmethod
+    def open_cache(**kwargs) -> Optional['BuildCache']:
+        """Open the build cache if requested by the options."""
+
+        if not kwargs.get('build_cache'):
+            return None
+        from ..build_cache import BuildCache
+        return BuildCache(kwargs['build_cache'])
+
+    @staticmethod
+    def open_spec_cache(**kwargs) -> Optional['SpecCache']:
+        """Open the parsed SPEC file cache if requested by the options."""
+
+        if not kwargs.get('spec_cache'):
+            return None
+        from ..spec import SpecCache
+        return SpecCache(kwargs['spec_cache'])
+
+    def open_source_cache(self, **kwargs) -> Optional['SourceCache']:
+        """Open the source cache shared by the builds if requested."""
+
+        if not kwargs.get('source_cache'):
+            return None
+
+        with self._state_lock:
+            if self._source_cache is None:
+                max_size = kwargs.get('source_cache_size')
+                if max_size:
+                    max_size *= 1024 * 1024  # MiB
+                from ..source_cache import SourceCache
+                self._source_cache = SourceCache(kwargs['source_cache'],
+                                                 max_size=max_size)
+        return self._source_cache
+
+    def build_concurrently(self, work, packages, jobs: int, cache=None,
+                           **kwargs):
+        """Build packages not depending on each other at the same time.
+
+        All the packages are prepared first, so that the dependencies
+        can be read from their SPEC files. With the keep_going option,
+        the packages depending on a failed one are skipped,
+        and the results are added to the report of the work.
+
+        Keyword arguments:
+            work: The Work instance.
+            packages: Iterable of (package_dict, num_name, package_dir)
+                in the recipe order.
+            jobs: Maximal number of builds running at the same time.
+            cache: The BuildCache instance, or None.
+            **kwargs: Options passed to build().
+        """
+
+        from .. import scheduler
+
+        LOG.info('Building with %d jobs.', jobs)
+        keep_going = kwargs.get('keep_going', False)
+
+        prepared = []
+        failures = {}
+        for package_dict, num_name, package_dir in packages:
+            prepared.append((package_dict, num_name, package_dir))
+            if keep_going:
+                error = self.prepare_or_report(work, package_dict, num_name,
+                                               package_dir, **kwargs)
+                if error is not None:
+                    failures[num_name] = error
+                continue
+            with self.package_error_context(work, package_dict, num_name):
+                self.prepare_and_record(work, package_dict, num_name,
+                                        package_dir, **kwargs)
+
+        spec_cache = self.open_spec_cache(**kwargs)
+        dependency_map = scheduler.package_dependencies([
+            (num_name, package_dict['name'],
+             self.read_spec(package_dict, package_dir, cache=spec_cache))
+            for package_dict, num_name, package_dir in prepared
+        ], failed_keys=failures)
+
+        with scheduler.Scheduler(jobs, keep_going=keep_going) as \
+                task_scheduler:
+            for package_dict, num_name, package_dir in prepared:
+                if num_name in failures:
+                    task_scheduler.add_failure(num_name, failures[num_name])
+                    continue
+                task = functools.partial(
+                    self.build_task, work, package_dict, num_name,
+                    package_dir, cache=cache, **kwargs)
+                task_scheduler.add(num_name, task, dependency_map[num_name])
+            task_scheduler.wait()
+
+        if keep_going:
+            self.report_skipped(work, task_scheduler, {
+                num_name: package_dict['name']
+                for package_dict, num_name, package_dir in prepared
+            })
+
+    def prepare_or_report(self, work, package_dict, num_name, package_dir,
+                          **kwargs) -> Optional[Exception]:
+        """Prepare single package, reporting the failure if any.
+
+        A package whose download has failed is not prepared.
+
+        Returns:
+            The error of the download or the preparation, or None.
+        """
+
+        result = work.report.get(num_name)
+        if result is not None and result.status == report.FAILED:
+            return result.error
+
+        try:
+            self.prepare_and_record(work, package_dict, num_name,
+                                    package_dir, **kwargs)
+        except Exception as e:
+            LOG.error('Prepare failed: %s at %s: %s',
+                      package_dict['name'], num_name, e)
+            work.report.add_failure(num_name, package_dict['name'],
+                                    'prepare', e)
+            return e
+        return None
+
+    @staticmethod
+    def report_skipped(work, task_scheduler, package_names):
+        """Report the packages skipped by the scheduler.
+
+        Keyword arguments:
+            work: The Work instance.
+            task_scheduler: The finished Scheduler instance.
+            package_names: Mapping of the num_name to the package name.
+        """
+
+        for num_name, blocked_by in task_scheduler.skipped.items():
+            LOG.warning('Skipped %s at %s, blocked by %s',
+                        package_names[num_name], num_name,
+                        ', '.join(sorted(blocked_by, key=int)))
+            work.report.add_skip(num_name, package_names[num_name],
+                                 blocked_by)
+
+    def build_task(self, work, package_dict, num_name, package_dir,
+                   cache=None, **kwargs):
+        """Build single prepared package as a scheduled task."""
+
+        with self.package_error_context(work, package_dict, num_name):
+            self.build_and_record(work, package_dict, num_name, package_dir,
+                                  cache=cache, **kwargs)
+        LOG.info('Built %s at %s', package_dict['name'], num_name)
+
+    @staticmethod
+    @contextmanager
+    def package_error_context(work, package_dict, num_name):
+        """Report any error with the failed package and its position."""
+
+        try:
+            yield
+        except Exception:
+            message = 'pacakge_dict: {0}, num: {1}, work_dir: {2}'.format(
+                package_dict, num_name, work.working_dir)
+            error = RuntimeError(message)
+            tb = sys.exc_info()[2]
+            error = error.with_traceback(tb)
+            raise error
+
+    @staticmethod
+    def read_spec(package_dict: Mapping[str, Any], package_dir: str,
+                  cache: Optional['SpecCache'] = None) -> Optional['Spec']:
+        """Read the dependency data of the package's SPEC file.
+
+        Keyword arguments:
+            package_dict: A dictionary of package metadata.
+            package_dir: The directory containing the prepared package.
+            cache: The SpecCache instance, or None.
+
+        Returns:
+            The parsed SPEC file, or None if it cannot be read.
+        """
+
+        spec_file_path = Path(
+            package_dir, '{name}.spec'.format_map(package_dict))
+        try:
+            from ..spec import Spec
+            return Spec.from_file(spec_file_path, cache=cache)
+        except OSError as e:
+            LOG.warning('Cannot read spec: %s', e)
+            return None
+
+    @staticmethod
+    def build_log_path(package_dir: str) -> str:
+        """Log file of the build commands of the package.
+
+        It is next to the package directory, so that it is not a part
+        of the package's files.
+        """
+
+        return os.path.join(os.path.dirname(package_dir), BUILD_LOG_NAME)
 
     def before(self, work, **kwargs):
         pass
@@ -90,32 +393,40 @@ class BaseBuilder:
     def after(self, work, **kwargs):
         pass
 
-    def prepare(self, package_dict: Mapping[str, Any]):
+    def prepare(self, package_dict: Mapping[str, Any], package_dir: str):
         """Prepare single package for a build.
 
         Keyword arguments:
             package_dict: A dictionary of package metadata.
+            package_dir: The directory containing the package's files.
         """
 
         if 'name' not in package_dict:
             raise ValueError('package_dict is invalid.')
 
-        spec_file_path = Path('{name}.spec'.format_map(package_dict))
-
-        with self.edit_spec_file(spec_file_path) as (source_file, target_file):
-            content_stream = iter(source_file)  # Start modifications
-
-            if 'replaced_macros' in package_dict:
-                content_stream = self.replace_macros(
-                    content_stream,
-                    package_dict['replaced_macros'],
-                )
-
-            if 'macros' in package_dict:
-                content_stream = self.add_macros(
-                    content_stream,
-                    package_dict['macros'],
-                )
+        with trace.span(package_dict['name'], 'prepare'):
+            self._prepare_spec(package_dict, package_dir)
+
+    def _prepare_spec(self, package_dict, package_dir):
+        spec_file_path = Path(
+            package_dir, '{name}.spec'.format_map(package_dict))
+
+        stamp = self.edit_stamp(spec_file_path, {
+            'builder': type(self).__name__,
+            'package': package_dict,
+        })
+        if self.read_edit_stamp(spec_file_path) == stamp:
+            LOG.debug('Skip editing %s, already edited.', spec_file_path)
+            return
+
+        with self.edit_spec_file(spec_file_path, stamp=stamp) as (
+                source_file, target_file):
+            # Apply the macro edits in one pass
+            content_stream = spec_editor.edit_lines(
+                source_file,
+                replaced_macros=package_dict.get('replaced_macros'),
+                added_macros=package_dict.get('macros'),
+            )
 
             # Perform any extra edits needed by derived builder
             content_stream = self.prepare_extra_steps(
@@ -123,24 +434,285 @@ class BaseBuilder:
                 package_dict,
             )
 
-            target_file.write(''.join(content_stream))  # End modifications
+            target_file.writelines(content_stream)
+
+    def prepare_and_record(self, work, package_dict, num_name, package_dir,
+                           **kwargs):
+        """Prepare single package, recording it in the journal.
+
+        When resuming from the journal, a package prepared or built
+        from its current contents is not prepared again.
+        """
+
+        name = package_dict.get('name')
+        if (kwargs.get('resume') == journal.AUTO_RESUME and
+                work.journal.next_phase(num_name, name, package_dir) in (
+                    journal.BUILD, None)):
+            LOG.debug('Skip preparing %s at %s, already prepared.',
+                      name, num_name)
+            return
+
+        self.prepare(package_dict, package_dir)
+        work.journal.record(num_name, name, journal.PREPARE,
+                            journal.fingerprint(package_dir))
+
+    def build_and_record(self, work, package_dict, num_name, package_dir,
+                         cache=None, **kwargs):
+        """Build single prepared package, recording it in the journal.
+
+        The result is added to the report of the work
+        together with the attempts of the build.
+        When resuming from the journal, a package built
+        from its current contents is not built again.
+        """
+
+        name = package_dict['name']
+        if (self.journal_builds and
+                kwargs.get('resume') == journal.AUTO_RESUME and
+                work.journal.next_phase(num_name, name, package_dir) is None):
+            LOG.info('Skip building %s at %s, already built.', name, num_name)
+            work.report.add_success(num_name, name)
+            return
+
+        # The fingerprint of the inputs, as the build adds its results.
+        package_fingerprint = None
+        if self.journal_builds:
+            package_fingerprint = journal.fingerprint(package_dir)
+        try:
+            self.build_package(package_dict, package_dir, cache=cache,
+                               **kwargs)
+        except Exception as e:
+            work.report.add_failure(num_name, name, 'build', e,
+                                    attempts=self.pop_attempts(package_dir))
+            raise
+        attempts = self.pop_attempts(package_dir)
+        if self.journal_builds:
+            work.report.add_success(num_name, name, attempts=attempts)
+            work.journal.record(num_name, name, journal.BUILD,
+                                package_fingerprint)
+
+    def build_package(self, package_dict, package_dir, cache=None,
+                      **kwargs):
+        """Build single prepared package unless it is cached.
+
+        Keyword arguments:
+            package_dict: A dictionary of package metadata.
+            package_dir: The directory containing the prepared package.
+            cache: The BuildCache instance, or None to always build.
+            **kwargs: Command line options.
+        """
+
+        with trace.span(package_dict['name'], 'build'):
+            self._build_package(package_dict, package_dir, cache=cache,
+                                **kwargs)
+
+    def _build_package(self, package_dict, package_dir, cache=None,
+                       **kwargs):
+        # The caches only save time, so that their errors are warnings.
+        key = None
+        if cache is not None:
+            key = cache.key(package_dict, package_dir,
+                            self.cache_config(**kwargs))
+            try:
+                is_restored = cache.restore(key, package_dir)
+            except OSError as e:
+                LOG.warning('Cannot restore %s from the build cache: %s',
+                            package_dict['name'], e)
+                is_restored = False
+            if is_restored:
+                LOG.info('Skip building %s, restored from the build cache.',
+                         package_dict['name'])
+                return
+
+        source_cache = self.open_source_cache(**kwargs)
+        if source_cache is not None:
+            try:
+                source_cache.link(package_dir)
+            except OSError as e:
+                LOG.warning('Cannot link the cached sources of %s: %s',
+                            package_dict['name'], e)
+
+        self.build_with_retrying(package_dict, package_dir, **kwargs)
+
+        if source_cache is not None:
+            try:
+                source_cache.store(package_dir)
+            except OSError as e:
+                LOG.warning('Cannot store the sources of %s: %s',
+                            package_dict['name'], e)
+        if cache is not None:
+            try:
+                cache.store(key, package_dir, package_dict,
+                            self.cache_artifacts(package_dir))
+            except OSError as e:
+                LOG.warning('Cannot store %s in the build cache: %s',
+                            package_dict['name'], e)
+
+    def cache_config(self, **kwargs) -> Dict[str, Any]:
+        """Builder configuration affecting the build result.
+
+        Override to add builder-specific options.
+
+        Returns:
+            Dictionary that is part of the build cache key.
+        """
+
+        return {'builder': type(self).__name__}
+
+    def cache_artifacts(self, package_dir: str) -> List[str]:
+        """Built files to be stored in the build cache.
+
+        Override if the builder produces other files.
+
+        Returns:
+            Paths relative to the package directory.
+            All the RPM files in the package directory by default.
+        """
+
+        artifacts = []
+        for directory, dir_names, file_names in os.walk(package_dir):
+            dir_names[:] = [name for name in dir_names
+                            if not name.startswith('.')]
+            artifacts.extend(
+                os.path.relpath(os.path.join(directory, name), package_dir)
+                for name in file_names if name.endswith('.rpm')
+            )
+        return artifacts
+
+    def build_with_retrying(self, package_dict, package_dir, **kwargs):
+        """Build single package, trying again after transient failures.
+
+        Each attempt is recorded until pop_attempts() is called.
+        """
+
+        policy = self.retry_policy or RetryPolicy.from_options(**kwargs)
+        name = package_dict['name']
+        number = 1
+        while True:
+            start = time.monotonic()
+            try:
+                with trace.span(name, 'build attempt', attempt=number):
+                    self.build(package_dict, package_dir, **kwargs)
+            except Exception as e:
+                failure = policy.classify(self.failure_log(package_dir, e))
+                self.record_attempt(package_dir, Attempt(
+                    name, number, failure, time.monotonic() - start))
+                if not policy.should_retry(failure, number):
+                    LOG.error('Build of %s failed with a %s failure '
+                              'at attempt %d.', name, failure, number)
+                    raise
+                wait = policy.wait_time(number)
+                LOG.warning('Build of %s failed with a %s failure '
+                            'at attempt %d, trying again in %.1f seconds.',
+                            name, failure, number, wait)
+                policy.sleep(wait)
+                number += 1
+            else:
+                self.record_attempt(package_dir, Attempt(
+                    name, number, None, time.monotonic() - start))
+                return
+
+    def failure_log(self, package_dir: str, error: Exception) -> str:
+        """Text of the failed build for classifying the failure.
+
+        Override to add the logs of the build tool.
+
+        Returns:
+            The last lines of the command output and the error message.
+        """
+
+        output = getattr(error, 'output', None)
+        if isinstance(output, bytes):
+            output = output.decode('utf-8', 'replace')
+        return '\n'.join(text for text in (output, str(error)) if text)
+
+    def record_attempt(self, package_dir: str, attempt: Attempt):
+        with self._state_lock:
+            if self._attempts is None:
+                self._attempts = {}
+            self._attempts.setdefault(package_dir, []).append(attempt)
+
+    def pop_attempts(self, package_dir: str) -> List[Attempt]:
+        """Remove and return the recorded attempts of a package."""
 
-    @retrying.retry(stop_max_attempt_number=3)
-    def build_with_retrying(self, package_dict, **kwargs):
-        self.build(package_dict, **kwargs)
+        with self._state_lock:
+            if self._attempts is None:
+                return []
+            return self._attempts.pop(package_dir, [])
+
+    def build(self, package_dict, package_dir, **kwargs):
+        """Build single package.
+
+        Keyword arguments:
+            package_dict: A dictionary of package metadata.
+            package_dir: The directory containing the prepared package.
+            **kwargs: Command line options.
+        """
 
-    def build(self, package_dict, **kwargs):
         raise NotImplementedError('Implement this method.')
 
+    @staticmethod
+    def edit_stamp(target_path: Path, edits: Mapping[str, Any]) -> str:
+        """Compute the stamp of the edits of a SPEC file.
+
+        Keyword arguments:
+            target_path: The modified SPEC file path.
+            edits: Data describing all the edits.
+
+        Returns:
+            Hexadecimal digest of the original SPEC file and the edits.
+        """
+
+        if not isinstance(target_path, Path):
+            target_path = Path(target_path)
+
+        source_path = target_path.with_suffix('.spec.orig')
+        if not source_path.exists():
+            source_path = target_path
+
+        digest = hashlib.sha256()
+        digest.update(EDIT_STAMP_VERSION.encode('utf-8'))
+        digest.update(json.dumps(edits, sort_keys=True, default=_jsonable)
+                      .encode('utf-8'))
+        with source_path.open(mode='rb') as source_file:
+            digest.update(source_file.read())
+        return digest.hexdigest()
+
+    @staticmethod
+    def read_edit_stamp(target_path: Path) -> Optional[str]:
+        """Read the stamp recorded by edit_spec_file().
+
+        Returns:
+            The stamp, or None if the SPEC file is not edited with a stamp.
+        """
+
+        if not isinstance(target_path, Path):
+            target_path = Path(target_path)
+
+        if not target_path.with_suffix('.spec.orig').exists():
+            return None
+        try:
+            with target_path.open(mode='r') as target_file:
+                header = target_file.readline()
+        except OSError:
+            return None
+
+        prefix = '{0} (stamp: '.format(EDIT_MARKER)
+        if not header.startswith(prefix) or not header.endswith(')\n'):
+            return None
+        return header[len(prefix):-2]
+
     @staticmethod
     @contextmanager
-    def edit_spec_file(target_path: Path):
+    def edit_spec_file(target_path: Path, stamp: Optional[str] = None):
         """Safely edit a SPEC file in-place.
 
         The target is backed up as '{target}.orig' if needed.
 
         Keyword arguments:
             target_path: The modified SPEC file path.
+            stamp: The stamp of the edits recorded in the header line,
+                as computed by edit_stamp(), or None.
 
         Returns:
             Context manager providing open handles
@@ -159,7 +731,11 @@ class BaseBuilder:
         # Provide the handles
         with source_path.open(mode='r') as source_file, \
                 target_path.open(mode='w') as target_file:
-            print('# Edited by rpmlb', file=target_file)
+            if stamp is None:
+                print(EDIT_MARKER, file=target_file)
+            else:
+                print('{0} (stamp: {1})'.format(EDIT_MARKER, stamp),
+                      file=target_file)
 
             yield source_file, target_file
 
@@ -180,12 +756,7 @@ class BaseBuilder:
             Lines of the modified file.
         """
 
-        # Prepend all definitions before the stream
-        for name, value in macros.items():
-            yield '%global {name} {value}\n'.format(name=name, value=value)
-
-        # Pass the rest of the file
-        yield from source
+        yield from spec_editor.edit_lines(source, added_macros=macros)
 
     @staticmethod
     def replace_macros(source: Iterator[str], macros: Mapping[str, str]):
@@ -200,21 +771,7 @@ class BaseBuilder:
             Lines of the modified file.
         """
 
-        def replacement(match: Match) -> str:
-            """Macro replacement logic"""
-
-            macro_name = match.group('name')
-            macro_value = macros.get(macro_name, match.group('value'))
-            return '%global {} {}'.format(macro_name, macro_value)
-
-        # Need whole file contents for matching multi-line macros
-        contents = ''.join(source)
-
-        # Substitute all macros
-        contents = MACRO_REGEX.sub(replacement, contents)
-
-        # Pass the modified lines
-        yield from contents.splitlines(keepends=True)
+        yield from spec_editor.edit_lines(source, replaced_macros=macros)
 
     def prepare_extra_steps(
         self,
@@ -232,3 +789,11 @@ class BaseBuilder:
         """
 
         yield from source  # pass for generators
+
+
+def _jsonable(value):
+    """Convert the read-only mappings of the package data for JSON."""
+
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
@@ -1,6 +1,7 @@
 import logging
+import os
 
-from rpmlb import utils
+from rpmlb import trace, utils
 from rpmlb.builder.base import BaseBuilder
 
 LOG = logging.getLogger(__name__)
@@ -9,11 +10,25 @@ LOG = logging.getLogger(__name__)
 class CoprBuilder(BaseBuilder):
     """A builder class for Copr."""
 
-    def build(self, package_dict, **kwargs):
+    def build_package(self, package_dict, package_dir, cache=None,
+                      **kwargs):
+        # The packages are built remotely, so that only the SRPM file
+        # would be cached, and a hit would silently skip the Copr build.
+        if cache is not None:
+            LOG.debug('Build cache is not used by the copr builder.')
+        super().build_package(package_dict, package_dir, **kwargs)
+
+    def build(self, package_dict, package_dir, **kwargs):
         copr_repo = kwargs['copr_repo']
         if not copr_repo:
             raise ValueError('copr_repo is required.')
 
-        utils.run_cmd('rm -v *.rpm', check=False)
-        utils.run_cmd('rhpkg srpm')
-        utils.run_cmd('copr-cli build %s *.rpm' % copr_repo)
+        log_file = self.build_log_path(package_dir)
+        utils.run_cmd(['rm', '-v'] + utils.glob_paths('*.rpm', package_dir),
+                      cwd=package_dir, check=False, log_file=log_file)
+        with trace.span(os.path.basename(package_dir), 'srpm'):
+            utils.run_cmd(['rhpkg', 'srpm'], cwd=package_dir,
+                          log_file=log_file)
+        utils.run_cmd(['copr-cli', 'build', copr_repo] +
+                      utils.glob_paths('*.rpm', package_dir),
+                      cwd=package_dir, log_file=log_file)
@@ -1,7 +1,8 @@
+import hashlib
 import logging
 
+from rpmlb import custom
 from rpmlb.builder.base import BaseBuilder
-from rpmlb.custom import Custom
 
 LOG = logging.getLogger(__name__)
 
@@ -9,21 +10,25 @@ LOG = logging.getLogger(__name__)
 class CustomBuilder(BaseBuilder):
     """A custom builder class."""
 
-    def __init__(self):
-        self._yaml_content = None
-
     def before(self, work, **kwargs):
         custom_file = kwargs['custom_file']
         if not custom_file:
             raise ValueError('custom_file is required.')
 
-        custom = Custom(custom_file)
-        custom.run_cmds('before_build')
+        custom.load(custom_file).run_cmds('before_build')
 
-    def build(self, package_dict, **kwargs):
+    def build(self, package_dict, package_dir, **kwargs):
         custom_file = kwargs['custom_file']
         if not custom_file:
             raise ValueError('custom_file is required.')
 
-        custom = Custom(custom_file)
-        custom.run_cmds('build', **package_dict)
+        custom.load(custom_file).run_cmds(
+            'build', cwd=package_dir,
+            log_file=self.build_log_path(package_dir), **package_dict)
+
+    def cache_config(self, **kwargs):
+        config = super().cache_config(**kwargs)
+        with open(kwargs['custom_file'], 'rb') as custom_file:
+            content = custom_file.read()
+        config['custom_file'] = hashlib.sha256(content).hexdigest()
+        return config
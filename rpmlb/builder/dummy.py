@@ -8,5 +8,5 @@ LOG = logging.getLogger(__name__)
 class DummyBuilder(BaseBuilder):
     """A dummy builder class."""
 
-    def build(self, package_dict, **kwargs):
+    def build(self, package_dict, package_dir, **kwargs):
         LOG.info('dummy build %s', package_dict['name'])
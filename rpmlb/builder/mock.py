@@ -1,26 +1,151 @@
 import logging
+import os
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Set
 
-from rpmlb import utils
+from rpmlb import trace, utils
 from rpmlb.builder.base import BaseBuilder
 
 LOG = logging.getLogger(__name__)
 
+#: Directory in the package directory keeping the mock results
+RESULT_DIR_NAME = 'results'
+
 
 class MockBuilder(BaseBuilder):
     """A builder class for Mock."""
 
+    background_before = True
+
+    #: Unique extensions of the mock roots used by the running builds
+    _busy_roots = None  # type: Optional[Set[str]]
+
     def before(self, work, **kwargs):
         mock_config = kwargs['mock_config']
         if not mock_config:
             raise ValueError('mock_config is required.')
 
-        utils.run_cmd('mock -r %s --scrub=all' % mock_config)
+        # Prepare all the roots used by the builds.
+        for uniqueext in self.mock_root_names(**kwargs):
+            cmd = ['mock', '-r', mock_config]
+            if uniqueext is not None:
+                cmd += ['--uniqueext', uniqueext]
+            utils.run_cmd(cmd + ['--scrub=all'])
+            if kwargs.get('mock_init'):
+                utils.run_cmd(cmd + ['--init'])
 
-    def build(self, package_dict, **kwargs):
+    def build(self, package_dict, package_dir, **kwargs):
         mock_config = kwargs['mock_config']
         if not mock_config:
             raise ValueError('mock_config is required.')
 
-        utils.run_cmd('rm -v *.rpm', check=False)
-        utils.run_cmd('rhpkg srpm')
-        utils.run_cmd('mock -r %s -n *.rpm' % mock_config)
+        log_file = self.build_log_path(package_dir)
+        utils.run_cmd(['rm', '-rfv', RESULT_DIR_NAME] +
+                      utils.glob_paths('*.rpm', package_dir),
+                      cwd=package_dir, check=False, log_file=log_file)
+        with trace.span(os.path.basename(package_dir), 'srpm'):
+            utils.run_cmd(['rhpkg', 'srpm'], cwd=package_dir,
+                          log_file=log_file)
+        cmd = ['mock', '-r', mock_config]
+        if kwargs.get('build_cache'):
+            # Keep the results in the package directory to cache them.
+            cmd += ['--resultdir', os.path.join(package_dir, RESULT_DIR_NAME)]
+        cmd += ['-n'] + utils.glob_paths('*.rpm', package_dir)
+        with self.mock_root(**kwargs) as uniqueext:
+            if uniqueext is not None:
+                cmd += ['--uniqueext', uniqueext]
+            utils.run_cmd(cmd, cwd=package_dir, log_file=log_file)
+
+    def mock_root_names(self, **kwargs) -> List[Optional[str]]:
+        """Unique extensions of the mock roots used by the builds.
+
+        Concurrent builds need their own build roots. There is one root
+        for each build job, reused by the following builds of the job.
+
+        Returns:
+            The --uniqueext values, or [None] for the default root.
+        """
+
+        jobs = kwargs.get('build_jobs') or 1
+        if jobs <= 1:
+            return [None]
+        return [str(slot) for slot in range(1, jobs + 1)]
+
+    @contextmanager
+    def mock_root(self, **kwargs) -> Iterator[Optional[str]]:
+        """Reserve a mock root not used by another running build.
+
+        Yields:
+            The --uniqueext value, or None for the default root.
+        """
+
+        names = self.mock_root_names(**kwargs)
+        if names == [None]:
+            yield None
+            return
+
+        with self._state_lock:
+            if self._busy_roots is None:
+                self._busy_roots = set()
+            free_names = [name for name in names
+                          if name not in self._busy_roots]
+            if not free_names:
+                raise RuntimeError('No free mock root for the build.')
+            name = free_names[0]
+            self._busy_roots.add(name)
+        try:
+            yield name
+        finally:
+            with self._state_lock:
+                self._busy_roots.discard(name)
+
+    def failure_log(self, package_dir, error):
+        # The rpmbuild and dnf errors are only in the mock logs.
+        texts = [super().failure_log(package_dir, error)]
+        result_dir = self.result_dir(getattr(error, 'cmd', None))
+        if result_dir:
+            for log_name in ('root.log', 'build.log'):
+                texts.append(utils.read_tail(
+                    os.path.join(result_dir, log_name)))
+        return '\n'.join(texts)
+
+    @staticmethod
+    def result_dir(cmd) -> Optional[str]:
+        """Find the directory of the mock logs of the failed command.
+
+        Keyword arguments:
+            cmd: The failed command.
+
+        Returns:
+            The --resultdir of the mock command, or mock's default
+            result directory next to the build root. None if the
+            command is not mock or the directory is not known.
+        """
+
+        if not isinstance(cmd, list) or cmd[:2] != ['mock', '-r']:
+            return None
+        if '--resultdir' in cmd:
+            return cmd[cmd.index('--resultdir') + 1]
+
+        # Ask mock for the build root of the same config and unique
+        # extension; the default result directory is next to it.
+        root_cmd = cmd[:3]
+        if '--uniqueext' in cmd:
+            index = cmd.index('--uniqueext')
+            root_cmd += cmd[index:index + 2]
+        root_cmd.append('--print-root-path')
+        try:
+            proc = utils.run_cmd_with_capture(root_cmd, check=False)
+        except OSError as e:
+            LOG.warning('Cannot find the mock result directory: %s', e)
+            return None
+        lines = (proc.stdout or b'').decode('utf-8', 'replace').split()
+        if proc.returncode != 0 or not lines:
+            return None
+        return os.path.join(os.path.dirname(lines[-1].rstrip('/')),
+                            'result')
+
+    def cache_config(self, **kwargs):
+        config = super().cache_config(**kwargs)
+        config['mock_config'] = kwargs.get('mock_config')
+        return config
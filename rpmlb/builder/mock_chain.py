@@ -0,0 +1,114 @@
+import glob
+import logging
+import os
+
+from rpmlb import trace, utils
+from rpmlb.builder.mock import MockBuilder
+
+LOG = logging.getLogger(__name__)
+
+#: Directory in the work directory keeping the chain build results
+LOCAL_REPO_DIR_NAME = 'mock-chain-repo'
+
+#: File created by mock in the result directory of a built package
+SUCCESS_FILE_NAME = 'success'
+
+
+class MockChainBuilder(MockBuilder):
+    """A builder class for Mock building all packages in one chroot.
+
+    The SRPM files are created for each package, and built at the end
+    by a single `mock --chain` in the recipe order. The results are
+    kept in a local repository, so that each package is installable
+    for the following ones. A package is reported as built when mock
+    created the success file in its result directory.
+    """
+
+    #: The packages are built in after().
+    journal_builds = False
+
+    def __init__(self):
+        super().__init__()
+        self._srpm_paths = {}
+
+    def mock_root_names(self, **kwargs):
+        # The chain builds in the default root.
+        return [None]
+
+    def build_package(self, package_dict, package_dir, cache=None,
+                      **kwargs):
+        # The packages are built together at the end,
+        # so that the SRPM files are always needed.
+        if cache is not None:
+            LOG.debug('Build cache is not used by the mock chain builder.')
+        super().build_package(package_dict, package_dir, **kwargs)
+
+    def build(self, package_dict, package_dir, **kwargs):
+        mock_config = kwargs['mock_config']
+        if not mock_config:
+            raise ValueError('mock_config is required.')
+
+        log_file = self.build_log_path(package_dir)
+        utils.run_cmd(['rm', '-v'] + utils.glob_paths('*.rpm', package_dir),
+                      cwd=package_dir, check=False, log_file=log_file)
+        with trace.span(os.path.basename(package_dir), 'srpm'):
+            utils.run_cmd(['rhpkg', 'srpm'], cwd=package_dir,
+                          log_file=log_file)
+
+        srpm_paths = glob.glob(os.path.join(package_dir, '*.src.rpm'))
+        if len(srpm_paths) != 1:
+            message = 'Expected one SRPM file in {0}, found {1}.'.format(
+                package_dir, len(srpm_paths))
+            raise RuntimeError(message)
+
+        num_name = os.path.basename(os.path.dirname(package_dir))
+        self._srpm_paths[num_name] = srpm_paths[0]
+
+    def after(self, work, **kwargs):
+        if not self._srpm_paths:
+            LOG.info('No SRPM files to build.')
+            return
+
+        mock_config = kwargs['mock_config']
+        keep_going = kwargs.get('keep_going', False)
+        num_names = sorted(self._srpm_paths, key=int)
+        local_repo_dir = os.path.join(work.working_dir, LOCAL_REPO_DIR_NAME)
+
+        LOG.info('Building %d packages in a mock chain.', len(num_names))
+        cmd = ['mock', '-r', mock_config, '--chain',
+               '--localrepo', local_repo_dir]
+        if keep_going:
+            # Build the other packages after a failed one.
+            cmd.append('--continue')
+        cmd += [self._srpm_paths[num_name] for num_name in num_names]
+        chain_error = None
+        try:
+            utils.run_cmd(cmd, cwd=work.working_dir)
+        except Exception as e:
+            chain_error = e
+
+        for num_name in num_names:
+            srpm_path = self._srpm_paths[num_name]
+            name = os.path.basename(os.path.dirname(srpm_path))
+            if self.is_chain_built(local_repo_dir, srpm_path):
+                work.report.add_success(num_name, name)
+            else:
+                work.report.add_failure(
+                    num_name, name, 'build', chain_error or RuntimeError(
+                        'No mock chain result of {0}.'.format(
+                            os.path.basename(srpm_path))))
+
+        if chain_error is not None and not keep_going:
+            raise chain_error
+
+    @staticmethod
+    def is_chain_built(local_repo_dir: str, srpm_path: str) -> bool:
+        """Whether mock built the SRPM file in the local repository.
+
+        The results of each package are in results/<root>/<NVR>.
+        """
+
+        nvr = os.path.basename(srpm_path)[:-len('.src.rpm')]
+        return bool(glob.glob(os.path.join(
+            local_repo_dir, 'results', '*', glob.escape(nvr),
+            SUCCESS_FILE_NAME)))
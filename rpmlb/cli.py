@@ -4,33 +4,112 @@ import os
 
 import click
 
-from . import LOG, configure_logging
-from .builder.base import BaseBuilder
-from .downloader.base import BaseDownloader
-from .recipe import Recipe
-from .work import Work
+from . import LOG, configure_logging, journal, plugins, trace
 
+# The modules for the download and the build are imported when used,
+# so that --help and the option errors are fast.
 
-@click.command()
-# General options
-@click.option(
+
+class DefaultGroup(click.Group):
+    """A group running the default command if no command is named.
+
+    The --help of the group is the help of the default command,
+    so that it lists all its options.
+    """
+
+    def __init__(self, *args, default_command=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx, args):
+        # Skip the options of the group, all of them flags,
+        # such as "rpmlb -v recipe index".
+        group_opts = {
+            opt for param in self.get_params(ctx)
+            for opt in param.opts + param.secondary_opts
+        }
+        index = 0
+        while index < len(args) and args[index] in group_opts:
+            index += 1
+        if index == len(args) or args[index] not in self.commands:
+            args.insert(0, self.default_command)
+        return super().parse_args(ctx, args)
+
+
+class PluginChoice(click.ParamType):
+    """A name of the built-in or plugin builders or downloaders.
+
+    The plugins are discovered only for a name that is not built in.
+    """
+
+    name = 'choice'
+
+    def __init__(self, registry: plugins.Registry):
+        self.registry = registry
+
+    def get_metavar(self, param, ctx=None):
+        return '[{0}]'.format('|'.join(self.registry.builtin_names))
+
+    def convert(self, value, param, ctx):
+        if value not in self.registry:
+            self.fail('invalid choice: {0}. (choose from {1})'.format(
+                value, ', '.join(self.registry.names())), param, ctx)
+        return value
+
+
+class ResumeParam(click.ParamType):
+    """A package position, or AUTO_RESUME to resume from the journal."""
+
+    name = 'position'
+
+    def convert(self, value, param, ctx):
+        if value == journal.AUTO_RESUME or isinstance(value, int):
+            return value
+        try:
+            return int(value)
+        except ValueError:
+            self.fail('{0!r} is not a valid integer or {1!r}. '
+                      'Use "--resume {1}" to resume from the journal.'.format(
+                          value, journal.AUTO_RESUME), param, ctx)
+
+
+def _configure_logging(ctx, param, verbose):
+    # A --verbose before the command name is kept by the command.
+    verbose = verbose or ctx.meta.get('rpmlb.verbose', False)
+    ctx.meta['rpmlb.verbose'] = verbose
+    configure_logging(verbose)
+
+
+#: The --verbose option of the main group and the build command
+verbose_option = click.option(
     '--verbose', '-v', is_flag=True, default=False,
     help='Turn on verbose logging.',
     # Enable logging as early as possible
     is_eager=True, expose_value=False,
-    callback=lambda ctx, param, verbose: configure_logging(verbose),
+    callback=_configure_logging,
 )
+
+
+@click.command(epilog=(
+    'See "rpmlb recipe --help" for the commands managing the recipe files. '
+    'A recipe file named as a command, such as "build" or "recipe", '
+    'is given as "./build" or after "--": "rpmlb -- build NAME".'
+))
+# General options
+@verbose_option
 @click.option(
     '--download', '-d',
-    type=click.Choice('none local rhpkg custom'.split()),
+    type=PluginChoice(plugins.DOWNLOADERS),
     default='none',
-    help='Choose a download type.',
+    help='Choose a download type, or a plugin in the {0} group.'.format(
+        plugins.DOWNLOADER_GROUP),
 )
 @click.option(
     '--build', '-b',
-    type=click.Choice('dummy mock copr custom'.split()),
+    type=PluginChoice(plugins.BUILDERS),
     default='dummy',
-    help='Choose a build type.',
+    help='Choose a build type, or a plugin in the {0} group.'.format(
+        plugins.BUILDER_GROUP),
 )
 @click.option(
     '--work-directory', '-w',
@@ -39,6 +118,26 @@ from .work import Work
     default=None,
     help='Specify a working directory.',
 )
+@click.option(
+    '--pipeline', is_flag=True, default=False,
+    help='Build each package as soon as it is downloaded.',
+)
+@click.option(
+    '--keep-going', '-k', is_flag=True, default=False,
+    help='Skip only the packages depending on a failed one, '
+         'and summarize the results.',
+)
+@click.option(
+    '--recipe-index', is_flag=True, default=False,
+    help='Load the recipe through the index in the user cache directory.',
+)
+@click.option(
+    '--trace',
+    type=click.Path(dir_okay=False, writable=True, resolve_path=True),
+    default=None,
+    help='Write the time spans of the processing to the file, '
+         'as JSON lines if it ends with .jsonl.',
+)
 @click.option(
     '--custom-file', '-c',
     type=click.Path(exists=True, dir_okay=False, resolve_path=True),
@@ -49,22 +148,91 @@ from .work import Work
     '--branch', '-B',
     help='Git branch for downloaders that use it (rhpkg).',
 )
+@click.option(
+    '--rhpkg-mirror',
+    type=click.Path(file_okay=False, writable=True, resolve_path=True),
+    default=None,
+    help='Directory keeping git mirrors for rhpkg downloader.',
+)
 @click.option(
     '--source-directory', '-S',
     type=click.Path(exists=True, file_okay=False, resolve_path=True),
     default=os.path.abspath(os.getcwd()),
     help='Package source directory for local downloader.',
 )
+@click.option(
+    '--local-copy-mode',
+    type=click.Choice('copy hardlink reflink'.split()),
+    default='copy',
+    help='How local downloader copies the files.',
+)
+@click.option(
+    '--download-jobs',
+    type=click.IntRange(min=1),
+    default=1,
+    help='Number of packages downloaded at the same time.',
+)
 # Build options
 @click.option(
     '--resume', '-r',
-    type=click.INT,
-    help='Resume build from specified position.',
+    type=ResumeParam(),
+    help='Resume build from specified position, or with "auto" '
+         'from the first incomplete package in the work directory.',
+)
+@click.option(
+    '--build-jobs',
+    type=click.IntRange(min=1),
+    default=1,
+    help='Number of independent packages built at the same time.',
+)
+@click.option(
+    '--retry-attempts',
+    type=click.IntRange(min=1),
+    default=3,
+    help='Maximal number of attempts of a build failing transiently.',
+)
+@click.option(
+    '--retry-delay',
+    type=click.FloatRange(min=0),
+    default=10.0,
+    help='Seconds before the second attempt, doubled for each next one.',
+)
+@click.option(
+    '--retry-unknown', is_flag=True, default=False,
+    help='Try again also the builds failing for an unknown reason.',
+)
+@click.option(
+    '--build-cache',
+    type=click.Path(file_okay=False, writable=True, resolve_path=True),
+    default=None,
+    help='Directory caching built packages to skip unchanged ones.',
+)
+@click.option(
+    '--spec-cache',
+    type=click.Path(file_okay=False, writable=True, resolve_path=True),
+    default=None,
+    help='Directory caching parsed SPEC files for the dependencies.',
+)
+@click.option(
+    '--source-cache',
+    type=click.Path(file_okay=False, writable=True, resolve_path=True),
+    default=None,
+    help='Directory sharing the lookaside sources between the builds.',
+)
+@click.option(
+    '--source-cache-size',
+    type=click.IntRange(min=1),
+    default=None,
+    help='Maximal size of the source cache in MiB.',
 )
 @click.option(
     '--mock-config', '-M',
     help='Mock configuration for mock builder.',
 )
+@click.option(
+    '--mock-init', is_flag=True, default=False,
+    help='Initialize the mock chroot before the first build.',
+)
 @click.option(
     '--copr-repo', '-C',
     help='Target Copr for copr builder.',
@@ -80,23 +248,113 @@ def run(recipe_file, recipe_name, **option_dict):
     (such as 'python33').
     """
 
+    if option_dict['trace']:
+        trace.enable()
+    try:
+        _run(recipe_file, recipe_name, **option_dict)
+    finally:
+        if option_dict['trace']:
+            trace.write(option_dict['trace'])
+            trace.disable()
+
+    LOG.info('Success!')
+
+
+def _run(recipe_file, recipe_name, **option_dict):
+    """Download and build the packages as the run command."""
+
+    from . import pipeline
+    from .recipe import Recipe
+    from .recipe_index import default_directory
+    from .work import Work
+
     # Load recipe and processing objects
-    recipe = Recipe(recipe_file, recipe_name)
+    index_directory = None
+    if option_dict['recipe_index']:
+        index_directory = default_directory()
+    recipe = Recipe(recipe_file, recipe_name,
+                    index_directory=index_directory)
     recipe.verify()
 
-    builder = BaseBuilder.get_instance(option_dict['build'])
-    downloader = BaseDownloader.get_instance(option_dict['download'])
+    builder = plugins.BUILDERS.create(option_dict['build'])
+    downloader = plugins.DOWNLOADERS.create(option_dict['download'])
 
     # Prepare the working directory
     # HINT: with contextlib.closing(Work(recipe, **option_dict)) as work:
     work = Work(recipe, **option_dict)
 
-    # Download
-    LOG.info('Downloading...')
-    downloader.run(work, **option_dict)
+    if option_dict['resume'] == journal.AUTO_RESUME:
+        _log_resume_position(work)
 
-    # Build
-    LOG.info('Building...')
-    builder.run(work, **option_dict)
+    # Let the builder get ready while downloading
+    builder.start_before(work, **option_dict)
 
-    LOG.info('Success!')
+    try:
+        if option_dict['pipeline']:
+            # Download and build at the same time
+            LOG.info('Downloading and building...')
+            pipeline.run(downloader, builder, work, **option_dict)
+        else:
+            # Download
+            LOG.info('Downloading...')
+            downloader.run(work, **option_dict)
+
+            # Build
+            LOG.info('Building...')
+            builder.run(work, **option_dict)
+    finally:
+        # The background before() of a run failed in the downloads
+        builder.finish_before()
+        # Also the built packages and their attempts of a failed run
+        work.report.log_summary()
+
+    if option_dict['keep_going'] and work.report.failed:
+        raise click.ClickException('Some packages failed or were skipped.')
+
+
+def _log_resume_position(work):
+    """Log the first incomplete package found in the journal."""
+
+    for package_dict, num_name, package_dir in work.each_package_dir():
+        phase = work.journal.next_phase(num_name, package_dict['name'],
+                                        package_dir)
+        if phase is not None:
+            LOG.info('Resuming from %s at %s, %s phase.',
+                     package_dict['name'], num_name, phase)
+            return
+    LOG.info('All the packages are built, nothing to resume.')
+
+
+@click.group()
+def recipe():
+    """Manage the recipe files."""
+
+
+@recipe.command()
+@click.argument(
+    'recipe_files', nargs=-1, required=True,
+    type=click.Path(exists=True, dir_okay=False, resolve_path=True),
+)
+def index(recipe_files):
+    """Index the collections of RECIPE_FILES for --recipe-index."""
+
+    from .recipe_index import RecipeIndex, default_directory
+
+    recipe_index = RecipeIndex(default_directory())
+    for recipe_file in recipe_files:
+        recipe_data = recipe_index.build(recipe_file)
+        LOG.info('Indexed %d collections of %s',
+                 len(recipe_data['collections']), recipe_file)
+
+
+@click.group(cls=DefaultGroup, default_command='build')
+@verbose_option
+def main():
+    """Download and build RPMs listed in a recipe file.
+
+    The build command is run if no command is named.
+    """
+
+
+main.add_command(run, name='build')
+main.add_command(recipe)
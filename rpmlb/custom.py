@@ -1,38 +1,116 @@
+import functools
 import logging
+from typing import Any, Dict, Iterator, List, Mapping, Optional
 
 from rpmlb import utils
 from rpmlb.yaml import Yaml
 
 LOG = logging.getLogger(__name__)
 
+#: Keys of the command lists in the custom file
+KEYS = ('before_download', 'download', 'before_build', 'build')
+
 
 class Custom:
-    """A class to manage custom file."""
+    """A class to manage custom file.
+
+    The file is read and validated once, and the commands of each key
+    are compiled into one shell script, so that running them costs
+    a single shell process. Each command still runs in a subshell,
+    so that a "cd" or a variable does not leak into the next one.
+    """
 
     def __init__(self, file_path):
         self._file_path = file_path
-        self._yaml_content = None
+        self._cmds = self._read_cmds(file_path)
+        self._scripts = {
+            key: compile_script(cmds) for key, cmds in self._cmds.items()
+        }
 
-    def run_cmds(self, key, **kwargs):
-        env = {}
-        # Support environment variable to use PKG as pacakge name in the file.
-        if 'name' in kwargs:
-            env['PKG'] = kwargs['name']
+    def run_cmds(self, key, cwd=None, log_file=None, **kwargs):
+        """Run the commands of the key as one script.
 
-        for cmd in self.each_yaml_cmd(key):
-            utils.run_cmd(cmd, env=env)
+        Keyword arguments:
+            key: The key in the custom file, such as 'build'.
+            cwd: The directory to run the commands in.
+            log_file: The file the output is appended to, or None.
+            **kwargs: The package metadata exported to the commands.
+        """
 
-    def each_yaml_cmd(self, key):
-        cmd_dict = self._get_yaml_content(self._file_path)
-        if key not in cmd_dict:
+        script = self.script(key)
+        if script is None:
             return
-        cmds = cmd_dict[key]
-        for cmd in cmds:
-            yield cmd
-
-    def _get_yaml_content(self, file_path):
-        if self._yaml_content:
-            return self._yaml_content
-        yaml = Yaml(file_path)
-        self._yaml_content = yaml.content
-        return self._yaml_content
+        utils.run_cmd(script, cwd=cwd, env=package_env(kwargs),
+                      log_file=log_file)
+
+    def script(self, key) -> Optional[str]:
+        """The compiled script of the key, or None without commands."""
+
+        return self._scripts.get(key)
+
+    def each_yaml_cmd(self, key) -> Iterator[str]:
+        yield from self._cmds.get(key, [])
+
+    @staticmethod
+    def _read_cmds(file_path) -> Dict[str, List[str]]:
+        content = Yaml(file_path).content
+        if content is None:
+            return {}
+        if not isinstance(content, Mapping):
+            raise ValueError('Invalid custom file {0}: not a mapping'.format(
+                file_path))
+
+        cmd_dict = {}
+        for key, cmds in content.items():
+            if key not in KEYS:
+                LOG.warning('Unknown key %s in custom file %s',
+                            key, file_path)
+                continue
+            if cmds is None:
+                continue
+            if not isinstance(cmds, list) or not all(
+                    isinstance(cmd, str) for cmd in cmds):
+                message = (
+                    'Invalid custom file {0}: '
+                    '{1} is not a list of commands'
+                ).format(file_path, key)
+                raise ValueError(message)
+            if cmds:
+                cmd_dict[key] = cmds
+        return cmd_dict
+
+
+@functools.lru_cache(maxsize=None)
+def load(file_path) -> Custom:
+    """Read the custom file once per process."""
+
+    return Custom(file_path)
+
+
+def compile_script(cmds: List[str]) -> str:
+    """Compile the commands into one shell script.
+
+    The script stops at the first failed command with its exit status.
+    """
+
+    return ''.join(
+        '(\n{0}\n) || exit $?\n'.format(cmd.rstrip('\n')) for cmd in cmds
+    )
+
+
+def package_env(package_dict: Mapping[str, Any]) -> Dict[str, str]:
+    """Environment variables describing the package.
+
+    PKG is the package name, and the other scalar metadata
+    such as bootstrap_position are PKG_<KEY>.
+    """
+
+    env = {}
+    for key, value in package_dict.items():
+        if value is None or isinstance(value, (Mapping, list)):
+            continue
+        if key == 'name':
+            env['PKG'] = str(value)
+        else:
+            env['PKG_{0}'.format(key.upper())] = str(value)
+    return env
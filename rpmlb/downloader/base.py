@@ -1,6 +1,11 @@
+"""Module containing the downloader logics."""
 import logging
+import os
+import shutil
+from collections import OrderedDict
+from concurrent import futures
 
-from .. import utils
+from .. import journal, plugins, trace
 
 LOG = logging.getLogger(__name__)
 
@@ -16,24 +21,20 @@ class BaseDownloader:
         """Dynamically instantiate named downloader.
 
         Keyword arguments:
-            name: Name of the requested builder.
+            name: Name of the requested downloader.
 
         Returns:
-            Instance of the requested builder.
-        """
+            Instance of the requested downloader.
 
-        class_name = 'rpmlb.downloader.{0}.{1}Downloader'.format(
-            name,
-            utils.camelize(name)
-        )
-        instance = utils.get_instance(class_name)
+        Raises:
+            ValueError: No downloader has the name.
+        """
 
-        LOG.debug('Loaded downloader with %s', name)
-        return instance
+        return plugins.DOWNLOADERS.create(name)
 
     def run(self, work, **kwargs):
-        is_resume = kwargs.get('resume', False)
-        if is_resume:
+        resume = kwargs.get('resume', False)
+        if resume and resume != journal.AUTO_RESUME:
             message = (
                 'Skip the download process, '
                 'because the resume option was used.'
@@ -41,14 +42,91 @@ class BaseDownloader:
             LOG.info(message)
             return True
 
-        self.before(work, **kwargs)
+        packages = list(work.each_num_dir())
+        if resume == journal.AUTO_RESUME:
+            packages = self.packages_to_resume(work, packages)
+            if not packages:
+                LOG.info('Skip the download process, '
+                         'all the packages are downloaded.')
+                return True
+
+        with trace.span('before', 'downloader'):
+            self.before(work, **kwargs)
+
+        jobs = kwargs.get('download_jobs') or 1
+        if jobs > 1:
+            self.download_concurrently(work, jobs, packages=packages,
+                                       **kwargs)
+        else:
+            for package_dict, num_name, num_dir in packages:
+                try:
+                    self.download_and_record(work, package_dict, num_name,
+                                             num_dir, **kwargs)
+                except Exception as e:
+                    if not kwargs.get('keep_going'):
+                        raise
+                    LOG.error('Download failed: %s at %s: %s',
+                              package_dict['name'], num_name, e)
+                    work.report.add_failure(num_name, package_dict['name'],
+                                            'download', e)
+
+        with trace.span('after', 'downloader'):
+            self.after(work, **kwargs)
+        return True
 
-        for package_dict, num_name in work.each_num_dir():
-            # TODO(Run it with asynchronous)
-            self.download(package_dict, **kwargs)
+    def download_concurrently(self, work, jobs: int, packages=None,
+                              **kwargs):
+        """Download all packages with a bounded pool of workers.
 
-        self.after(work, **kwargs)
-        return True
+        Keyword arguments:
+            work: The Work instance providing the numbered directories.
+            jobs: Maximal number of downloads running at the same time.
+            packages: Iterable of (package_dict, num_name, num_dir)
+                to download, all the packages of the work by default.
+            **kwargs: Options passed to download().
+
+        Raises:
+            RuntimeError: Some of the packages failed to download.
+                With the keep_going option, they are added to
+                the report of the work instead.
+        """
+
+        LOG.info('Downloading with %d jobs.', jobs)
+
+        failures = []
+        with futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            future_map = OrderedDict()
+            if packages is None:
+                packages = work.each_num_dir()
+            for package_dict, num_name, num_dir in packages:
+                future = executor.submit(
+                    self.download_and_record, work, package_dict, num_name,
+                    num_dir, **kwargs
+                )
+                future_map[future] = (package_dict, num_name)
+
+            for future in futures.as_completed(future_map):
+                package_dict, num_name = future_map[future]
+                error = future.exception()
+                if error is None:
+                    LOG.debug('Downloaded %s at %s',
+                              package_dict['name'], num_name)
+                    continue
+
+                LOG.error('Download failed: %s at %s: %s',
+                          package_dict['name'], num_name, error)
+                failures.append((num_name, package_dict['name']))
+                if kwargs.get('keep_going'):
+                    work.report.add_failure(num_name, package_dict['name'],
+                                            'download', error)
+
+        if failures and not kwargs.get('keep_going'):
+            failed = ', '.join(
+                '{0} ({1})'.format(*failure) for failure in sorted(failures)
+            )
+            message = 'failed packages: {0}, work_dir: {1}'.format(
+                failed, work.working_dir)
+            raise RuntimeError(message)
 
     def before(self, work, **kwargs):
         pass
@@ -56,5 +134,59 @@ class BaseDownloader:
     def after(self, work, **kwargs):
         pass
 
-    def download(self, package_dict, **kwargs):
+    @staticmethod
+    def packages_to_resume(work, packages):
+        """Select the packages to download again from the journal.
+
+        An incomplete package directory is removed first.
+
+        Keyword arguments:
+            work: The Work instance.
+            packages: Iterable of (package_dict, num_name, num_dir).
+
+        Returns:
+            List of (package_dict, num_name, num_dir) to download.
+        """
+
+        selected = []
+        for package_dict, num_name, num_dir in packages:
+            package_dir = os.path.join(num_dir, package_dict['name'])
+            phase = work.journal.next_phase(num_name, package_dict['name'],
+                                            package_dir)
+            if phase != journal.DOWNLOAD:
+                LOG.debug('Skip downloading %s at %s, already downloaded.',
+                          package_dict['name'], num_name)
+                continue
+
+            if os.path.isdir(package_dir):
+                LOG.info('Removing the incomplete download of %s at %s',
+                         package_dict['name'], num_name)
+                shutil.rmtree(package_dir)
+            selected.append((package_dict, num_name, num_dir))
+        return selected
+
+    def download_and_record(self, work, package_dict, num_name, num_dir,
+                            **kwargs):
+        """Download single package, recording it in the journal."""
+
+        self.download_package(package_dict, num_dir, **kwargs)
+        work.journal.record(num_name, package_dict['name'], journal.DOWNLOAD)
+
+    def download_package(self, package_dict, num_dir, **kwargs):
+        """Download single package, recording its trace span."""
+
+        with trace.span(package_dict['name'], 'download',
+                        num=os.path.basename(num_dir)):
+            self.download(package_dict, num_dir, **kwargs)
+
+    def download(self, package_dict, num_dir, **kwargs):
+        """Download single package.
+
+        Keyword arguments:
+            package_dict: A dictionary of package metadata.
+            num_dir: The numbered directory to download the package into.
+                The package directory is created inside of it.
+            **kwargs: Command line options.
+        """
+
         raise NotImplementedError('Implement this method.')
@@ -1,6 +1,6 @@
 import logging
 
-from rpmlb.custom import Custom
+from rpmlb import custom
 from rpmlb.downloader.base import BaseDownloader
 
 LOG = logging.getLogger(__name__)
@@ -9,21 +9,17 @@ LOG = logging.getLogger(__name__)
 class CustomDownloader(BaseDownloader):
     """A custom downloader class."""
 
-    def __init__(self):
-        self._yaml_content = None
-
     def before(self, work, **kwargs):
         custom_file = kwargs['custom_file']
         if not custom_file:
             raise ValueError('custom_file is required.')
 
-        custom = Custom(custom_file)
-        custom.run_cmds('before_download')
+        custom.load(custom_file).run_cmds('before_download')
 
-    def download(self, package_dict, **kwargs):
+    def download(self, package_dict, num_dir, **kwargs):
         custom_file = kwargs['custom_file']
         if not custom_file:
             raise ValueError('custom_file is required.')
 
-        custom = Custom(custom_file)
-        custom.run_cmds('download', **package_dict)
+        custom.load(custom_file).run_cmds('download', cwd=num_dir,
+                                          **package_dict)
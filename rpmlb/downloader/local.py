@@ -2,10 +2,18 @@ import logging
 import os
 import shutil
 
+from rpmlb import utils
 from rpmlb.downloader.base import BaseDownloader
 
 LOG = logging.getLogger(__name__)
 
+#: Functions copying a file for each copy mode
+COPY_FUNCTIONS = {
+    'copy': shutil.copy2,
+    'hardlink': utils.link_or_copy,
+    'reflink': utils.reflink_or_copy,
+}
+
 
 class LocalDownloader(BaseDownloader):
     """A downloader class to copy a pacakge from source directory."""
@@ -13,7 +21,7 @@ class LocalDownloader(BaseDownloader):
     def __init__(self):
         pass
 
-    def download(self, package_dict, **kwargs):
+    def download(self, package_dict, num_dir, **kwargs):
         if not package_dict:
             raise ValueError('package_dict is required.')
         if 'source_directory' not in kwargs or not kwargs['source_directory']:
@@ -21,8 +29,12 @@ class LocalDownloader(BaseDownloader):
         src_dir = kwargs['source_directory']
         package = package_dict['name']
         src_package_dir = os.path.join(src_dir, package)
-        dst_package_dir = os.path.join(os.getcwd(), package)
-        LOG.debug('Copying %s to %s .', src_package_dir, dst_package_dir)
+        dst_package_dir = os.path.join(num_dir, package)
+        copy_mode = kwargs.get('local_copy_mode') or 'copy'
+        if copy_mode not in COPY_FUNCTIONS:
+            raise ValueError('Invalid copy mode: {0}'.format(copy_mode))
+        LOG.debug('Copying %s to %s with %s mode.',
+                  src_package_dir, dst_package_dir, copy_mode)
 
         def ignore_symlinks(directory, files):
             ignored_files = []
@@ -37,5 +49,6 @@ class LocalDownloader(BaseDownloader):
             src_package_dir,
             dst_package_dir,
             ignore=ignore_symlinks,
-            symlinks=True
+            symlinks=True,
+            copy_function=COPY_FUNCTIONS[copy_mode],
         )
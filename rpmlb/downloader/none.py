@@ -8,5 +8,5 @@ LOG = logging.getLogger(__name__)
 class NoneDownloader(BaseDownloader):
     """A downloader class to do nothing."""
 
-    def download(self, package_dict, **kwargs):
+    def download(self, package_dict, num_dir, **kwargs):
         pass
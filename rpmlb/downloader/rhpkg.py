@@ -1,6 +1,9 @@
+import fcntl
 import logging
 import os
+import shutil
 import subprocess
+from contextlib import contextmanager
 
 from rpmlb.downloader.base import BaseDownloader
 
@@ -10,16 +13,20 @@ LOG = logging.getLogger(__name__)
 class RhpkgDownloader(BaseDownloader):
     """A downloader class to get a pacakge with rhpkg command."""
 
-    def download(self, package_dict, **kwargs):
+    def download(self, package_dict, num_dir, **kwargs):
         if not package_dict:
             raise ValueError('package_dict is required.')
         if 'branch' not in kwargs or not kwargs['branch']:
             raise ValueError('branch is required.')
         branch = kwargs['branch']
 
-        self.do_rhpkg_and_checkout(package_dict, branch)
+        mirror_dir = kwargs.get('rhpkg_mirror')
+        if mirror_dir:
+            self.clone_from_mirror(package_dict, branch, num_dir, mirror_dir)
+        else:
+            self.do_rhpkg_and_checkout(package_dict, branch, num_dir)
 
-    def do_rhpkg_and_checkout(self, package_dict, branch):
+    def do_rhpkg_and_checkout(self, package_dict, branch, num_dir):
         if not package_dict:
             raise ValueError('package_dict is required.')
         if not branch:
@@ -28,8 +35,93 @@ class RhpkgDownloader(BaseDownloader):
         package = package_dict['name']
 
         LOG.debug('rhpkg co %s', package)
-        subprocess.check_call(['rhpkg', 'co', package])
-        LOG.debug('cd %s', package)
-        os.chdir(package)
-        LOG.debug('git checkout %s', branch)
-        subprocess.check_call(['git', 'checkout', branch])
+        subprocess.check_call(['rhpkg', 'co', package], cwd=num_dir)
+        package_dir = os.path.join(num_dir, package)
+        LOG.debug('git checkout %s at %s', branch, package_dir)
+        subprocess.check_call(['git', 'checkout', branch], cwd=package_dir)
+
+    def clone_from_mirror(self, package_dict, branch, num_dir, mirror_dir):
+        """Check out the package through a local bare mirror repository.
+
+        The mirror is created from the first checkout by rhpkg,
+        and later only updated by an incremental fetch.
+        The package is then cloned locally from the mirror,
+        with the server set as its origin for rhpkg.
+
+        Keyword arguments:
+            package_dict: A dictionary of package metadata.
+            branch: The branch to check out.
+            num_dir: The numbered directory to download the package into.
+            mirror_dir: The directory keeping the mirror repositories.
+        """
+
+        package = package_dict['name']
+        package_dir = os.path.join(num_dir, package)
+        mirror_path = os.path.join(mirror_dir, package + '.git')
+        os.makedirs(mirror_dir, exist_ok=True)
+
+        with _locked(mirror_path + '.lock'):
+            if not os.path.isdir(mirror_path):
+                self.do_rhpkg_and_checkout(package_dict, branch, num_dir)
+                self.create_mirror(package_dir, mirror_path)
+                return
+
+            LOG.debug('git fetch at %s', mirror_path)
+            subprocess.check_call(['git', 'fetch', '--prune', 'origin'],
+                                  cwd=mirror_path)
+
+            LOG.debug('git clone %s to %s', mirror_path, package_dir)
+            subprocess.check_call([
+                'git', 'clone', '--quiet', '--single-branch',
+                '--branch', branch, mirror_path, package_dir,
+            ])
+
+        url = _origin_url(mirror_path)
+        subprocess.check_call(['git', 'remote', 'set-url', 'origin', url],
+                              cwd=package_dir)
+
+    @staticmethod
+    def create_mirror(package_dir, mirror_path):
+        """Create a bare mirror repository from a fresh checkout.
+
+        Keyword arguments:
+            package_dir: The checked out package.
+            mirror_path: The path of the new mirror repository.
+        """
+
+        LOG.debug('Creating mirror %s', mirror_path)
+        url = _origin_url(package_dir)
+
+        tmp_path = mirror_path + '.tmp'
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+
+        subprocess.check_call(['git', 'clone', '--quiet', '--mirror',
+                               package_dir, tmp_path])
+        subprocess.check_call(['git', 'remote', 'set-url', 'origin', url],
+                              cwd=tmp_path)
+        # Replace the refs of the checkout by the refs on the server.
+        subprocess.check_call(['git', 'fetch', '--prune', 'origin'],
+                              cwd=tmp_path)
+        os.rename(tmp_path, mirror_path)
+
+
+def _origin_url(repo_path):
+    output = subprocess.check_output(
+        ['git', 'config', '--get', 'remote.origin.url'], cwd=repo_path)
+    return output.decode('utf-8').strip()
+
+
+@contextmanager
+def _locked(lock_path):
+    """Hold an exclusive lock for the mirror.
+
+    The lock is shared among threads and other processes.
+    """
+
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,140 @@
+"""Module to record the completed phases of each package of a work."""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Mapping, Optional
+
+from . import utils
+
+LOG = logging.getLogger(__name__)
+
+#: Name of the journal file in the work directory
+JOURNAL_FILE_NAME = 'journal.jsonl'
+
+#: Value of the resume option continuing from the journal
+AUTO_RESUME = 'auto'
+
+#: Phases of a package, in the processing order
+DOWNLOAD = 'download'
+PREPARE = 'prepare'
+BUILD = 'build'
+
+#: Phase of the whole work, run by the builder before the first build
+BEFORE_BUILD = 'before_build'
+
+
+class Journal:
+    """A class to record the completed phases in the work directory.
+
+    Each completed phase is appended as a JSON line with the fingerprint
+    of the package directory, so that a resumed run can tell
+    which phases are still valid. A later line of the same package
+    and phase replaces the earlier one, and a line that cannot be read,
+    such as the last one of an interrupted run, is ignored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as journal_file:
+                lines = journal_file.readlines()
+        except FileNotFoundError:
+            return
+
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                key = (entry['num'], entry['phase'])
+            except (ValueError, TypeError, KeyError):
+                LOG.debug('Ignoring journal line: %r', line)
+                continue
+            self._entries[key] = entry
+
+    def record(self, num_name: Optional[str], name: Optional[str],
+               phase: str, package_fingerprint: Optional[str] = None):
+        """Append a completed phase.
+
+        Keyword arguments:
+            num_name: The numbered directory name, or None for the work.
+            name: The package name, or None for the work.
+            phase: One of the phases, such as DOWNLOAD.
+            package_fingerprint: The package files, as from fingerprint().
+                Only the prepare and build phases need it.
+        """
+
+        entry = {
+            'num': num_name,
+            'name': name,
+            'phase': phase,
+            'fingerprint': package_fingerprint,
+            'time': time.time(),
+        }
+        line = json.dumps(entry, sort_keys=True) + '\n'
+        with self._lock:
+            with open(self.path, 'a') as journal_file:
+                journal_file.write(line)
+            self._entries[(num_name, phase)] = entry
+
+    def entry(self, num_name: Optional[str],
+              phase: str) -> Optional[Mapping[str, Any]]:
+        """Find the latest entry of the phase, or None if never completed.
+        """
+
+        with self._lock:
+            return self._entries.get((num_name, phase))
+
+    def next_phase(self, num_name: str, name: str,
+                   package_dir: str) -> Optional[str]:
+        """Find the first phase of a package to run again.
+
+        A package is downloaded again only if its directory is missing
+        or its download has not completed. A package with contents
+        other than the prepared or built ones, such as a SPEC file fixed
+        by hand, is prepared and built again.
+
+        Returns:
+            The phase, or None if the package is built from its contents.
+        """
+
+        download = self.entry(num_name, DOWNLOAD)
+        if (download is None or download['name'] != name or
+                not os.path.isdir(package_dir)):
+            return DOWNLOAD
+
+        package_fingerprint = fingerprint(package_dir)
+        for phase, next_phase in ((BUILD, None), (PREPARE, BUILD)):
+            entry = self.entry(num_name, phase)
+            if (entry is not None and entry['name'] == name and
+                    entry.get('fingerprint') == package_fingerprint):
+                return next_phase
+        return PREPARE
+
+
+def fingerprint(package_dir: str) -> Optional[str]:
+    """Fingerprint the files of a package directory.
+
+    Only the names, sizes and modification times of the files
+    of utils.package_files() are read, so that the contents
+    are not read again for each phase of each package.
+
+    Returns:
+        Hexadecimal digest, or None if the directory does not exist.
+    """
+
+    if not os.path.isdir(package_dir):
+        return None
+
+    digest = hashlib.sha256()
+    for file_name in utils.package_files(package_dir):
+        stat = os.stat(os.path.join(package_dir, file_name))
+        digest.update('{0}\0{1}\0{2}\0'.format(
+            file_name, stat.st_size, stat.st_mtime_ns).encode('utf-8'))
+    return digest.hexdigest()
@@ -0,0 +1,141 @@
+"""Module to download and build packages in a pipeline."""
+import functools
+import logging
+import os
+from concurrent import futures
+
+from . import journal, trace
+from .scheduler import DependencyResolver, Scheduler
+
+LOG = logging.getLogger(__name__)
+
+
+def run(downloader, builder, work, **kwargs):
+    """Download and build the packages at the same time.
+
+    All the downloads are started in the recipe order.
+    A package is prepared as soon as it is downloaded, and it is built
+    as soon as the packages it depends on are built,
+    while the following packages are still being downloaded.
+    The dependencies are resolved against the previous packages only,
+    so a package is scheduled after all the previous ones are downloaded.
+    With the keep_going option, a failed package only skips
+    the packages depending on it. When resuming from a package number,
+    nothing is downloaded and the previous packages are not built.
+    When resuming from the journal, only the packages not downloaded
+    yet are downloaded.
+
+    Keyword arguments:
+        downloader: The downloader instance.
+        builder: The builder instance.
+        work: The Work instance.
+        **kwargs: Command line options.
+    """
+
+    download_jobs = kwargs.get('download_jobs') or 1
+    build_jobs = kwargs.get('build_jobs') or 1
+    LOG.info('Pipeline with %d download jobs and %d build jobs.',
+             download_jobs, build_jobs)
+
+    cache = builder.open_cache(**kwargs)
+    spec_cache = builder.open_spec_cache(**kwargs)
+    resolver = DependencyResolver()
+    is_before_completed = False
+    keep_going = kwargs.get('keep_going', False)
+
+    packages = list(work.each_num_dir())
+    resume = kwargs.get('resume', False)
+    if resume == journal.AUTO_RESUME:
+        download_nums = {
+            num_name for _, num_name, _ in
+            downloader.packages_to_resume(work, packages)
+        }
+    elif resume:
+        download_nums = set()
+        packages = [package for package in packages
+                    if int(package[1]) >= resume]
+    else:
+        download_nums = {num_name for _, num_name, _ in packages}
+
+    if download_nums:
+        with trace.span('before', 'downloader'):
+            downloader.before(work, **kwargs)
+
+    downloads = []
+    executor = futures.ThreadPoolExecutor(max_workers=download_jobs)
+    try:
+        for package_dict, num_name, num_dir in packages:
+            if num_name in download_nums:
+                download = executor.submit(
+                    downloader.download_and_record, work, package_dict,
+                    num_name, num_dir, **kwargs
+                )
+            else:
+                # Downloaded by a previous run
+                download = futures.Future()
+                download.set_result(None)
+            downloads.append(download)
+
+        with Scheduler(build_jobs, keep_going=keep_going) as \
+                build_scheduler:
+            for (package_dict, num_name, num_dir), download in zip(
+                    packages, downloads):
+                if build_scheduler.failed and not keep_going:
+                    break
+
+                package_dir = os.path.join(num_dir, package_dict['name'])
+                error = None
+                if keep_going:
+                    error = download.exception()
+                    if error is not None:
+                        LOG.error('Download failed: %s at %s: %s',
+                                  package_dict['name'], num_name, error)
+                        work.report.add_failure(num_name,
+                                                package_dict['name'],
+                                                'download', error)
+                    error = builder.prepare_or_report(
+                        work, package_dict, num_name, package_dir, **kwargs)
+                else:
+                    with builder.package_error_context(work, package_dict,
+                                                       num_name):
+                        download.result()
+                        builder.prepare_and_record(work, package_dict,
+                                                   num_name, package_dir,
+                                                   **kwargs)
+
+                spec = builder.read_spec(package_dict, package_dir,
+                                         cache=spec_cache)
+                dependencies = resolver.add(num_name, package_dict['name'],
+                                            spec, is_failed=error is not None)
+
+                if not is_before_completed:
+                    builder.complete_before(work, **kwargs)
+                    is_before_completed = True
+
+                if error is not None:
+                    build_scheduler.add_failure(num_name, error)
+                    continue
+
+                task = functools.partial(
+                    builder.build_task, work, package_dict, num_name,
+                    package_dir, cache=cache, **kwargs)
+                build_scheduler.add(num_name, task, dependencies)
+
+            build_scheduler.wait()
+
+        if keep_going:
+            builder.report_skipped(work, build_scheduler, {
+                num_name: package_dict['name']
+                for package_dict, num_name, num_dir in packages
+            })
+    finally:
+        for download in downloads:
+            download.cancel()
+        executor.shutdown(wait=True)
+
+    if download_nums:
+        with trace.span('after', 'downloader'):
+            downloader.after(work, **kwargs)
+    with trace.span('after', 'builder'):
+        builder.after(work, **kwargs)
+    return not (keep_going and work.report.failed)
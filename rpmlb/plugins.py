@@ -0,0 +1,121 @@
+"""Module to find the builder and downloader classes.
+
+The built-in classes are known without importing anything.
+Other packages add classes as entry points in the 'rpmlb.builders'
+and 'rpmlb.downloaders' groups, which are discovered only when
+a name is not built in, because the discovery is slow.
+"""
+import importlib
+import logging
+import threading
+from collections import OrderedDict
+
+LOG = logging.getLogger(__name__)
+
+#: Entry point group of the builder classes
+BUILDER_GROUP = 'rpmlb.builders'
+
+#: Entry point group of the downloader classes
+DOWNLOADER_GROUP = 'rpmlb.downloaders'
+
+
+class Registry:
+    """Classes of one kind by their names."""
+
+    def __init__(self, kind: str, group: str, builtins):
+        """Create the registry.
+
+        Keyword arguments:
+            kind: Kind of the classes for the messages, such as 'builder'.
+            group: The entry point group of the plugins.
+            builtins: Pairs of the name and the 'module:class' path.
+        """
+
+        self.kind = kind
+        self.group = group
+        self.builtins = OrderedDict(builtins)
+        self._plugins = None
+        self._lock = threading.Lock()
+
+    @property
+    def builtin_names(self):
+        return list(self.builtins)
+
+    def names(self):
+        """All the names including the plugins."""
+
+        names = self.builtin_names
+        names.extend(name for name in sorted(self.plugins())
+                     if name not in self.builtins)
+        return names
+
+    def plugins(self):
+        """The entry points of the plugins, discovered once."""
+
+        with self._lock:
+            if self._plugins is None:
+                self._plugins = OrderedDict(
+                    (entry_point.name, entry_point)
+                    for entry_point in _entry_points(self.group)
+                )
+                LOG.debug('Discovered %d %s plugins',
+                          len(self._plugins), self.kind)
+        return self._plugins
+
+    def __contains__(self, name):
+        return name in self.builtins or name in self.plugins()
+
+    def load(self, name: str) -> type:
+        """Import the named class.
+
+        Raises:
+            ValueError: No class has the name.
+        """
+
+        if name in self.builtins:
+            module_name, class_name = self.builtins[name].split(':')
+            module = importlib.import_module(module_name)
+            return getattr(module, class_name)
+
+        entry_point = self.plugins().get(name)
+        if entry_point is None:
+            message = 'Unknown {0}: {1}, available: {2}'.format(
+                self.kind, name, ', '.join(self.names()))
+            raise ValueError(message)
+        return entry_point.load()
+
+    def create(self, name: str, *args, **kwargs):
+        """Instantiate the named class."""
+
+        instance = self.load(name)(*args, **kwargs)
+        LOG.debug('Loaded %s with %s', self.kind, name)
+        return instance
+
+
+def _entry_points(group):
+    try:
+        from importlib import metadata
+    except ImportError:  # Python < 3.8
+        import pkg_resources
+        return list(pkg_resources.iter_entry_points(group))
+
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, 'select'):
+        return list(entry_points.select(group=group))
+    return list(entry_points.get(group, ()))
+
+
+BUILDERS = Registry('builder', BUILDER_GROUP, [
+    ('dummy', 'rpmlb.builder.dummy:DummyBuilder'),
+    ('mock', 'rpmlb.builder.mock:MockBuilder'),
+    ('mock-chain', 'rpmlb.builder.mock_chain:MockChainBuilder'),
+    ('copr', 'rpmlb.builder.copr:CoprBuilder'),
+    ('custom', 'rpmlb.builder.custom:CustomBuilder'),
+])
+
+DOWNLOADERS = Registry('downloader', DOWNLOADER_GROUP, [
+    ('none', 'rpmlb.downloader.none:NoneDownloader'),
+    ('local', 'rpmlb.downloader.local:LocalDownloader'),
+    ('rhpkg', 'rpmlb.downloader.rhpkg:RhpkgDownloader'),
+    ('custom', 'rpmlb.downloader.custom:CustomDownloader'),
+])
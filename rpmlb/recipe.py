@@ -1,17 +1,80 @@
 import logging
 from collections import Counter
 from itertools import starmap
-from typing import Iterator, Mapping, Union
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Mapping, Tuple, Union
 
+from rpmlb.recipe_index import RecipeIndex
 from rpmlb.yaml import Yaml
 
 LOG = logging.getLogger(__name__)
 
 
+class PackageEntry(Mapping):
+    """An immutable normalized package of the recipe.
+
+    The entry is a read-only mapping with the same keys as the package
+    dictionary had, and the common values as attributes.
+    """
+
+    __slots__ = ('_data', 'position', 'name', 'bootstrap_position',
+                 'macros', 'replaced_macros')
+
+    def __init__(self, position: int, data: Mapping[str, Any]):
+        """Create the entry.
+
+        Keyword arguments:
+            position: The position of the package in the recipe,
+                starting from 1.
+            data: The normalized package data with name
+                and bootstrap_position.
+        """
+
+        data = {
+            key: MappingProxyType(dict(value))
+            if isinstance(value, Mapping) else value
+            for key, value in data.items()
+        }
+        set_attribute = super().__setattr__
+        set_attribute('_data', data)
+        set_attribute('position', position)
+        set_attribute('name', data['name'])
+        set_attribute('bootstrap_position', data['bootstrap_position'])
+        set_attribute('macros', data.get('macros'))
+        set_attribute('replaced_macros', data.get('replaced_macros'))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('PackageEntry is immutable.')
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return repr({
+            key: dict(value) if isinstance(value, MappingProxyType) else value
+            for key, value in self._data.items()
+        })
+
+
 class Recipe:
     """A class to describe recipe data."""
 
-    def __init__(self, file_path, collection_id):
+    def __init__(self, file_path, collection_id, index_directory=None):
+        """Load the collection from the recipe file.
+
+        Keyword arguments:
+            file_path: The recipe file.
+            collection_id: The ID of the collection in the recipe file.
+            index_directory: The recipe index directory to load
+                the collection from, or None to parse the whole file.
+        """
+
         if not file_path:
             raise ValueError('file_path is required.')
         if not collection_id:
@@ -19,17 +82,36 @@ class Recipe:
 
         self._collection_id = collection_id
 
-        yaml = Yaml(file_path)
+        if index_directory:
+            index = RecipeIndex(index_directory)
+            self.recipe = index.load(file_path, collection_id)
+        else:
+            yaml = Yaml(file_path, key=collection_id)
+            recipe_dict = yaml.content
+            self.recipe = recipe_dict[collection_id]
         LOG.debug('Loaded recipe: %s', file_path)
-        recipe_dict = yaml.content
-        self.recipe = recipe_dict[collection_id]
         self.num_of_package = len(self.recipe['packages'])
+        self._packages = None
+
+    @property
+    def packages(self) -> Tuple[PackageEntry, ...]:
+        """The packages normalized once, in the recipe order."""
+
+        if self._packages is None:
+            self._packages = tuple(
+                PackageEntry(position, package_dict)
+                for position, package_dict in enumerate(
+                    self._normalize_packages(), start=1)
+            )
+        return self._packages
 
     def each_normalized_package(self):
         """Present recipe packages in normalized form.
 
+        The packages are normalized only once.
+
         Yields:
-            Dictionary with the package's data.
+            PackageEntry with the package's data.
 
         Common keys in the yielded dictionary:
             - name: The package's name
@@ -39,6 +121,11 @@ class Recipe:
                 macro body.
         """
 
+        yield from self.packages
+
+    def _normalize_packages(self) -> Iterator[Dict[str, Any]]:
+        """Normalize the raw recipe packages to dictionaries."""
+
         packages = self.recipe['packages']
         bootstrap_map = self._count_bootstrap_sequences()
 
@@ -0,0 +1,149 @@
+"""Module to index the collections of the recipe files."""
+import hashlib
+import logging
+import os
+import pickle
+from typing import Any, Dict, Mapping, Optional
+
+from . import utils
+from .yaml import Yaml
+
+LOG = logging.getLogger(__name__)
+
+#: Version of the index format; change it to invalidate all indexes
+INDEX_VERSION = 1
+
+#: Name of the file describing the indexed recipe file
+INDEX_FILE_NAME = 'index.pickle'
+
+
+def default_directory() -> str:
+    """Directory of the recipe indexes in the user cache directory."""
+
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'rpmlb', 'recipes')
+
+
+class RecipeIndex:
+    """A class to keep each collection of the recipe files pickled.
+
+    A recipe file is indexed as a directory with a small index file
+    and one pickle file per collection, so that loading a collection
+    does not parse the whole YAML file. The index is valid as long as
+    the modification time and the size of the recipe file are same,
+    or else as long as its hash is same.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or default_directory()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def recipe_dir(self, file_path: str) -> str:
+        path_hash = hashlib.sha256(
+            os.path.abspath(file_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, path_hash[:32])
+
+    def load(self, file_path: str, collection_id: str) -> Any:
+        """Load one collection, indexing the recipe file if needed.
+
+        Keyword arguments:
+            file_path: The recipe file.
+            collection_id: The ID of the loaded collection.
+
+        Returns:
+            Data of the collection.
+
+        Raises:
+            KeyError: The collection is not in the recipe file.
+        """
+
+        index = self._valid_index(file_path)
+        if index is None:
+            index = self.build(file_path)
+
+        collection_path = os.path.join(self.recipe_dir(file_path),
+                                       index['collections'][collection_id])
+        with open(collection_path, 'rb') as collection_file:
+            collection = pickle.load(collection_file)
+        LOG.debug('Loaded %s from the recipe index %s',
+                  collection_id, collection_path)
+        return collection
+
+    def build(self, file_path: str) -> Dict[str, Any]:
+        """Index all the collections of the recipe file.
+
+        Returns:
+            The index data.
+        """
+
+        stat = os.stat(file_path)
+        file_hash = _file_hash(file_path)
+        content = Yaml(file_path).content
+        if not isinstance(content, Mapping):
+            raise ValueError('Invalid recipe file: {0}'.format(file_path))
+
+        recipe_dir = self.recipe_dir(file_path)
+        os.makedirs(recipe_dir, exist_ok=True)
+
+        collections = {}
+        for number, (collection_id, collection) in enumerate(
+                content.items()):
+            # Keep the collections of different contents apart,
+            # so that a reader never mixes them up.
+            file_name = '{0}-{1}.pickle'.format(file_hash[:16], number)
+            utils.dump_pickle(collection, os.path.join(recipe_dir, file_name))
+            collections[collection_id] = file_name
+
+        index = {
+            'version': INDEX_VERSION,
+            'path': os.path.abspath(file_path),
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'hash': file_hash,
+            'collections': collections,
+        }
+        utils.dump_pickle(index, os.path.join(recipe_dir, INDEX_FILE_NAME))
+
+        # Remove the collections of the previous contents.
+        for file_name in os.listdir(recipe_dir):
+            if (file_name.endswith('.pickle') and
+                    file_name != INDEX_FILE_NAME and
+                    not file_name.startswith(file_hash[:16])):
+                os.unlink(os.path.join(recipe_dir, file_name))
+
+        LOG.debug('Indexed %d collections of %s in %s',
+                  len(collections), file_path, recipe_dir)
+        return index
+
+    def _valid_index(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """Read the index of the recipe file if it is up to date."""
+
+        index_path = os.path.join(self.recipe_dir(file_path),
+                                  INDEX_FILE_NAME)
+        try:
+            with open(index_path, 'rb') as index_file:
+                index = pickle.load(index_file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        if index.get('version') != INDEX_VERSION:
+            return None
+
+        stat = os.stat(file_path)
+        if (index['mtime'], index['size']) == (stat.st_mtime_ns,
+                                               stat.st_size):
+            return index
+
+        # Touched, but maybe not changed.
+        if index['size'] != stat.st_size or \
+                index['hash'] != _file_hash(file_path):
+            return None
+
+        index['mtime'] = stat.st_mtime_ns
+        utils.dump_pickle(index, index_path)
+        return index
+
+
+def _file_hash(file_path: str) -> str:
+    return utils.hash_file(file_path).hexdigest()
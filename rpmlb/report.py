@@ -0,0 +1,144 @@
+"""Module to report the outcome of each package of a run."""
+import logging
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+from .retry import Attempt
+
+LOG = logging.getLogger(__name__)
+
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+PackageResult = NamedTuple('PackageResult', [
+    ('num_name', str),
+    ('name', str),
+    ('status', str),
+    ('stage', Optional[str]),  # such as 'download' for a failure
+    ('error', Optional[Exception]),
+    ('blocked_by', List[str]),  # numbers of the failed dependencies
+    ('attempts', List[Attempt]),  # of the build, in their order
+])
+
+
+class RunReport:
+    """A class to collect the outcome of each package.
+
+    The downloader and the builder add the results from any thread.
+    A later result of the same package replaces the earlier one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+
+    def add_success(self, num_name: str, name: str,
+                    attempts: Sequence[Attempt] = ()):
+        self._add(PackageResult(num_name, name, SUCCEEDED, None, None, [],
+                                list(attempts)))
+
+    def add_failure(self, num_name: str, name: str, stage: str,
+                    error: Exception, attempts: Sequence[Attempt] = ()):
+        self._add(PackageResult(num_name, name, FAILED, stage, error, [],
+                                list(attempts)))
+
+    def add_skip(self, num_name: str, name: str, blocked_by: Iterable[str]):
+        self._add(PackageResult(num_name, name, SKIPPED, None, None,
+                                sorted(blocked_by, key=int), []))
+
+    def _add(self, result: PackageResult):
+        with self._lock:
+            self._results[result.num_name] = result
+
+    def get(self, num_name: str) -> Optional[PackageResult]:
+        with self._lock:
+            return self._results.get(num_name)
+
+    def results(self, status: Optional[str] = None) -> List[PackageResult]:
+        """Results in the recipe order, of the status if given."""
+
+        with self._lock:
+            results = sorted(self._results.values(),
+                             key=lambda result: int(result.num_name))
+        if status is not None:
+            results = [result for result in results
+                       if result.status == status]
+        return results
+
+    @property
+    def failed(self) -> bool:
+        """Whether any of the packages failed or was skipped."""
+
+        return any(result.status != SUCCEEDED for result in self.results())
+
+    def summary_lines(self) -> List[str]:
+        """Lines of the summary of the failed, skipped and built packages.
+
+        The attempts are listed for the builds with a failed attempt.
+        """
+
+        failed = self.results(FAILED)
+        skipped = self.results(SKIPPED)
+        succeeded = self.results(SUCCEEDED)
+
+        lines = ['Summary: {0} failed, {1} skipped, {2} succeeded'.format(
+            len(failed), len(skipped), len(succeeded))]
+        for result in failed:
+            lines.append('  failed: {0} ({1}) at {2}: {3}'.format(
+                result.name, result.num_name, result.stage,
+                _error_message(result.error)))
+        for result in skipped:
+            lines.append('  skipped: {0} ({1}), blocked by {2}'.format(
+                result.name, result.num_name, ', '.join(result.blocked_by)))
+        if succeeded:
+            lines.append('  succeeded: {0}'.format(', '.join(
+                '{0} ({1})'.format(result.name, result.num_name)
+                for result in succeeded)))
+        for result in self.results():
+            if any(attempt.failure for attempt in result.attempts):
+                lines.append('  attempts of {0} ({1}): {2}'.format(
+                    result.name, result.num_name, ', '.join(
+                        _attempt_message(attempt)
+                        for attempt in result.attempts)))
+        return lines
+
+    def log_summary(self):
+        """Log the summary, unless no package has a result."""
+
+        if not self.results():
+            return
+        log = LOG.error if self.failed else LOG.info
+        for line in self.summary_lines():
+            log('%s', line)
+
+
+def _attempt_message(attempt: Attempt) -> str:
+    outcome = ('{0} failure'.format(attempt.failure)
+               if attempt.failure else 'succeeded')
+    return '#{0} {1} in {2:.1f}s'.format(attempt.number, outcome,
+                                         attempt.duration)
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, subprocess.CalledProcessError):
+        return '{0}: {1!r} exited with status {2}'.format(
+            type(error).__name__, _command_name(error.cmd), error.returncode)
+    # The last line of a long message, such as of a build log tail.
+    message = str(error).strip().splitlines()
+    return '{0}: {1}'.format(type(error).__name__,
+                             message[-1] if message else '')
+
+
+def _command_name(cmd) -> str:
+    # The program of an argument list, or the first command of a script
+    # skipping the "(" lines of the custom scripts.
+    if not isinstance(cmd, str):
+        return str(cmd[0]) if cmd else ''
+    for line in cmd.splitlines():
+        line = line.strip()
+        if line and line != '(':
+            return line
+    return ''
@@ -0,0 +1,155 @@
+"""Module to decide whether a failed build is tried again."""
+import logging
+import random
+import re
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+LOG = logging.getLogger(__name__)
+
+#: Failure classes with the patterns of their log lines, searched in order.
+#: A real build failure is searched first, so that a network error
+#: printed by a failed test suite does not make it transient.
+FAILURE_PATTERNS = OrderedDict([
+    ('build', re.compile(
+        r'''
+        error:\ Bad\ exit\ status\ from
+        | RPM\ build\ errors:
+        | error:\ Failed\ build\ dependencies
+        | error:\ File\ not\ found
+        | error:\ Installed\ \(but\ unpackaged\)\ file
+        | No\ matching\ package\ to\ install
+        | BuildError
+        | Build\ \d+:?\ failed
+        ''',
+        flags=re.VERBOSE,
+    )),
+    ('infrastructure', re.compile(
+        r'''
+        ServerOffline
+        | koji\.RetryError
+        | Copr\w*(Request|Timeout|NoResult)\w*Exception
+        | (Service\ |Temporarily\ )Unavailable
+        | Bad\ Gateway
+        | Gateway\ Time-?out
+        | Internal\ Server\ Error
+        | Could\ not\ acquire\ lock
+        | database\ is\ locked
+        ''',
+        flags=re.VERBOSE | re.IGNORECASE,
+    )),
+    ('network', re.compile(
+        r'''
+        Could\ not\ resolve\ host
+        | Temporary\ failure\ in\ name\ resolution
+        | Name\ or\ service\ not\ known
+        | Connection\ (timed\ out|refused|reset)
+        | Network\ is\ unreachable
+        | Failed\ to\ connect
+        | Operation\ timed\ out
+        | Curl\ error
+        | Errno\ 14
+        | Cannot\ (download|retrieve\ repository\ metadata)
+        | Failed\ to\ download
+        | fatal:\ unable\ to\ access
+        | The\ remote\ end\ hung\ up
+        | early\ EOF
+        | SSL\ ?Error
+        ''',
+        flags=re.VERBOSE | re.IGNORECASE,
+    )),
+])
+
+#: Failure class of the failures not matching any pattern
+UNKNOWN_FAILURE = 'unknown'
+
+Attempt = NamedTuple('Attempt', [
+    ('name', str),
+    ('number', int),
+    ('failure', Optional[str]),  # None if succeeded
+    ('duration', float),
+])
+
+
+class RetryPolicy:
+    """A class to decide whether a failed build is tried again.
+
+    A failure is classified by the patterns of the last lines of its
+    log. Only the transient classes are tried again, after an
+    exponential backoff with a random jitter, so that the builds
+    failing together do not retry together. The failures not
+    matching any pattern are tried again only if retry_unknown is set.
+
+    Override classify() or the class attributes for other tools.
+    """
+
+    #: Failure classes with the patterns, searched in order
+    patterns = FAILURE_PATTERNS
+
+    #: Failure classes tried again
+    transient_failures = frozenset(['network', 'infrastructure'])
+
+    def __init__(self, max_attempts: int = 3, delay: float = 10.0,
+                 max_delay: float = 600.0, jitter: float = 0.5,
+                 retry_unknown: bool = False):
+        """Create the policy.
+
+        Keyword arguments:
+            max_attempts: Maximal number of the attempts of a build.
+            delay: Seconds to wait before the second attempt;
+                doubled for each next attempt.
+            max_delay: Maximal seconds to wait.
+            jitter: Fraction of the wait that is random.
+            retry_unknown: Whether the unknown failures are tried again.
+        """
+
+        self.max_attempts = max_attempts
+        self.delay = delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_unknown = retry_unknown
+
+    @classmethod
+    def from_options(cls, **kwargs) -> 'RetryPolicy':
+        """Create the policy from the command line options."""
+
+        options = {}
+        if kwargs.get('retry_attempts') is not None:
+            options['max_attempts'] = kwargs['retry_attempts']
+        if kwargs.get('retry_delay') is not None:
+            options['delay'] = kwargs['retry_delay']
+        if kwargs.get('retry_unknown'):
+            options['retry_unknown'] = True
+        return cls(**options)
+
+    def classify(self, log_text: str) -> str:
+        """Classify the failure by its log.
+
+        Returns:
+            Name of the failure class.
+        """
+
+        for failure, pattern in self.patterns.items():
+            if pattern.search(log_text):
+                return failure
+        return UNKNOWN_FAILURE
+
+    def should_retry(self, failure: str, attempt: int) -> bool:
+        """Whether the failed attempt is followed by another one."""
+
+        if attempt >= self.max_attempts:
+            return False
+        if failure == UNKNOWN_FAILURE:
+            return self.retry_unknown
+        return failure in self.transient_failures
+
+    def wait_time(self, attempt: int) -> float:
+        """Seconds to wait after the failed attempt."""
+
+        wait = min(self.max_delay, self.delay * 2 ** (attempt - 1))
+        return wait * (1 - self.jitter * random.random())
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
@@ -0,0 +1,288 @@
+"""Module to run tasks concurrently in the order of their dependencies."""
+import logging
+import threading
+from collections import OrderedDict
+from concurrent import futures
+from typing import (Callable, Container, FrozenSet, Hashable, Iterable,
+                    Mapping, Optional, Sequence, Tuple)
+
+from .spec import Spec
+
+LOG = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """A class to run tasks as soon as their dependencies are finished.
+
+    Ready tasks are started in the order they were added,
+    with at most `jobs` tasks running at the same time.
+    After the first failure no more tasks are started,
+    unless keep_going is set. Then only the tasks depending on
+    a failed task are skipped, and all the others are run.
+
+    Use it as a context manager:
+
+        with Scheduler(jobs=4) as scheduler:
+            scheduler.add('a', build_a)
+            scheduler.add('b', build_b, dependencies=['a'])
+            scheduler.wait()
+    """
+
+    def __init__(self, jobs: int = 1, keep_going: bool = False):
+        if jobs < 1:
+            raise ValueError('jobs should be a positive number.')
+
+        self._jobs = jobs
+        self._keep_going = keep_going
+        self._executor = None
+        self._condition = threading.Condition()
+        self._keys = set()
+        self._pending = OrderedDict()
+        self._running = set()
+        self._done = set()
+        self._errors = OrderedDict()
+        self._skipped = OrderedDict()
+        self._stopped = False
+
+    def __enter__(self):
+        self._executor = futures.ThreadPoolExecutor(max_workers=self._jobs)
+        return self
+
+    def __exit__(self, *exc_info):
+        # Let the running tasks finish, but do not start any other.
+        with self._condition:
+            self._stopped = True
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def add(self, key: Hashable, func: Callable[[], None],
+            dependencies: Iterable[Hashable] = ()):
+        """Add a task.
+
+        Keyword arguments:
+            key: Unique identifier of the task.
+            func: The callable to run.
+            dependencies: Keys of previously added tasks
+                that should be finished before this one starts.
+
+        Raises:
+            ValueError: The key was already used,
+                or some of the dependencies are unknown.
+        """
+
+        dependencies = frozenset(dependencies)
+
+        with self._condition:
+            if key in self._keys:
+                raise ValueError('Duplicate task: {0!r}'.format(key))
+            unknown = dependencies - self._keys
+            if unknown:
+                message = 'Unknown dependencies of {0!r}: {1!r}'.format(
+                    key, sorted(unknown, key=str))
+                raise ValueError(message)
+
+            self._keys.add(key)
+            self._pending[key] = (func, dependencies)
+            self._skip_blocked_tasks()
+            self._start_ready_tasks()
+
+    def add_failure(self, key: Hashable, error: Exception):
+        """Add a task that has already failed, such as by its download.
+
+        Raises:
+            ValueError: The key was already used.
+        """
+
+        with self._condition:
+            if key in self._keys:
+                raise ValueError('Duplicate task: {0!r}'.format(key))
+            self._keys.add(key)
+            self._errors[key] = error
+            self._skip_blocked_tasks()
+            self._condition.notify_all()
+
+    @property
+    def failed(self) -> bool:
+        """Whether any of the tasks has failed."""
+
+        with self._condition:
+            return bool(self._errors)
+
+    @property
+    def errors(self) -> Mapping[Hashable, Exception]:
+        """Errors of the failed tasks by their keys."""
+
+        with self._condition:
+            return OrderedDict(self._errors)
+
+    @property
+    def skipped(self) -> Mapping[Hashable, FrozenSet[Hashable]]:
+        """Keys of the failed tasks blocking each skipped task."""
+
+        with self._condition:
+            return OrderedDict(self._skipped)
+
+    def wait(self):
+        """Wait until all tasks are finished.
+
+        Raises:
+            Exception: The error of the first failed task,
+                unless keep_going is set.
+        """
+
+        with self._condition:
+            while self._running or (self._pending and (
+                    self._keep_going or not self._errors)):
+                self._condition.wait()
+
+            if self._errors and not self._keep_going:
+                error = next(iter(self._errors.values()))
+                raise error
+
+    def _skip_blocked_tasks(self):
+        """Skip the tasks depending on the failed or skipped tasks.
+
+        The caller should hold the condition.
+        """
+
+        if not self._keep_going:
+            return
+
+        # The dependencies are added before their dependents,
+        # so one pass in the order of addition finds all of them.
+        for key, (func, dependencies) in list(self._pending.items()):
+            blocked_by = set()
+            for dependency in dependencies:
+                if dependency in self._errors:
+                    blocked_by.add(dependency)
+                elif dependency in self._skipped:
+                    blocked_by.update(self._skipped[dependency])
+            if blocked_by:
+                LOG.debug('Task %r skipped, blocked by %r', key,
+                          sorted(blocked_by, key=str))
+                del self._pending[key]
+                self._skipped[key] = frozenset(blocked_by)
+
+    def _start_ready_tasks(self):
+        """Start ready tasks; the caller should hold the condition."""
+
+        if (self._errors and not self._keep_going) or self._stopped:
+            return
+
+        for key, (func, dependencies) in list(self._pending.items()):
+            if len(self._running) >= self._jobs:
+                break
+            if not dependencies <= self._done:
+                continue
+
+            del self._pending[key]
+            self._running.add(key)
+            self._executor.submit(self._execute, key, func)
+
+    def _execute(self, key, func):
+        error = None
+        try:
+            func()
+        except Exception as e:
+            error = e
+
+        with self._condition:
+            self._running.discard(key)
+            if error is None:
+                self._done.add(key)
+            else:
+                LOG.debug('Task %r failed: %s', key, error)
+                self._errors[key] = error
+                self._skip_blocked_tasks()
+            self._start_ready_tasks()
+            self._condition.notify_all()
+
+
+class DependencyResolver:
+    """A class to find build dependencies between packages.
+
+    The packages are added one by one in the recipe order.
+    A package depends on:
+        - the first package of the recipe, such as the collection
+          meta package that every other package is built with,
+        - the previous bootstrap stage of the same package,
+        - the latest previous package providing any of its
+          BuildRequires. A package provides its recipe name,
+          the names of its (sub)packages and its Provides.
+
+    A package without a known SPEC file depends on all the previous
+    packages, and all the following packages depend on it,
+    unless it has failed. A failed package without a SPEC file
+    provides its recipe name only.
+    Dependencies only ever point to previous packages,
+    so that the recipe order stays a valid build order.
+    """
+
+    def __init__(self):
+        self._latest_by_name = {}
+        self._providers = {}
+        self._barrier = None
+        self._previous_keys = []
+
+    def add(self, key: Hashable, name: str, spec: Optional[Spec],
+            is_failed: bool = False) -> FrozenSet[Hashable]:
+        """Add the next package.
+
+        Keyword arguments:
+            key: Unique identifier of the package.
+            name: The package name in the recipe.
+            spec: The parsed SPEC file, or None if it is unknown.
+            is_failed: Whether the package has already failed,
+                such as by its download.
+
+        Returns:
+            Keys of the previous packages the package depends on.
+        """
+
+        dependencies = set()
+        if self._barrier is not None:
+            dependencies.add(self._barrier)
+        if name in self._latest_by_name:
+            dependencies.add(self._latest_by_name[name])
+
+        if spec is None and not is_failed:
+            dependencies.update(self._previous_keys)
+            self._barrier = key
+        else:
+            if spec is not None:
+                for capability in spec.build_requires:
+                    if capability in self._providers:
+                        dependencies.add(self._providers[capability])
+                for capability in spec.capabilities:
+                    self._providers[capability] = key
+            self._providers[name] = key
+            if not self._previous_keys:
+                self._barrier = key
+
+        self._latest_by_name[name] = key
+        self._previous_keys.append(key)
+        return frozenset(dependencies)
+
+
+def package_dependencies(
+    packages: Sequence[Tuple[Hashable, str, Optional[Spec]]],
+    failed_keys: Container[Hashable] = (),
+) -> Mapping[Hashable, FrozenSet[Hashable]]:
+    """Find build dependencies between packages in the recipe order.
+
+    See DependencyResolver for the rules.
+
+    Keyword arguments:
+        packages: Sequence of (key, package name, SPEC file or None)
+            in the recipe order.
+        failed_keys: Keys of the packages that have already failed.
+
+    Returns:
+        Mapping of a package key to keys of packages it depends on.
+    """
+
+    resolver = DependencyResolver()
+    return OrderedDict(
+        (key, resolver.add(key, name, spec, is_failed=key in failed_keys))
+        for key, name, spec in packages
+    )
@@ -0,0 +1,155 @@
+"""Module to share the lookaside sources between the packages."""
+import hashlib
+import logging
+import os
+import threading
+from typing import Optional
+
+from . import utils
+from .sources import SourceEntry, read_sources
+
+LOG = logging.getLogger(__name__)
+
+#: Infix of the files being stored, renamed into the entries when complete
+TMP_INFIX = '.tmp-'
+
+
+class SourceCache:
+    """A class to keep the lookaside sources under their checksums.
+
+    The sources are linked into the package directory before the build,
+    so that `rhpkg srpm` only downloads the missing ones, and the
+    downloaded ones are stored after the build. The least recently used
+    sources are evicted when the cache is larger than the maximal size.
+    """
+
+    def __init__(self, directory: str, max_size: Optional[int] = None):
+        """Open the cache.
+
+        Keyword arguments:
+            directory: The cache directory, created if needed.
+            max_size: Maximal size of the cache in bytes,
+                or None for no limit.
+        """
+
+        if not directory:
+            raise ValueError('directory is required.')
+
+        self.directory = directory
+        self.max_size = max_size
+        self._size = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def entry_path(self, entry: SourceEntry) -> str:
+        return os.path.join(self.directory, entry.algorithm,
+                            entry.checksum[:2], entry.checksum)
+
+    def link(self, package_dir: str) -> int:
+        """Link the cached sources missing in the package directory.
+
+        Returns:
+            Number of the linked sources.
+        """
+
+        linked = 0
+        for entry in read_sources(package_dir):
+            target_path = os.path.join(package_dir, entry.file_name)
+            if os.path.exists(target_path):
+                continue
+
+            entry_path = self.entry_path(entry)
+            try:
+                # Mark the source as recently used.
+                os.utime(entry_path)
+                utils.link_or_copy(entry_path, target_path)
+            except FileNotFoundError:
+                continue
+            linked += 1
+
+        LOG.debug('Linked %d sources into %s', linked, package_dir)
+        return linked
+
+    def store(self, package_dir: str) -> int:
+        """Store the sources of the package directory missing in the cache.
+
+        A source is stored only if it matches its checksum.
+
+        Returns:
+            Number of the stored sources.
+        """
+
+        stored = 0
+        for entry in read_sources(package_dir):
+            source_path = os.path.join(package_dir, entry.file_name)
+            entry_path = self.entry_path(entry)
+            if os.path.exists(entry_path) or not os.path.isfile(source_path):
+                continue
+            if not _has_checksum(source_path, entry):
+                LOG.warning('Not caching %s, checksum mismatch.', source_path)
+                continue
+
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            tmp_path = '{0}{1}{2}-{3}'.format(
+                entry_path, TMP_INFIX, os.getpid(), threading.get_ident())
+            # The sources are never modified, so that a link is as safe
+            # as a copy and much cheaper for large tarballs.
+            utils.link_or_copy(source_path, tmp_path)
+            os.rename(tmp_path, entry_path)
+            stored += 1
+
+            with self._lock:
+                if self._size is not None:
+                    self._size += os.path.getsize(entry_path)
+
+        LOG.debug('Stored %d sources from %s', stored, package_dir)
+        if stored:
+            self.evict()
+        return stored
+
+    def evict(self):
+        """Remove the least recently used sources over the maximal size."""
+
+        if self.max_size is None:
+            return
+
+        with self._lock:
+            if self._size is not None and self._size <= self.max_size:
+                return
+
+            entries = []
+            for directory, dir_names, file_names in os.walk(self.directory):
+                for file_name in file_names:
+                    if TMP_INFIX in file_name:
+                        # Being stored by another build.
+                        continue
+                    file_path = os.path.join(directory, file_name)
+                    try:
+                        stat = os.stat(file_path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, file_path))
+
+            size = sum(entry_size for _, entry_size, _ in entries)
+            for _, entry_size, file_path in sorted(entries):
+                if size <= self.max_size:
+                    break
+                LOG.debug('Evicting %s from the source cache', file_path)
+                try:
+                    os.unlink(file_path)
+                except FileNotFoundError:
+                    pass
+                size -= entry_size
+
+            self._size = size
+
+
+def _has_checksum(file_path: str, entry: SourceEntry) -> bool:
+    try:
+        digest = hashlib.new(entry.algorithm)
+    except ValueError:
+        LOG.warning('Unknown checksum algorithm: %s', entry.algorithm)
+        return False
+
+    utils.hash_file(file_path, digest)
+    return digest.hexdigest() == entry.checksum
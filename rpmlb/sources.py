@@ -0,0 +1,73 @@
+"""Module to read dist-git sources files."""
+import logging
+import os
+import re
+from typing import List, NamedTuple
+
+LOG = logging.getLogger(__name__)
+
+#: Name of the file listing the lookaside sources of a package
+SOURCES_FILE_NAME = 'sources'
+
+#: Regular expression for the BSD-style line: SHA512 (file) = checksum
+BSD_LINE_REGEX = re.compile(
+    r'^(?P<algorithm>\w+)\s+\((?P<file_name>.+)\)\s+=\s+(?P<checksum>\w+)$'
+)
+
+#: Regular expression for the old md5sum-style line: checksum  file
+MD5_LINE_REGEX = re.compile(
+    r'^(?P<checksum>[0-9a-fA-F]{32})\s+(?P<file_name>.+)$'
+)
+
+SourceEntry = NamedTuple('SourceEntry', [
+    ('algorithm', str),
+    ('checksum', str),
+    ('file_name', str),
+])
+
+
+def read_sources(package_dir: str) -> List[SourceEntry]:
+    """Read the sources file of a package.
+
+    Keyword arguments:
+        package_dir: The package directory.
+
+    Returns:
+        List of the lookaside sources; empty if there is no sources file.
+    """
+
+    sources_path = os.path.join(package_dir, SOURCES_FILE_NAME)
+    if not os.path.isfile(sources_path):
+        return []
+
+    entries = []
+    with open(sources_path, 'r') as sources_file:
+        for line in sources_file:
+            line = line.strip()
+            if not line:
+                continue
+
+            match = BSD_LINE_REGEX.match(line)
+            if match:
+                algorithm = match.group('algorithm').lower()
+            else:
+                match = MD5_LINE_REGEX.match(line)
+                if not match:
+                    LOG.warning('Invalid line in %s: %s', sources_path, line)
+                    continue
+                algorithm = 'md5'
+
+            file_name = match.group('file_name')
+            if '/' in file_name or '..' in file_name:
+                # The name is used as a path in the package directory.
+                LOG.warning('Invalid file name in %s: %s',
+                            sources_path, file_name)
+                continue
+
+            entries.append(SourceEntry(
+                algorithm=algorithm,
+                checksum=match.group('checksum').lower(),
+                file_name=file_name,
+            ))
+
+    return entries
@@ -0,0 +1,573 @@
+"""Module to read the structured data of SPEC files."""
+import hashlib
+import logging
+import os
+import pickle
+import re
+from typing import Iterable, Iterator, List, Optional, Union
+
+from . import utils
+
+LOG = logging.getLogger(__name__)
+
+#: Regular expression for a macro definition line
+DEFINITION_REGEX = re.compile(
+    r'^%(?:global|define)\s+(?P<name>\w+)(?:\(.*?\))?\s+(?P<value>.*)$'
+)
+
+#: Regular expression for a preamble tag line
+TAG_REGEX = re.compile(
+    r'^(?P<tag>[A-Za-z]\w*)(?:\(\w+\))?\s*:\s*(?P<value>.*)$'
+)
+
+#: Regular expression for a conditional line
+CONDITIONAL_REGEX = re.compile(
+    r'^%(?P<keyword>if|ifarch|ifnarch|ifos|ifnos|'
+    r'elif|elifarch|elifos|else|endif)\b\s*(?P<expression>.*)$'
+)
+
+#: Regular expression for the other macro statements
+STATEMENT_REGEX = re.compile(
+    r'^%(?P<keyword>undefine|bcond_with|bcond_without)\s+(?P<name>\w+)'
+)
+
+#: Regular expression for a token of a conditional expression
+EXPRESSION_TOKEN_REGEX = re.compile(
+    r'''\s*(?:
+    (?P<number>\d+)(?![\w.])
+    |"(?P<string>[^"]*)"
+    |(?P<operator>&&|\|\||==|!=|<=|>=|<|>|!|\(|\))
+    |(?P<word>[^\s()!<>=&|"]+)
+    )''',
+    flags=re.VERBOSE,
+)
+
+#: Regular expression for a subpackage section
+PACKAGE_REGEX = re.compile(r'^%package\s+(?P<arguments>.+)$')
+
+#: Regular expression for the other sections, ending the preamble;
+#: their text such as the %changelog never has any tags
+SECTION_REGEX = re.compile(
+    r'^%(?:description|prep|build|install|check|clean|files|changelog|'
+    r'pre|post|preun|postun|pretrans|posttrans|verifyscript|'
+    r'trigger\w*|filetrigger\w*|transfiletrigger\w*)(?:\s|$)'
+)
+
+#: Regular expression for a macro reference without braces
+BARE_MACRO_REGEX = re.compile(r'%(?P<name>[A-Za-z_]\w*)')
+
+#: Version comparison operators in dependency lists
+VERSION_OPERATORS = frozenset(('<', '<=', '=', '==', '>=', '>'))
+
+#: Maximal depth of nested macro expansion
+MAX_EXPANSION_DEPTH = 32
+
+#: Version of the cached data; change it when the parsing changes
+CACHE_VERSION = '2'
+
+
+class Spec:
+    """A class to describe the structured data of a SPEC file.
+
+    The conditionals are evaluated only if all their macros are known
+    from the SPEC file. Otherwise all the conditional branches are read,
+    so that the dependencies of all of them are collected.
+    Undefined macros in the conditional form (%{?macro}) expand to
+    nothing, which is consistent on both requiring and providing sides.
+    """
+
+    def __init__(self, content: str):
+        self.name = None
+        self.version = None
+        self.release = None
+        self.macros = {}
+        self.packages = []
+        self.build_requires = []
+        self.provides = []
+        self.sources = []
+        self.patches = []
+
+        # Macros known not to be defined
+        self._undefined = set()  # type: set
+        # Unknown macros found while expanding a conditional
+        self._unknown = None  # type: Optional[set]
+
+        self._parse(content.splitlines())
+
+    @classmethod
+    def from_file(cls, file_path, cache: Optional['SpecCache'] = None):
+        """Read SPEC file.
+
+        Keyword arguments:
+            file_path: Path to the SPEC file.
+            cache: The SpecCache instance to read the parsed data from,
+                or None to always parse the file.
+
+        Returns:
+            Spec: Parsed SPEC file.
+        """
+
+        if cache is not None:
+            return cache.load(file_path)
+
+        with open(str(file_path), 'rb') as spec_file:
+            spec = cls(_decode(spec_file.read()))
+
+        LOG.debug('Loaded spec: %s', file_path)
+        return spec
+
+    @property
+    def capabilities(self) -> List[str]:
+        """All capabilities provided by the built packages."""
+
+        return self.packages + self.provides
+
+    def expand(self, text: str, depth: int = 0) -> str:
+        """Expand macros known from the SPEC file.
+
+        Keyword arguments:
+            text: The text to expand.
+            depth: The current depth of nested expansion.
+
+        Returns:
+            The expanded text. Unknown plain macros are kept as they are.
+        """
+
+        if depth > MAX_EXPANSION_DEPTH or '%' not in text:
+            return text
+
+        result = []
+        position = 0
+        while True:
+            start = text.find('%', position)
+            if start < 0:
+                result.append(text[position:])
+                break
+            result.append(text[position:start])
+
+            if text.startswith('%%', start):
+                result.append('%')
+                position = start + 2
+            elif text.startswith('%{', start):
+                end = _find_closing_brace(text, start + 1)
+                if end < 0:
+                    result.append(text[start:])
+                    break
+                body = text[start + 2:end]
+                result.append(self._expand_braced(body, text[start:end + 1],
+                                                  depth))
+                position = end + 1
+            else:
+                match = BARE_MACRO_REGEX.match(text, start)
+                if match and match.group('name') in self.macros:
+                    value = self.macros[match.group('name')]
+                    result.append(self.expand(value, depth + 1))
+                    position = match.end()
+                else:
+                    if match:
+                        self._note_unknown(match.group('name'))
+                    result.append('%')
+                    position = start + 1
+
+        return ''.join(result)
+
+    def _expand_braced(self, body: str, original: str, depth: int) -> str:
+        """Expand the body of a %{...} macro."""
+
+        negated = conditional = False
+        name = body
+        if name.startswith('!?') or name.startswith('?!'):
+            negated = conditional = True
+            name = name[2:]
+        elif name.startswith('?'):
+            conditional = True
+            name = name[1:]
+
+        if not conditional:
+            function, _, argument = name.partition(' ')
+            argument = argument.strip()
+            if argument and function in ('with', 'without', 'defined',
+                                         'undefined'):
+                return self._expand_test(function, argument)
+
+        name, colon, alternative = name.partition(':')
+        defined = name in self.macros
+        if not defined:
+            self._note_unknown(name)
+
+        if conditional:
+            if colon:
+                if defined != negated:
+                    return self.expand(alternative, depth + 1)
+                return ''
+            if defined and not negated:
+                return self.expand(self.macros[name], depth + 1)
+            return ''
+
+        if defined and not colon:
+            return self.expand(self.macros[name], depth + 1)
+        return original
+
+    def _expand_test(self, function: str, name: str) -> str:
+        """Expand %{with x}, %{without x}, %{defined x}, %{undefined x}."""
+
+        if function in ('with', 'without'):
+            name = 'with_{0}'.format(name)
+        defined = name in self.macros
+        if not defined:
+            self._note_unknown(name)
+        return '1' if defined == (function in ('with', 'defined')) else '0'
+
+    def _note_unknown(self, name: str):
+        if self._unknown is not None and name not in self._undefined:
+            self._unknown.add(name)
+
+    def _parse(self, lines: Iterable[str]):
+        conditions = _Conditions()
+        in_preamble = True
+        for line in _join_continuations(lines):
+            match = CONDITIONAL_REGEX.match(line.strip())
+            if match:
+                keyword = match.group('keyword')
+                expression = match.group('expression')
+                if keyword == 'endif':
+                    conditions.end()
+                elif keyword == 'else':
+                    conditions.alternative(True)
+                elif not conditions.is_active(outer=keyword.startswith('el')):
+                    conditions.push_or_alternative(keyword, False)
+                else:
+                    result = self._evaluate_condition(keyword, expression)
+                    conditions.push_or_alternative(keyword, result)
+                continue
+
+            if not conditions.is_active():
+                continue
+
+            match = DEFINITION_REGEX.match(line)
+            if match:
+                self.macros[match.group('name')] = match.group('value')
+                self._undefined.discard(match.group('name'))
+                continue
+
+            match = STATEMENT_REGEX.match(line)
+            if match:
+                self._parse_statement(match.group('keyword'),
+                                      match.group('name'))
+                continue
+
+            line = self.expand(line).strip()
+
+            match = PACKAGE_REGEX.match(line)
+            if match:
+                self.packages.append(
+                    self._subpackage_name(match.group('arguments')))
+                in_preamble = True
+                continue
+
+            if SECTION_REGEX.match(line):
+                in_preamble = False
+                continue
+
+            match = TAG_REGEX.match(line) if in_preamble else None
+            if not match:
+                continue
+            tag = match.group('tag').lower()
+            value = match.group('value').strip()
+
+            if tag == 'name' and self.name is None:
+                self.name = value
+                self.macros.setdefault('name', value)
+                self.packages.insert(0, value)
+            elif tag in ('version', 'release'):
+                if getattr(self, tag) is None:
+                    setattr(self, tag, value)
+                self.macros.setdefault(tag, value)
+            elif tag == 'buildrequires':
+                self.build_requires.extend(dependency_names(value))
+            elif tag == 'provides':
+                self.provides.extend(dependency_names(value))
+            elif re.match(r'^source\d*$', tag):
+                self.sources.append(value)
+            elif re.match(r'^patch\d*$', tag):
+                self.patches.append(value)
+
+    def _parse_statement(self, keyword: str, name: str):
+        if keyword == 'undefine':
+            self.macros.pop(name, None)
+            self._undefined.add(name)
+        elif keyword == 'bcond_without':
+            # Enabled by default
+            self.macros.setdefault('with_{0}'.format(name), '1')
+        elif 'with_{0}'.format(name) not in self.macros:
+            # Disabled by default
+            self._undefined.add('with_{0}'.format(name))
+
+    def _evaluate_condition(self, keyword: str,
+                            expression: str) -> Optional[bool]:
+        """Evaluate the condition of %if or %elif.
+
+        Returns:
+            The result, or None if it is unknown.
+        """
+
+        if keyword not in ('if', 'elif'):
+            # Architecture and OS conditions depend on the build host.
+            return None
+
+        self._unknown = set()
+        try:
+            expanded = self.expand(expression)
+            if self._unknown:
+                return None
+        finally:
+            self._unknown = None
+
+        try:
+            return bool(_ExpressionParser(expanded).parse())
+        except ValueError:
+            LOG.debug('Cannot evaluate the condition: %s', expression)
+            return None
+
+    def _subpackage_name(self, arguments: str) -> str:
+        """Full name of a subpackage from the %package arguments."""
+
+        words = arguments.split()
+        if '-n' in words[:-1]:
+            return words[words.index('-n') + 1]
+        return '{0}-{1}'.format(self.name, words[-1])
+
+
+class SpecCache:
+    """A class to keep parsed SPEC files under the hash of their contents.
+    """
+
+    def __init__(self, directory: str):
+        if not directory:
+            raise ValueError('directory is required.')
+
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self, file_path) -> Spec:
+        """Load the parsed SPEC file, parsing it on a cache miss."""
+
+        with open(str(file_path), 'rb') as spec_file:
+            content = spec_file.read()
+
+        digest = hashlib.sha256(CACHE_VERSION.encode('utf-8'))
+        digest.update(content)
+        key = digest.hexdigest()
+        cache_path = os.path.join(self.directory, key[:2], key + '.pickle')
+
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                spec = pickle.load(cache_file)
+            LOG.debug('Loaded spec: %s from %s', file_path, cache_path)
+            return spec
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+        spec = Spec(_decode(content))
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        utils.dump_pickle(spec, cache_path)
+        LOG.debug('Loaded spec: %s, cached to %s', file_path, cache_path)
+        return spec
+
+
+class _Conditions:
+    """A stack of the nested conditional sections.
+
+    Each level keeps the state of its current branch: True, False,
+    or None if unknown, and whether a previous branch was taken.
+    """
+
+    def __init__(self):
+        self._stack = []
+
+    def is_active(self, outer: bool = False) -> bool:
+        """Whether the lines are read, in the outer levels if requested."""
+
+        levels = self._stack[:-1] if outer else self._stack
+        return all(state is not False for state, _ in levels)
+
+    def push_or_alternative(self, keyword: str, state: Optional[bool]):
+        if keyword.startswith('el'):
+            self.alternative(state)
+        else:
+            self._stack.append([state, state])
+
+    def alternative(self, state: Optional[bool]):
+        """Switch to the %elif or %else branch with the state."""
+
+        if not self._stack:
+            LOG.debug('Unexpected alternative branch.')
+            return
+
+        level = self._stack[-1]
+        previous = level[1]
+        if previous is True:
+            state = False
+        elif previous is None and state is True:
+            state = None
+        level[0] = state
+        if state is not False:
+            level[1] = state if previous is False else previous
+
+    def end(self):
+        if not self._stack:
+            LOG.debug('Unexpected %endif.')
+            return
+        self._stack.pop()
+
+
+class _ExpressionParser:
+    """A parser of the expressions in %if.
+
+    Operands are integers and strings; operators are !, &&, ||,
+    comparisons and parentheses.
+    """
+
+    def __init__(self, text: str):
+        self._tokens = []
+        position = 0
+        text = text.strip()
+        while position < len(text):
+            match = EXPRESSION_TOKEN_REGEX.match(text, position)
+            if not match or match.end() == position:
+                raise ValueError('Invalid expression: {0}'.format(text))
+            if match.group('number') is not None:
+                self._tokens.append(('value', int(match.group('number'))))
+            elif match.group('string') is not None:
+                self._tokens.append(('value', match.group('string')))
+            elif match.group('word') is not None:
+                self._tokens.append(('value', match.group('word')))
+            else:
+                self._tokens.append(('operator', match.group('operator')))
+            position = match.end()
+            while position < len(text) and text[position].isspace():
+                position += 1
+        self._position = 0
+
+    def parse(self) -> Union[int, str]:
+        if not self._tokens:
+            raise ValueError('Empty expression')
+        value = self._or()
+        if self._position != len(self._tokens):
+            raise ValueError('Unexpected token')
+        return value
+
+    def _peek(self):
+        if self._position < len(self._tokens):
+            return self._tokens[self._position]
+        return (None, None)
+
+    def _accept(self, *operators) -> Optional[str]:
+        kind, token = self._peek()
+        if kind == 'operator' and token in operators:
+            self._position += 1
+            return token
+        return None
+
+    def _or(self):
+        value = self._and()
+        while self._accept('||'):
+            right = self._and()
+            value = int(bool(value) or bool(right))
+        return value
+
+    def _and(self):
+        value = self._comparison()
+        while self._accept('&&'):
+            right = self._comparison()
+            value = int(bool(value) and bool(right))
+        return value
+
+    def _comparison(self):
+        value = self._unary()
+        while True:
+            operator = self._accept('==', '!=', '<=', '>=', '<', '>')
+            if operator is None:
+                return value
+            right = self._unary()
+            if type(value) is not type(right):
+                raise ValueError('Comparing different types')
+            value = int({
+                '==': value == right,
+                '!=': value != right,
+                '<=': value <= right,
+                '>=': value >= right,
+                '<': value < right,
+                '>': value > right,
+            }[operator])
+
+    def _unary(self):
+        if self._accept('!'):
+            return int(not self._unary())
+        if self._accept('('):
+            value = self._or()
+            if not self._accept(')'):
+                raise ValueError('Missing )')
+            return value
+        kind, token = self._peek()
+        if kind != 'value':
+            raise ValueError('Missing operand')
+        self._position += 1
+        return token
+
+
+def dependency_names(value: str) -> Iterator[str]:
+    """Extract capability names from a dependency tag value.
+
+    Keyword arguments:
+        value: The tag value, such as 'foo >= 1.0, bar'.
+
+    Yields:
+        The capability names without version constraints.
+        Rich (boolean) dependencies are skipped.
+    """
+
+    if value.startswith('('):
+        return
+
+    words = iter(value.replace(',', ' ').split())
+    for word in words:
+        if word in VERSION_OPERATORS:
+            next(words, None)  # skip the version
+            continue
+        yield word
+
+
+def _join_continuations(lines: Iterable[str]) -> Iterator[str]:
+    """Join lines ending with a backslash with the following lines."""
+
+    buffer = []
+    for line in lines:
+        if line.endswith('\\'):
+            buffer.append(line[:-1])
+            continue
+        buffer.append(line)
+        yield ''.join(buffer)
+        buffer = []
+
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _decode(content: bytes) -> str:
+    return content.decode('utf-8', errors='replace')
+
+
+def _find_closing_brace(text: str, start: int) -> int:
+    """Find the index of the brace closing the one at start."""
+
+    depth = 0
+    for index in range(start, len(text)):
+        char = text[index]
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return index
+    return -1
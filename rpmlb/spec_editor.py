@@ -0,0 +1,98 @@
+"""Module to edit SPEC files in a single streaming pass."""
+import re
+from typing import Iterable, Iterator, List, Mapping, Optional
+
+#: Regular expression for the first line of a macro definition
+DEFINITION_START_REGEX = re.compile(r'^%(?:global|define)\s')
+
+#: Regular expression for a whole macro definition
+#: including its continuation lines, without the last newline
+DEFINITION_REGEX = re.compile(
+    r'''
+    %(?P<keyword>global|define)\s+  # beginning of definition
+    (?P<name>[^\s]+)\s+             # one-word name
+    (?P<value>.+)                   # value including escaped newlines
+    ''',
+    flags=re.DOTALL | re.VERBOSE,
+)
+
+
+def edit_lines(
+    source: Iterable[str],
+    replaced_macros: Optional[Mapping[str, str]] = None,
+    added_macros: Optional[Mapping[str, str]] = None,
+) -> Iterator[str]:
+    """Apply all macro edits to the lines of a SPEC file.
+
+    The lines are read only once, and only a macro definition
+    with its continuation lines is kept in memory.
+
+    Keyword arguments:
+        source: The lines of the SPEC file.
+        replaced_macros: Mapping of macro name to new macro definition
+            for the macros to be replaced, or None.
+        added_macros: Mapping of macro name to macro definition
+            for the macros to be added at the beginning, or None.
+
+    Yields:
+        Lines of the edited file.
+    """
+
+    if added_macros:
+        for name, value in added_macros.items():
+            yield '%global {name} {value}\n'.format(name=name, value=value)
+
+    if replaced_macros is None:
+        yield from source
+        return
+
+    definition = []  # type: List[str]
+    for line in source:
+        if definition:
+            definition.append(line)
+        elif DEFINITION_START_REGEX.match(line):
+            definition = [line]
+        else:
+            yield line
+            continue
+
+        if not _is_continued(line):
+            yield from _replace_definition(definition, replaced_macros)
+            definition = []
+
+    if definition:
+        # The escaped newline at the end is a part of the value.
+        yield from _replace_definition(definition, replaced_macros,
+                                       is_continued=True)
+
+
+def _is_continued(line: str) -> bool:
+    """Whether the next line continues the line."""
+
+    return line.endswith('\\\n')
+
+
+def _replace_definition(lines: List[str], macros: Mapping[str, str],
+                        is_continued: bool = False) -> Iterator[str]:
+    """Replace the macro definition if needed.
+
+    A replaced definition has single spaces between the keyword,
+    the name and the value. The other definitions are kept as they are.
+    """
+
+    text = ''.join(lines)
+    newline = ''
+    if text.endswith('\n') and not is_continued:
+        text, newline = text[:-1], '\n'
+
+    match = DEFINITION_REGEX.fullmatch(text)
+    if not match:
+        yield from lines
+        return
+
+    name = match.group('name')
+    if name not in macros:
+        yield from lines
+        return
+    yield '%{} {} {}{}'.format(match.group('keyword'), name, macros[name],
+                               newline)
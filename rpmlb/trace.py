@@ -0,0 +1,138 @@
+"""Module to record the time spans of the processing for a trace file.
+
+The recording is disabled until enable() is called,
+so that span() costs almost nothing by default.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LOG = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_enabled = False
+_origin = 0.0
+_spans = []
+_thread_names = {}
+
+
+def enable():
+    """Start recording the spans, discarding the recorded ones."""
+
+    global _enabled, _origin
+    with _lock:
+        _enabled = True
+        _origin = time.perf_counter()
+        _spans.clear()
+        _thread_names.clear()
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+@contextmanager
+def span(name: str, category: str, **args):
+    """Record the time span of the block.
+
+    Keyword arguments:
+        name: Name of the span, such as the package name.
+        category: Kind of the processing, such as 'download' or 'build'.
+        **args: Additional data of the span, such as the position.
+    """
+
+    if not _enabled:
+        yield
+        return
+
+    thread = threading.current_thread()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        if error is not None:
+            args['error'] = error
+        with _lock:
+            _thread_names.setdefault(thread.ident, thread.name)
+            _spans.append({
+                'name': name,
+                'category': category,
+                'start': start - _origin,
+                'duration': end - start,
+                'thread': thread.ident,
+                'args': args,
+            })
+
+
+def write(file_path: str):
+    """Write the recorded spans.
+
+    The file is written as JSON lines with one span per line if its
+    name ends with '.jsonl', or in the Chrome trace event format
+    otherwise, to be opened in chrome://tracing or Perfetto.
+    """
+
+    with _lock:
+        spans = sorted(_spans, key=lambda item: item['start'])
+        thread_names = dict(_thread_names)
+
+    # Small stable thread numbers are easier to read than the idents.
+    thread_numbers = {}
+    for item in spans:
+        thread_numbers.setdefault(item['thread'], len(thread_numbers) + 1)
+
+    with open(file_path, 'w') as trace_file:
+        if file_path.endswith('.jsonl'):
+            for item in spans:
+                item = dict(item, thread=thread_numbers[item['thread']])
+                print(json.dumps(item, sort_keys=True, default=str),
+                      file=trace_file)
+        else:
+            json.dump({
+                'traceEvents': _chrome_events(spans, thread_names,
+                                              thread_numbers),
+                'displayTimeUnit': 'ms',
+            }, trace_file, default=str)
+
+    LOG.info('Wrote %d trace spans to %s', len(spans), file_path)
+
+
+def _chrome_events(spans, thread_names, thread_numbers):
+    process_id = os.getpid()
+    events = [
+        {
+            'name': 'thread_name',
+            'ph': 'M',
+            'pid': process_id,
+            'tid': number,
+            'args': {'name': thread_names.get(ident, str(ident))},
+        }
+        for ident, number in thread_numbers.items()
+    ]
+    events.extend(
+        {
+            'name': item['name'],
+            'cat': item['category'],
+            'ph': 'X',
+            'ts': round(item['start'] * 1e6, 3),
+            'dur': round(item['duration'] * 1e6, 3),
+            'pid': process_id,
+            'tid': thread_numbers[item['thread']],
+            'args': item['args'],
+        }
+        for item in spans
+    )
+    return events
@@ -1,12 +1,36 @@
+import fcntl
+import functools
+import glob
+import hashlib
 import importlib
 import logging
 import os
+import pickle
+import shlex
+import shutil
 import subprocess
 import sys
+import tempfile
+from collections import deque
 from contextlib import contextmanager
+from typing import List, Mapping
+
+from .sources import read_sources
 
 LOG = logging.getLogger(__name__)
 
+#: ioctl request cloning a whole file (linux/fs.h)
+FICLONE = 0x40049409
+
+#: Number of the last output lines kept in memory by run_cmd with a log file
+TAIL_LINES = 100
+
+#: Maximal length of an output line kept in memory, such as a progress bar
+MAX_LINE_LENGTH = 64 * 1024
+
+#: Size of the blocks for hashing the file contents
+HASH_BLOCK_SIZE = 1024 * 1024
+
 
 def p(text):
     print(repr(text))
@@ -64,43 +88,212 @@ def pushd(new_dir):
         os.chdir(previous_dir)
 
 
+def link_or_copy(src: str, dst: str):
+    """Hard link a file, or copy it if linking is not possible.
+
+    Keyword arguments:
+        src: The existing file.
+        dst: The new file. It is replaced if it exists.
+    """
+
+    if os.path.lexists(dst):
+        os.unlink(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Different file system, or links are not supported.
+        shutil.copy2(src, dst)
+
+
+def reflink_or_copy(src: str, dst: str):
+    """Clone a file sharing its blocks, or copy it if it is not possible.
+
+    Keyword arguments:
+        src: The existing file.
+        dst: The new file. It is replaced if it exists.
+    """
+
+    try:
+        with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+    except OSError:
+        # Different file system, or clones are not supported.
+        shutil.copy2(src, dst)
+        return
+    shutil.copystat(src, dst)
+
+
+def dump_pickle(data, file_path: str):
+    """Write a pickle file atomically.
+
+    Keyword arguments:
+        data: The pickled data.
+        file_path: The file. It is replaced if it exists.
+    """
+
+    fd, tmp_path = tempfile.mkstemp(prefix='tmp-',
+                                    dir=os.path.dirname(file_path))
+    try:
+        with os.fdopen(fd, 'wb') as output_file:
+            pickle.dump(data, output_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_tail(file_path: str, size: int = 64 * 1024) -> str:
+    """Read the end of a text file.
+
+    Returns:
+        The last size bytes of the file as a text,
+        or an empty text if the file cannot be read.
+    """
+
+    try:
+        with open(file_path, 'rb') as input_file:
+            input_file.seek(0, os.SEEK_END)
+            input_file.seek(max(0, input_file.tell() - size))
+            return input_file.read().decode('utf-8', 'replace')
+    except OSError:
+        return ''
+
+
+def hash_file(file_path: str, digest=None):
+    """Hash the contents of a file block by block.
+
+    Keyword arguments:
+        file_path: The file.
+        digest: The hashlib object to update,
+            or None for a new SHA-256 one.
+
+    Returns:
+        The updated hashlib object.
+    """
+
+    if digest is None:
+        digest = hashlib.sha256()
+    with open(file_path, 'rb') as input_file:
+        for block in iter(lambda: input_file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest
+
+
+def package_files(package_dir: str) -> List[str]:
+    """List the files making the contents of a package directory.
+
+    The lookaside sources are left out, as their checksums are
+    in the sources file. The hidden files, the RPM files and
+    the directories, such as the build results, are left out too.
+
+    Returns:
+        Sorted file names.
+    """
+
+    ignored = {entry.file_name for entry in read_sources(package_dir)}
+    return [
+        file_name for file_name in sorted(os.listdir(package_dir))
+        if not (file_name in ignored or file_name.startswith('.') or
+                file_name.endswith('.rpm') or
+                not os.path.isfile(os.path.join(package_dir, file_name)))
+    ]
+
+
 def run_cmd_with_capture(cmd, **kwargs):
     kwargs['stdout'] = subprocess.PIPE
     kwargs['stderr'] = subprocess.PIPE
     return run_cmd(cmd, **kwargs)
 
 
+def glob_paths(pattern: str, directory: str) -> List[str]:
+    """Expand the pattern as the shell does, for the argument list.
+
+    Keyword arguments:
+        pattern: The pattern such as '*.rpm'.
+        directory: The directory the pattern is relative to.
+
+    Returns:
+        Sorted matching paths relative to the directory,
+        or the pattern itself if nothing matches.
+    """
+
+    paths = sorted(
+        os.path.relpath(path, directory)
+        for path in glob.glob(os.path.join(directory, pattern))
+    )
+    return paths or [pattern]
+
+
+@functools.lru_cache(maxsize=None)
+def command_env() -> Mapping[str, str]:
+    """Environment of the commands, created once for the process."""
+
+    env = os.environ.copy()
+    env['LC_ALL'] = 'C.utf-8'  # better to parse English output
+    return env
+
+
 def run_cmd(cmd, **kwargs):
+    """Run the command.
+
+    Keyword arguments:
+        cmd: The command line run in the shell, or a sequence of
+            the arguments run without the shell. Use glob_paths()
+            for the wildcards in the sequence.
+        check: Raise CalledProcessError if the command fails.
+            True by default.
+        env: Environment variables added to command_env().
+        log_file: Append the standard output and error of the command
+            to the file instead of keeping them, so that only the last
+            lines are kept in memory for the error report.
+        tail_lines: Number of the last lines kept with log_file.
+        **kwargs: Passed to subprocess.Popen.
+
+    Returns:
+        CompletedProcess instance. The stdout is the last lines
+        with log_file.
+    """
+
     returncode = None
     stdout = ''
     stderr = ''
     proc = None
     try:
-        check = True
-        if 'check' in kwargs:
-            check = kwargs['check']
-            kwargs.pop('check', None)
-        # Use shell option to use wildcard "*".
-        kwargs['shell'] = True
-
-        LOG.debug('CMD: %s, kwargs: %s', cmd, repr(kwargs))
-
-        env = os.environ.copy()
-        env['LC_ALL'] = 'C.utf-8'  # better to parse English output
-        if 'env' in kwargs:
-            env.update(kwargs['env'])
+        check = kwargs.pop('check', True)
+        log_file = kwargs.pop('log_file', None)
+        tail_lines = kwargs.pop('tail_lines', TAIL_LINES)
+        # The command line uses the shell for wildcards such as "*".
+        kwargs['shell'] = isinstance(cmd, str)
+
+        LOG.debug('CMD: %s, kwargs: %r', cmd, kwargs)
+
+        env = command_env()
+        if kwargs.get('env'):
+            env = dict(env, **kwargs['env'])
         kwargs['env'] = env
 
-        proc = subprocess.Popen(cmd, **kwargs)
-        stdout, stderr = proc.communicate()
+        if log_file is None:
+            proc = subprocess.Popen(cmd, **kwargs)
+            stdout, stderr = proc.communicate()
+        else:
+            kwargs['stdout'] = subprocess.PIPE
+            kwargs['stderr'] = subprocess.STDOUT
+            proc = subprocess.Popen(cmd, **kwargs)
+            stdout = _stream_output(proc, cmd, log_file, tail_lines)
+            stderr = None
         returncode = proc.returncode
         if check and returncode != 0:
-            LOG.error('CMD: [%s] failed at [%s]', cmd, os.getcwd())
+            LOG.error('CMD: [%s] failed at [%s]', cmd,
+                      kwargs.get('cwd') or os.getcwd())
             LOG.error('Return Code: %s', returncode)
-            if stdout is not None:
-                LOG.error('Stdout: %s', stdout)
-            if stderr is not None:
-                LOG.error('Stderr: %s', stderr)
+            if log_file is not None:
+                LOG.error('Last lines of %s:\n%s', log_file,
+                          stdout.decode('utf-8', 'replace'))
+            else:
+                if stdout is not None:
+                    LOG.error('Stdout: %s', stdout)
+                if stderr is not None:
+                    LOG.error('Stderr: %s', stderr)
 
             kwargs_dict = {}
             kwargs_dict['output'] = stdout
@@ -118,6 +311,26 @@ def run_cmd(cmd, **kwargs):
         raise e
 
 
+def _stream_output(proc, cmd, log_file, tail_lines):
+    """Append the output of the process to the log file.
+
+    Returns:
+        The last lines of the output.
+    """
+
+    tail = deque(maxlen=tail_lines)
+    with proc.stdout, open(log_file, 'ab') as output_file:
+        if not isinstance(cmd, str):
+            cmd = ' '.join(shlex.quote(arg) for arg in cmd)
+        output_file.write('$ {0}\n'.format(cmd).encode('utf-8'))
+        output_file.flush()
+        for line in iter(lambda: proc.stdout.readline(MAX_LINE_LENGTH), b''):
+            output_file.write(line)
+            tail.append(line)
+    proc.wait()
+    return b''.join(tail)
+
+
 class CompletedProcess:
     """A error class to manage the result of command
     Use it instead of subprocess.CompletedProcess/CalledProcessError
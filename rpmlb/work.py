@@ -3,7 +3,8 @@ import os
 import shutil
 import tempfile
 
-from rpmlb import utils
+from .journal import JOURNAL_FILE_NAME, Journal
+from .report import RunReport
 
 LOG = logging.getLogger(__name__)
 
@@ -28,6 +29,8 @@ class Work:
             working_dir = tempfile.mkdtemp(prefix='rpmlb-')
         LOG.info('Working directory: %s', working_dir)
         self.working_dir = working_dir
+        self.report = RunReport()
+        self.journal = Journal(os.path.join(working_dir, JOURNAL_FILE_NAME))
 
     def close(self):
         if os.path.isdir(self.working_dir):
@@ -38,6 +41,17 @@ class Work:
         return num_name
 
     def each_num_dir(self):
+        """Iterate the packages with their numbered directories.
+
+        The directories are created if needed, but the current directory
+        is never changed, so that the packages can be processed
+        at the same time.
+
+        Yields:
+            Tuple of the package dictionary, the numbered directory name
+            and the absolute path of the numbered directory.
+        """
+
         if not os.path.isdir(self.working_dir):
             ValueError('working_dir does not exist.')
 
@@ -48,13 +62,18 @@ class Work:
 
             if not os.path.isdir(num_dir):
                 os.makedirs(num_dir)
-            with utils.pushd(num_dir):
-                yield package_dict, num_name
+            yield package_dict, num_name, num_dir
 
             count += 1
 
     def each_package_dir(self):
-        for package_dict, num_name in self.each_num_dir():
-            package = package_dict['name']
-            with utils.pushd(package):
-                yield package_dict, num_name
+        """Iterate the packages with their package directories.
+
+        Yields:
+            Tuple of the package dictionary, the numbered directory name
+            and the absolute path of the package directory.
+        """
+
+        for package_dict, num_name, num_dir in self.each_num_dir():
+            package_dir = os.path.join(num_dir, package_dict['name'])
+            yield package_dict, num_name, package_dir
@@ -1,7 +1,11 @@
 import logging
 import os
+from collections import deque
 
 import yaml
+from yaml.composer import Composer
+from yaml.constructor import Constructor
+from yaml.resolver import Resolver
 
 LOG = logging.getLogger(__name__)
 
@@ -9,14 +13,32 @@ LOG = logging.getLogger(__name__)
 class Yaml:
     """A class to manage YAML data."""
 
-    def __init__(self, file_path):
+    def __init__(self, file_path, key=None):
+        """Load the YAML file.
+
+        Keyword arguments:
+            file_path: The YAML file.
+            key: The top-level key to load, or None to load everything.
+                The content then only has the key, or nothing
+                if the key is not in the file.
+        """
+
         try:
             from yaml import CLoader as Loader
         except ImportError:
             from yaml import Loader
         try:
             with open(file_path, 'r') as stream:
-                self.content = yaml.load(stream, Loader=Loader)
+                if key is None:
+                    self.content = yaml.load(stream, Loader=Loader)
+                else:
+                    self.content = _load_key(stream, key, Loader)
+                    if self.content is None:
+                        stream.seek(0)
+                        content = yaml.load(stream, Loader=Loader)
+                        self.content = {}
+                        if isinstance(content, dict) and key in content:
+                            self.content[key] = content[key]
         except FileNotFoundError as e:
             LOG.error('File not found: %s at %s', file_path, os.getcwd())
             raise e
@@ -29,3 +51,98 @@ class Yaml:
         output = yaml.dump(self.content, Dumper=Dumper,
                            default_flow_style=False)
         print(output)
+
+
+class _EventLoader(Composer, Constructor, Resolver):
+    """A loader constructing the data from recorded parser events."""
+
+    def __init__(self, events):
+        self._events = deque(events)
+        Composer.__init__(self)
+        Constructor.__init__(self)
+        Resolver.__init__(self)
+
+    def check_event(self, *choices):
+        if not self._events:
+            return False
+        if not choices:
+            return True
+        return isinstance(self._events[0], choices)
+
+    def peek_event(self):
+        return self._events[0]
+
+    def get_event(self):
+        return self._events.popleft()
+
+    def dispose(self):
+        pass
+
+
+def _load_key(stream, key, loader_class):
+    """Load only the value of the top-level key.
+
+    The values of the other keys are parsed, but not built.
+
+    Returns:
+        Dictionary with the key, empty if the key is not found,
+        or None if the file needs to be loaded as a whole.
+    """
+
+    events = yaml.parse(stream, Loader=loader_class)
+    stream_start = next(events)
+    document_start = next(events)
+    if not isinstance(document_start, yaml.DocumentStartEvent) or \
+            not isinstance(next(events), yaml.MappingStartEvent):
+        return None
+    resolver = Resolver()
+
+    value_events = None
+    while True:
+        event = next(events)
+        if isinstance(event, yaml.MappingEndEvent):
+            break
+        if not isinstance(event, yaml.ScalarEvent):
+            # Complex keys are rare enough to load everything.
+            return None
+
+        # Compare the keys loaded as strings only, as the whole loading.
+        tag = event.tag or resolver.resolve(yaml.ScalarNode, event.value,
+                                            event.implicit)
+        if event.value == key and tag == Resolver.DEFAULT_SCALAR_TAG:
+            value_events = list(_node_events(events))
+        else:
+            deque(_node_events(events), maxlen=0)  # skip
+
+    if value_events is None:
+        return {}
+
+    anchors = {getattr(event, 'anchor', None) for event in value_events
+               if not isinstance(event, yaml.AliasEvent)}
+    if any(event.anchor not in anchors for event in value_events
+           if isinstance(event, yaml.AliasEvent)):
+        # The value refers to a node outside of it.
+        LOG.debug('Loading whole YAML for the alias in %s', key)
+        return None
+
+    loader = _EventLoader(
+        [stream_start, document_start] + value_events +
+        [yaml.DocumentEndEvent(), yaml.StreamEndEvent()]
+    )
+    return {key: loader.get_single_data()}
+
+
+def _node_events(events):
+    """Yield the events of the next node."""
+
+    depth = 0
+    for event in events:
+        yield event
+        if isinstance(event, (yaml.MappingStartEvent,
+                              yaml.SequenceStartEvent)):
+            depth += 1
+        elif isinstance(event, (yaml.MappingEndEvent,
+                                yaml.SequenceEndEvent)):
+            depth -= 1
+        if depth == 0:
+            return
@@ -17,13 +17,12 @@ setuptools.setup(
     ],
     install_requires=[
         'PyYAML',
-        'retrying',
         'click',
         'typing;python_version<"3.5"',
     ],
     entry_points={
         'console_scripts': [
-            'rpmlb=rpmlb.cli:run',
+            'rpmlb=rpmlb.cli:main',
         ]
     },
     setup_requires=[
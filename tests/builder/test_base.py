@@ -1,11 +1,17 @@
+import hashlib
+import os
 import sys
 from collections import Counter
 from pathlib import Path
 from unittest import mock
 
 import pytest
+from helper import MACRO_REGEX
 
-from rpmlb.builder.base import MACRO_REGEX, BaseBuilder
+from rpmlb.build_cache import BuildCache
+from rpmlb.builder.base import BaseBuilder
+from rpmlb.report import RunReport
+from rpmlb.retry import RetryPolicy
 
 
 @pytest.fixture
@@ -80,6 +86,7 @@ def test_run_returns_true_on_success():
 
 def test_run_exception():
     builder = BaseBuilder()
+    builder.retry_policy = RetryPolicy(delay=0, retry_unknown=True)
     builder.build = mock.Mock(side_effect=ValueError('test'))
     builder.prepare = mock.MagicMock()
 
@@ -103,9 +110,9 @@ def test_run_exception():
         builder.build.assert_called()
     # bulid should be called 3 times for retry setting.
     calls = [
-        mock.call({'name': 'a'}),
-        mock.call({'name': 'a'}),
-        mock.call({'name': 'a'}),
+        mock.call({'name': 'a'}, 'work_dir/1/a'),
+        mock.call({'name': 'a'}, 'work_dir/1/a'),
+        mock.call({'name': 'a'}, 'work_dir/1/a'),
     ]
     builder.build.assert_has_calls(calls)
 
@@ -134,8 +141,12 @@ def get_mock_work():
         '1',
         '2',
     ]
+    package_dirs = [
+        'work_dir/1/a',
+        'work_dir/2/b',
+    ]
     mock_work.each_package_dir.return_value = iter(
-        zip(package_dicts, num_names))
+        zip(package_dicts, num_names, package_dirs))
     return mock_work
 
 
@@ -229,7 +240,7 @@ def test_prepare_runs_all_preparations(macro_spec_path, prepared_macros):
         wraps=builder.prepare_extra_steps,
     )
 
-    builder.prepare(package_metadata)
+    builder.prepare(package_metadata, str(macro_spec_path.parent))
 
     with macro_spec_path.open() as spec_file:
         spec_contents = spec_file.read()
@@ -244,3 +255,269 @@ def test_prepare_runs_all_preparations(macro_spec_path, prepared_macros):
                for name in package_metadata['replaced_macros'])
     # Extra preparation steps are performed
     assert builder.prepare_extra_steps.called
+
+
+def test_prepare_skips_unchanged_edit(macro_spec_path):
+    """The edited spec is not rewritten for the same edits"""
+
+    package_metadata = {
+        'name': macro_spec_path.stem,
+        'macros': {'a': 'macro a'},
+    }
+    builder = BaseBuilder()
+    builder.prepare_extra_steps = mock.MagicMock(
+        wraps=builder.prepare_extra_steps,
+    )
+    package_dir = str(macro_spec_path.parent)
+
+    builder.prepare(package_metadata, package_dir)
+    with macro_spec_path.open() as spec_file:
+        header = spec_file.readline().rstrip('\n')
+    stamp = BaseBuilder.read_edit_stamp(macro_spec_path)
+    assert header == '# Edited by rpmlb (stamp: {})'.format(stamp)
+
+    builder.prepare(package_metadata, package_dir)
+    assert builder.prepare_extra_steps.call_count == 1
+
+    # Other edits
+    package_metadata['macros'] = {'a': 'other macro a'}
+    builder.prepare(package_metadata, package_dir)
+    assert builder.prepare_extra_steps.call_count == 2
+    assert BaseBuilder.read_edit_stamp(macro_spec_path) != stamp
+    with macro_spec_path.open() as spec_file:
+        assert '%global a other macro a' in spec_file.read()
+
+    # Other original
+    stamp = BaseBuilder.read_edit_stamp(macro_spec_path)
+    with macro_spec_path.with_suffix('.spec.orig').open('a') as orig_file:
+        print('%global b macro b', file=orig_file)
+    builder.prepare(package_metadata, package_dir)
+    assert builder.prepare_extra_steps.call_count == 3
+    assert BaseBuilder.read_edit_stamp(macro_spec_path) != stamp
+    with macro_spec_path.open() as spec_file:
+        assert '%global b macro b' in spec_file.read()
+
+
+def test_run_builds_concurrently():
+    builder = BaseBuilder()
+    builder.build = mock.MagicMock(return_value=True)
+    builder.prepare = mock.MagicMock()
+    builder.read_spec = mock.MagicMock(return_value=None)
+
+    mock_work = get_mock_work()
+    assert builder.run(mock_work, build_jobs=2)
+
+    assert builder.prepare.call_count == 2
+    builder.build.assert_has_calls([
+        mock.call({'name': 'a'}, 'work_dir/1/a', build_jobs=2),
+        mock.call({'name': 'b'}, 'work_dir/2/b', build_jobs=2),
+    ], any_order=True)
+
+
+def test_run_concurrently_reports_failed_package():
+    builder = BaseBuilder()
+    builder.build = mock.Mock(side_effect=ValueError('test'))
+    builder.build_with_retrying = builder.build
+    builder.prepare = mock.MagicMock()
+    builder.read_spec = mock.MagicMock(return_value=None)
+
+    mock_work = get_mock_work()
+    type(mock_work).working_dir = mock.PropertyMock(return_value='work_dir')
+
+    with pytest.raises(RuntimeError) as excinfo:
+        builder.run(mock_work, build_jobs=2)
+
+    assert str(excinfo.value) == (
+        "pacakge_dict: {'name': 'a'}, num: 1, work_dir: work_dir"
+    )
+    # Package b depends on a, so it is never built.
+    assert builder.build.call_count == 1
+
+
+def test_run_keep_going_skips_dependent_packages():
+    builder = BaseBuilder()
+    builder.build_with_retrying = mock.Mock(
+        side_effect=[ValueError('test'), None])
+    builder.prepare = mock.MagicMock()
+    builder.read_spec = mock.MagicMock(return_value=None)
+
+    mock_work = get_mock_work()
+    mock_work.each_package_dir.return_value = iter([
+        ({'name': 'a'}, '1', 'work_dir/1/a'),
+        ({'name': 'b'}, '2', 'work_dir/2/b'),
+        ({'name': 'c'}, '3', 'work_dir/3/c'),
+    ])
+    mock_work.report = RunReport()
+    mock_work.report.add_failure('2', 'b', 'download', ValueError('test'))
+
+    assert not builder.run(mock_work, keep_going=True)
+
+    # b is not prepared, and c without a SPEC file depends on a and b.
+    assert builder.prepare.call_count == 2
+    assert builder.build_with_retrying.call_count == 1
+    assert [(result.name, result.status, result.stage)
+            for result in mock_work.report.results()] == [
+        ('a', 'failed', 'build'),
+        ('b', 'failed', 'download'),
+        ('c', 'skipped', None),
+    ]
+
+
+def test_build_package_skips_cached_build(tmpdir):
+    builder = BaseBuilder()
+    builder.build = mock.MagicMock()
+
+    package_dir = tmpdir.join('foo').mkdir()
+    package_dir.join('foo.spec').write('Name: foo\n')
+    package_dict = {'name': 'foo'}
+
+    def build(package_dict, package_dir, **kwargs):
+        with open(os.path.join(package_dir, 'foo-1.0.src.rpm'), 'w') as f:
+            f.write('srpm\n')
+    builder.build.side_effect = build
+
+    cache = BuildCache(str(tmpdir.join('cache')))
+    builder.build_package(package_dict, str(package_dir), cache=cache)
+    assert builder.build.call_count == 1
+
+    package_dir.join('foo-1.0.src.rpm').remove()
+    builder.build_package(package_dict, str(package_dir), cache=cache)
+    assert builder.build.call_count == 1
+    assert package_dir.join('foo-1.0.src.rpm').check(file=True)
+
+
+def test_build_package_ignores_cache_errors(tmpdir):
+    builder = BaseBuilder()
+    builder.build = mock.MagicMock()
+    package_dir = tmpdir.join('foo').mkdir()
+    package_dir.join('foo.spec').write('Name: foo\n')
+
+    cache = BuildCache(str(tmpdir.join('cache')))
+    cache.store = mock.MagicMock(side_effect=OSError('disk full'))
+    with mock.patch('rpmlb.source_cache.SourceCache.store',
+                    side_effect=OSError('disk full')):
+        builder.build_package({'name': 'foo'}, str(package_dir), cache=cache,
+                              source_cache=str(tmpdir.join('sources')))
+
+    assert builder.build.call_count == 1
+    assert cache.store.called
+
+
+def test_start_before_runs_in_background():
+    builder = BaseBuilder()
+    builder.background_before = True
+    builder.before = mock.MagicMock()
+    builder.build = mock.MagicMock(return_value=True)
+    builder.prepare = mock.MagicMock()
+
+    mock_work = get_mock_work()
+    builder.start_before(mock_work, mock_config='epel-7')
+    builder.run(mock_work, mock_config='epel-7')
+
+    builder.before.assert_called_once_with(mock_work, mock_config='epel-7')
+    assert builder.build.called
+
+
+def test_builder_without_base_init(tmpdir):
+    """A plugin builder may override __init__() without calling it."""
+
+    class PluginBuilder(BaseBuilder):
+        background_before = True
+        retry_policy = RetryPolicy(delay=0)
+
+        def __init__(self):
+            self.name = 'plugin'
+
+    builder = PluginBuilder()
+    builder.before = mock.MagicMock()
+    builder.build = mock.MagicMock(side_effect=[
+        ValueError('Connection reset'), True, True, True])
+    builder.prepare = mock.MagicMock()
+
+    mock_work = get_mock_work()
+    builder.start_before(mock_work)
+    builder.run(mock_work, source_cache=str(tmpdir.join('sources')))
+
+    assert builder.before.called
+    assert builder.build.call_count == 3
+    assert mock_work.report.add_success.call_args_list[0][1][
+        'attempts'][0].failure == 'network'
+    assert builder.open_source_cache(source_cache='other') is \
+        builder.open_source_cache(source_cache='other')
+    assert PluginBuilder().pop_attempts('work_dir/1/a') == []
+
+
+def test_start_before_is_ignored_without_background_before():
+    builder = BaseBuilder()
+    builder.before = mock.MagicMock()
+
+    builder.start_before(get_mock_work())
+    assert not builder.before.called
+
+
+def test_run_raises_error_of_background_before():
+    builder = BaseBuilder()
+    builder.background_before = True
+    builder.before = mock.MagicMock(side_effect=ValueError('scrub'))
+    builder.build = mock.MagicMock(return_value=True)
+
+    mock_work = get_mock_work()
+    builder.start_before(mock_work)
+    with pytest.raises(ValueError):
+        builder.run(mock_work)
+    assert not builder.build.called
+
+
+def test_finish_before_logs_error_of_background_before(caplog):
+    builder = BaseBuilder()
+    builder.background_before = True
+    builder.before = mock.MagicMock(side_effect=ValueError('scrub'))
+
+    builder.start_before(get_mock_work())
+    builder.finish_before()
+
+    assert 'ValueError: scrub' in caplog.text
+    # Collected only once
+    builder.finish_before()
+    assert caplog.text.count('ValueError: scrub') == 1
+
+
+def test_finish_before_after_completed_before(caplog):
+    builder = BaseBuilder()
+    builder.background_before = True
+    builder.before = mock.MagicMock(side_effect=ValueError('scrub'))
+
+    mock_work = get_mock_work()
+    builder.start_before(mock_work)
+    with pytest.raises(ValueError):
+        builder.complete_before(mock_work)
+    builder.finish_before()
+
+    assert 'The process before build failed' not in caplog.text
+
+
+def test_build_package_shares_sources(tmpdir):
+    builder = BaseBuilder()
+    builder.build = mock.MagicMock()
+    content = b'tarball\n'
+    checksum = hashlib.sha512(content).hexdigest()
+
+    def build(package_dict, package_dir, **kwargs):
+        tarball = os.path.join(package_dir, 'foo-1.0.tar.gz')
+        if not os.path.exists(tarball):
+            with open(tarball, 'wb') as f:
+                f.write(content)  # as downloaded by rhpkg
+    builder.build.side_effect = build
+
+    package_dict = {'name': 'foo'}
+    source_cache = str(tmpdir.join('sources'))
+    for num_name in ('1', '2'):
+        package_dir = tmpdir.join(num_name, 'foo').ensure(dir=True)
+        package_dir.join('sources').write(
+            'SHA512 (foo-1.0.tar.gz) = {0}\n'.format(checksum))
+        builder.build_package(package_dict, str(package_dir),
+                              source_cache=source_cache)
+
+    first = os.stat(str(tmpdir.join('1', 'foo', 'foo-1.0.tar.gz')))
+    second = os.stat(str(tmpdir.join('2', 'foo', 'foo-1.0.tar.gz')))
+    assert (first.st_dev, first.st_ino) == (second.st_dev, second.st_ino)
@@ -0,0 +1,101 @@
+import subprocess
+from unittest import mock
+
+import pytest
+
+from rpmlb.builder.mock import MockBuilder
+from rpmlb.retry import RetryPolicy
+
+
+@pytest.fixture
+def run_cmd():
+    with mock.patch('rpmlb.builder.mock.utils.run_cmd') as run_cmd:
+        yield run_cmd
+
+
+@pytest.mark.parametrize('build_cache,has_resultdir', [
+    (None, False),
+    ('cache_dir', True),
+])
+def test_build_keeps_results_only_for_build_cache(tmpdir, run_cmd,
+                                                  build_cache, has_resultdir):
+    builder = MockBuilder()
+    package_dir = tmpdir.join('1').mkdir().join('a').mkdir()
+    package_dir.join('a-1.0-1.src.rpm').write('')
+
+    builder.build({'name': 'a'}, str(package_dir), mock_config='epel-7',
+                  build_cache=build_cache)
+
+    cmd = run_cmd.call_args[0][0]
+    assert cmd[:3] == ['mock', '-r', 'epel-7']
+    assert ('--resultdir' in cmd) == has_resultdir
+    assert cmd[-2:] == ['-n', 'a-1.0-1.src.rpm']
+
+
+def test_build_retries_network_error_in_default_result_dir(tmpdir):
+    builder = MockBuilder()
+    builder.retry_policy = RetryPolicy(delay=0)
+    package_dir = tmpdir.join('1').mkdir().join('a').mkdir()
+    package_dir.join('a-1.0-1.src.rpm').write('')
+    mock_dir = tmpdir.join('mock').mkdir().join('epel-7').mkdir()
+    mock_dir.mkdir('result').join('root.log').write(
+        'Errno 14 curl#6 - "Could not resolve host: mirror"\n')
+    error = subprocess.CalledProcessError(
+        30, ['mock', '-r', 'epel-7', '-n', 'a-1.0-1.src.rpm'], output=b'')
+
+    def run_cmd(cmd, **kwargs):
+        if cmd[0] == 'mock' and run_cmd.fails:
+            run_cmd.fails -= 1
+            raise error
+        return mock.Mock(returncode=0, stdout=b'')
+    run_cmd.fails = 1
+    root_proc = mock.Mock(returncode=0,
+                          stdout=str(mock_dir.join('root')).encode() + b'\n')
+
+    with mock.patch('rpmlb.builder.mock.utils.run_cmd', side_effect=run_cmd), \
+            mock.patch('rpmlb.builder.mock.utils.run_cmd_with_capture',
+                       return_value=root_proc) as run_cmd_with_capture:
+        builder.build_with_retrying({'name': 'a'}, str(package_dir),
+                                    mock_config='epel-7')
+
+    run_cmd_with_capture.assert_called_once_with(
+        ['mock', '-r', 'epel-7', '--print-root-path'], check=False)
+    attempts = builder.pop_attempts(str(package_dir))
+    assert [attempt.failure for attempt in attempts] == ['network', None]
+
+
+def test_result_dir_of_build_cache():
+    cmd = ['mock', '-r', 'epel-7', '--resultdir', '/work/1/a/results',
+           '-n', 'a-1.0-1.src.rpm']
+
+    assert MockBuilder.result_dir(cmd) == '/work/1/a/results'
+    assert MockBuilder.result_dir(['rhpkg', 'srpm']) is None
+
+
+def test_before_prepares_root_of_each_build_job(run_cmd):
+    builder = MockBuilder()
+
+    builder.before(mock.MagicMock(), mock_config='epel-7', mock_init=True,
+                   build_jobs=2)
+
+    assert [call[0][0] for call in run_cmd.call_args_list] == [
+        ['mock', '-r', 'epel-7', '--uniqueext', '1', '--scrub=all'],
+        ['mock', '-r', 'epel-7', '--uniqueext', '1', '--init'],
+        ['mock', '-r', 'epel-7', '--uniqueext', '2', '--scrub=all'],
+        ['mock', '-r', 'epel-7', '--uniqueext', '2', '--init'],
+    ]
+
+
+def test_mock_root_is_reused_by_following_builds():
+    builder = MockBuilder()
+
+    with builder.mock_root(build_jobs=2) as first:
+        with builder.mock_root(build_jobs=2) as second:
+            assert (first, second) == ('1', '2')
+            with pytest.raises(RuntimeError):
+                with builder.mock_root(build_jobs=2):
+                    pass
+    with builder.mock_root(build_jobs=2) as third:
+        assert third == '1'
+    with builder.mock_root(build_jobs=1) as default:
+        assert default is None
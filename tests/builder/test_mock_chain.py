@@ -0,0 +1,103 @@
+import os
+import subprocess
+from unittest import mock
+
+import pytest
+
+from rpmlb.builder.base import BaseBuilder
+from rpmlb.builder.mock_chain import MockChainBuilder
+from rpmlb.report import FAILED, SUCCEEDED, RunReport
+
+
+@pytest.fixture
+def run_cmd():
+    with mock.patch('rpmlb.builder.mock_chain.utils.run_cmd') as run_cmd:
+        yield run_cmd
+
+
+def make_package_dir(tmpdir, num_name, name):
+    package_dir = tmpdir.join(num_name).mkdir().join(name).mkdir()
+    package_dir.join('{0}-1.0-1.src.rpm'.format(name)).write('')
+    return str(package_dir)
+
+
+def test_get_instance():
+    builder = BaseBuilder.get_instance('mock-chain')
+    assert isinstance(builder, MockChainBuilder)
+
+
+def test_build_creates_srpm_only(tmpdir, run_cmd):
+    builder = MockChainBuilder()
+    package_dir = make_package_dir(tmpdir, '1', 'a')
+
+    builder.build({'name': 'a'}, package_dir, mock_config='epel-7')
+
+    commands = [call[0][0] for call in run_cmd.call_args_list]
+    assert commands == [
+        ['rm', '-v', 'a-1.0-1.src.rpm'],
+        ['rhpkg', 'srpm'],
+    ]
+    log_files = {call[1]['log_file'] for call in run_cmd.call_args_list}
+    assert log_files == {str(tmpdir.join('1', 'build.log'))}
+
+
+def test_after_builds_chain_in_recipe_order(tmpdir, run_cmd):
+    builder = MockChainBuilder()
+    package_dirs = [
+        make_package_dir(tmpdir, num_name, name)
+        for num_name, name in (('02', 'b'), ('10', 'c'), ('01', 'a'))
+    ]
+    for package_dir in package_dirs:
+        builder.build({}, package_dir, mock_config='epel-7')
+    run_cmd.reset_mock()
+
+    work = mock.MagicMock()
+    work.working_dir = str(tmpdir)
+    builder.after(work, mock_config='epel-7')
+
+    cmd = run_cmd.call_args[0][0]
+    assert cmd[:5] == ['mock', '-r', 'epel-7', '--chain', '--localrepo']
+    srpm_names = [os.path.basename(path) for path in cmd[6:]]
+    assert srpm_names == [
+        'a-1.0-1.src.rpm',
+        'b-1.0-1.src.rpm',
+        'c-1.0-1.src.rpm',
+    ]
+
+
+def test_after_reports_chain_results(tmpdir, run_cmd):
+    builder = MockChainBuilder()
+    for num_name, name in (('1', 'a'), ('2', 'b')):
+        package_dir = make_package_dir(tmpdir, num_name, name)
+        builder.build({'name': name}, package_dir, mock_config='epel-7')
+    tmpdir.join('mock-chain-repo', 'results', 'epel-7-x86_64', 'a-1.0-1',
+                'success').write('', ensure=True)
+    run_cmd.side_effect = subprocess.CalledProcessError(4, ['mock'])
+
+    work = mock.MagicMock()
+    work.working_dir = str(tmpdir)
+    work.report = RunReport()
+    builder.after(work, mock_config='epel-7', keep_going=True)
+
+    assert '--continue' in run_cmd.call_args[0][0]
+    assert [result.name for result in work.report.results(SUCCEEDED)] == [
+        'a']
+    assert [result.name for result in work.report.results(FAILED)] == ['b']
+
+
+def test_after_reports_failed_chain(tmpdir, run_cmd):
+    builder = MockChainBuilder()
+    for num_name, name in (('1', 'a'), ('2', 'b')):
+        package_dir = make_package_dir(tmpdir, num_name, name)
+        builder.build({'name': name}, package_dir, mock_config='epel-7')
+    run_cmd.side_effect = subprocess.CalledProcessError(4, ['mock'])
+
+    work = mock.MagicMock()
+    work.working_dir = str(tmpdir)
+    work.report = RunReport()
+    with pytest.raises(subprocess.CalledProcessError):
+        builder.after(work, mock_config='epel-7')
+
+    assert '--continue' not in run_cmd.call_args[0][0]
+    assert work.report.summary_lines()[0] == (
+        'Summary: 2 failed, 0 skipped, 0 succeeded')
@@ -1,5 +1,32 @@
 """Test configuration for py.test."""
 import os
 import sys
+from unittest import mock
+
+import pytest
+
+from rpmlb.work import Work
 
 sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+
+@pytest.fixture
+def make_work():
+    """Factory of works for mock recipes of the named packages."""
+
+    works = []
+
+    def make(names, work_directory=None):
+        mock_recipe = mock.MagicMock()
+        type(mock_recipe).num_of_package = mock.PropertyMock(
+            return_value=len(names))
+        mock_recipe.each_normalized_package.side_effect = lambda: iter(
+            {'name': name} for name in names)
+        work = Work(mock_recipe, work_directory=work_directory)
+        works.append(work)
+        return work
+
+    yield make
+
+    for work in works:
+        work.close()
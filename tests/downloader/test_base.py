@@ -1,5 +1,8 @@
+import os
 from unittest import mock
 
+import pytest
+
 from rpmlb.downloader.base import BaseDownloader
 
 
@@ -21,6 +24,18 @@ def test_run_calls_before_build_after():
     assert downloader.after.called
 
 
+def test_run_passes_num_dir_to_download():
+    downloader = BaseDownloader()
+    downloader.download = mock.MagicMock(return_value=True)
+
+    mock_work = get_mock_work()
+    downloader.run(mock_work, branch='foo')
+    downloader.download.assert_has_calls([
+        mock.call({'name': 'a'}, 'work_dir/1', branch='foo'),
+        mock.call({'name': 'b'}, 'work_dir/2', branch='foo'),
+    ])
+
+
 def test_run_returns_true_on_success():
     downloader = BaseDownloader()
     downloader.download = lambda *args, **kwargs: None
@@ -52,6 +67,39 @@ def get_mock_work():
         '1',
         '2',
     ]
+    num_dirs = [
+        'work_dir/1',
+        'work_dir/2',
+    ]
     mock_work.each_num_dir.return_value = iter(
-        zip(package_dicts, num_names))
+        zip(package_dicts, num_names, num_dirs))
     return mock_work
+
+
+class TouchDownloader(BaseDownloader):
+    """Downloader creating an empty package directory."""
+
+    def download(self, package_dict, num_dir, **kwargs):
+        if package_dict['name'] == 'broken':
+            raise ValueError('broken package')
+        os.makedirs(os.path.join(num_dir, package_dict['name']))
+
+
+def test_run_downloads_concurrently(make_work):
+    downloader = TouchDownloader()
+    work = make_work(['a', 'b', 'c'])
+    assert downloader.run(work, download_jobs=2)
+    for num_name, name in (('1', 'a'), ('2', 'b'), ('3', 'c')):
+        package_dir = os.path.join(work.working_dir, num_name, name)
+        assert os.path.isdir(package_dir)
+
+
+def test_run_reports_failed_concurrent_downloads(make_work):
+    downloader = TouchDownloader()
+    work = make_work(['a', 'broken', 'c'])
+    with pytest.raises(RuntimeError) as excinfo:
+        downloader.run(work, download_jobs=2)
+    assert '2 (broken)' in str(excinfo.value)
+    # The other packages are downloaded regardless of the failure.
+    assert os.path.isdir(os.path.join(work.working_dir, '1', 'a'))
+    assert os.path.isdir(os.path.join(work.working_dir, '3', 'c'))
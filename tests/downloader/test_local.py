@@ -2,6 +2,7 @@ import os
 import tempfile
 
 import helper
+import pytest
 from rpmlb.downloader.local import LocalDownloader
 
 
@@ -20,6 +21,36 @@ def test_download():
         helper.touch(os.path.join('a', 'a.spec'))
 
     with helper.pushd_tmp_dir():
-        downloader.download(package_dict, source_directory=src_dir)
+        num_dir = os.getcwd()
+        with helper.pushd('/'):
+            downloader.download(package_dict, num_dir,
+                                source_directory=src_dir)
         spec_file = os.path.join('a', 'a.spec')
         assert os.path.isfile(spec_file)
+
+
+@pytest.mark.parametrize('copy_mode', ['copy', 'hardlink', 'reflink'])
+def test_download_copy_mode(tmpdir, copy_mode):
+    downloader = LocalDownloader()
+    package_dict = {'name': 'a'}
+    src_dir = tmpdir.mkdir('src')
+    src_dir.mkdir('a').join('a.spec').write('Name: a\n')
+    num_dir = tmpdir.mkdir('1')
+
+    downloader.download(package_dict, str(num_dir),
+                        source_directory=str(src_dir),
+                        local_copy_mode=copy_mode)
+
+    src_spec = src_dir.join('a', 'a.spec')
+    dst_spec = num_dir.join('a', 'a.spec')
+    assert dst_spec.read() == 'Name: a\n'
+    is_linked = os.path.samefile(str(src_spec), str(dst_spec))
+    assert is_linked == (copy_mode == 'hardlink')
+
+
+def test_download_invalid_copy_mode(tmpdir):
+    downloader = LocalDownloader()
+    with pytest.raises(ValueError):
+        downloader.download({'name': 'a'}, str(tmpdir),
+                            source_directory=str(tmpdir),
+                            local_copy_mode='move')
@@ -1,5 +1,9 @@
+import os
+import subprocess
 from unittest import mock
 
+import pytest
+
 from rpmlb.downloader.rhpkg import RhpkgDownloader
 
 
@@ -13,8 +17,86 @@ def test_download():
     downloader.do_rhpkg_and_checkout = mock.MagicMock(return_value=True)
     package_dict = {'name': 'a'}
     branch = 'private-foo'
-    downloader.download(package_dict, branch=branch)
-    assert True
+    downloader.download(package_dict, 'work_dir/1', branch=branch)
+    downloader.do_rhpkg_and_checkout.assert_called_once_with(
+        package_dict, branch, 'work_dir/1')
+
+
+def _git(*args, cwd=None):
+    output = subprocess.check_output(('git',) + args, cwd=cwd)
+    return output.decode('utf-8').strip()
+
+
+@pytest.fixture
+def server_repo(tmpdir):
+    """A git repository standing for the package on the server."""
+    repo = str(tmpdir.join('server', 'a'))
+    os.makedirs(repo)
+    _git('init', '--quiet', repo)
+    _git('config', 'user.email', 'rpmlb@example.com', cwd=repo)
+    _git('config', 'user.name', 'rpmlb', cwd=repo)
+    _git('commit', '--quiet', '--allow-empty', '-m', 'init', cwd=repo)
+    _git('branch', 'private-foo', cwd=repo)
+    return repo
+
+
+def _commit(repo, branch, message):
+    _git('checkout', '--quiet', branch, cwd=repo)
+    _git('commit', '--quiet', '--allow-empty', '-m', message, cwd=repo)
+    return _git('rev-parse', 'HEAD', cwd=repo)
+
+
+def _mirror_downloader(server_repo):
+    """Downloader cloning from the server repository instead of rhpkg."""
+    downloader = RhpkgDownloader()
+
+    def checkout(package_dict, branch, num_dir):
+        package_dir = os.path.join(num_dir, package_dict['name'])
+        _git('clone', '--quiet', server_repo, package_dir)
+        _git('checkout', '--quiet', branch, cwd=package_dir)
+
+    downloader.do_rhpkg_and_checkout = mock.MagicMock(side_effect=checkout)
+    return downloader
+
+
+def test_download_with_mirror(tmpdir, server_repo):
+    downloader = _mirror_downloader(server_repo)
+    mirror_dir = str(tmpdir.join('mirror'))
+    package_dict = {'name': 'a'}
+
+    num_dir = str(tmpdir.mkdir('1'))
+    downloader.download(package_dict, num_dir, branch='private-foo',
+                        rhpkg_mirror=mirror_dir)
+    assert downloader.do_rhpkg_and_checkout.call_count == 1
+    mirror_path = os.path.join(mirror_dir, 'a.git')
+    assert _git('config', '--get', 'remote.origin.url',
+                cwd=mirror_path) == server_repo
+
+    # The second download only fetches the new commit into the mirror.
+    head = _commit(server_repo, 'private-foo', 'update')
+    num_dir = str(tmpdir.mkdir('2'))
+    downloader.download(package_dict, num_dir, branch='private-foo',
+                        rhpkg_mirror=mirror_dir)
+    assert downloader.do_rhpkg_and_checkout.call_count == 1
+
+    package_dir = os.path.join(num_dir, 'a')
+    assert _git('rev-parse', 'HEAD', cwd=package_dir) == head
+    assert _git('rev-parse', '--abbrev-ref', 'HEAD',
+                cwd=package_dir) == 'private-foo'
+    assert _git('config', '--get', 'remote.origin.url',
+                cwd=package_dir) == server_repo
+
+
+def test_download_with_mirror_unknown_branch(tmpdir, server_repo):
+    downloader = _mirror_downloader(server_repo)
+    mirror_dir = str(tmpdir.join('mirror'))
+    package_dict = {'name': 'a'}
+    downloader.download(package_dict, str(tmpdir.mkdir('1')),
+                        branch='private-foo', rhpkg_mirror=mirror_dir)
+
+    with pytest.raises(subprocess.CalledProcessError):
+        downloader.download(package_dict, str(tmpdir.mkdir('2')),
+                            branch='private-bar', rhpkg_mirror=mirror_dir)
 
 
 """ Comment out for the kerberos auth.
@@ -24,7 +106,7 @@ def test_do_rhpkg_and_checkout():
     branch = 'rhscl-2.4-rh-ror50-rhel-7'
     with helper.pushd_tmp_dir():
         # TODO: Add check for kerberos auth.
-        downloader.do_rhpkg_and_checkout(package_dict, branch)
+        downloader.do_rhpkg_and_checkout(package_dict, branch, os.getcwd())
         spec_file = os.path.join('1', 'rubygem-arel', 'rubygem-arel.spec')
         assert os.path.isfile(spec_file)
         # Show current branch
@@ -1,8 +1,23 @@
 import os
+import re
 import shutil
 import tempfile
 from contextlib import contextmanager
 
+from rpmlb.builder.base import BaseBuilder
+from rpmlb.downloader.base import BaseDownloader
+
+#: Regular expression for finding macro definitions,
+#: as a reference for the macros edited by rpmlb.spec_editor
+MACRO_REGEX = re.compile(
+    r'''^
+    %global\s+                   # beginning of definition
+    (?P<name>[^\s]+)\s+          # one-word name
+    (?P<value>(?:.|(?<=\\)\n)+)  # value including spaces and escaped newlines
+    $''',
+    flags=re.MULTILINE | re.VERBOSE,
+)
+
 
 def touch(path):
     with open(path, 'a'):
@@ -29,3 +44,46 @@ def pushd_tmp_dir():
     finally:
         if os.path.isdir(tmp_dir):
             shutil.rmtree(tmp_dir)
+
+
+class SpecDownloader(BaseDownloader):
+    """Downloader creating a package with a minimal SPEC file,
+    failing the broken ones.
+    """
+
+    def __init__(self, wait_for=None, broken=('broken',)):
+        super().__init__()
+        self.wait_for = wait_for or {}
+        self.broken = set(broken)
+        self.downloaded = []
+
+    def download(self, package_dict, num_dir, **kwargs):
+        name = package_dict['name']
+        if name in self.broken:
+            raise ValueError('broken package')
+        if name in self.wait_for:
+            event, = self.wait_for[name]
+            assert event.wait(timeout=5), 'pipeline did not build early'
+
+        self.downloaded.append(name)
+        package_dir = os.path.join(num_dir, name)
+        os.makedirs(package_dir)
+        with open(os.path.join(package_dir, name + '.spec'), 'w') as spec:
+            print('Name: {0}'.format(name), file=spec)
+
+
+class RecordingBuilder(BaseBuilder):
+    """Builder recording the built packages, failing the broken ones."""
+
+    def __init__(self, broken=(), built_event=None):
+        super().__init__()
+        self.broken = set(broken)
+        self.built = []
+        self.built_event = built_event
+
+    def build(self, package_dict, package_dir, **kwargs):
+        if package_dict['name'] in self.broken:
+            raise ValueError('broken package')
+        self.built.append(package_dict['name'])
+        if self.built_event is not None:
+            self.built_event.set()
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from rpmlb.build_cache import BuildCache
+
+
+def _write(package_dir, file_name, content):
+    with open(os.path.join(package_dir, file_name), 'w') as f:
+        f.write(content)
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return BuildCache(str(tmpdir.join('cache')))
+
+
+@pytest.fixture
+def package_dict():
+    return {'name': 'foo', 'macros': {'bootstrap': 1}}
+
+
+@pytest.fixture
+def package_dir(tmpdir):
+    """Prepared package directory with a spec, a patch and sources"""
+
+    path = tmpdir.join('work', '1', 'foo').ensure(dir=True)
+    path.join('foo.spec').write('# Edited by rpmlb\nName: foo\n')
+    path.join('foo.spec.orig').write('Name: foo\n')
+    path.join('fix.patch').write('patch\n')
+    path.join('sources').write('SHA512 (foo-1.0.tar.gz) = abcdef\n')
+    path.join('foo-1.0.tar.gz').write('tarball\n')
+    return str(path)
+
+
+def test_key_is_stable(cache, package_dict, package_dir):
+    config = {'mock_config': 'epel-7'}
+    assert (cache.key(package_dict, package_dir, config) ==
+            cache.key(package_dict, package_dir, config))
+
+
+@pytest.mark.parametrize('file_name,content', [
+    ('foo.spec', '# Edited by rpmlb\nName: bar\n'),
+    ('fix.patch', 'other patch\n'),
+    ('sources', 'SHA512 (foo-1.0.tar.gz) = 012345\n'),
+])
+def test_key_depends_on_files(cache, package_dict, package_dir,
+                              file_name, content):
+    original_key = cache.key(package_dict, package_dir, {})
+
+    _write(package_dir, file_name, content)
+
+    assert cache.key(package_dict, package_dir, {}) != original_key
+
+
+def test_key_ignores_lookaside_sources(cache, package_dict, package_dir):
+    """The tarballs are covered by the checksums in the sources file."""
+
+    original_key = cache.key(package_dict, package_dir, {})
+
+    _write(package_dir, 'foo-1.0.tar.gz', 'downloaded again\n')
+    _write(package_dir, 'foo-1.0.src.rpm', 'srpm\n')
+
+    assert cache.key(package_dict, package_dir, {}) == original_key
+
+
+def test_key_depends_on_macros_and_config(cache, package_dict, package_dir):
+    original_key = cache.key(package_dict, package_dir, {})
+
+    other_package_dict = dict(package_dict, macros={'bootstrap': 0})
+    assert cache.key(other_package_dict, package_dir, {}) != original_key
+    assert cache.key(package_dict, package_dir, {'a': 1}) != original_key
+
+
+def test_store_and_restore(cache, package_dict, package_dir, tmpdir):
+    os.mkdir(os.path.join(package_dir, 'results'))
+    _write(package_dir, os.path.join('results', 'foo-1.0.x86_64.rpm'),
+           'rpm\n')
+    key = cache.key(package_dict, package_dir, {})
+
+    assert not cache.restore(key, package_dir)
+    cache.store(key, package_dir, package_dict,
+                [os.path.join('results', 'foo-1.0.x86_64.rpm')])
+
+    other_dir = tmpdir.join('other').mkdir()
+    assert cache.restore(key, str(other_dir))
+    restored = other_dir.join('results', 'foo-1.0.x86_64.rpm')
+    assert restored.read() == 'rpm\n'
@@ -4,13 +4,15 @@ import logging
 import os
 from pathlib import Path
 from textwrap import dedent
+from unittest import mock
 
 import click
 import pytest
 from click.testing import CliRunner
 
 from rpmlb import LOG
-from rpmlb.cli import run
+from rpmlb.cli import main, run
+from rpmlb.recipe_index import RecipeIndex
 
 
 @pytest.fixture
@@ -168,6 +170,27 @@ def test_resume_conversion(runner, recipe_arguments):
     assert isinstance(ctx.params['resume'], int)
 
 
+def test_resume_auto(runner, recipe_arguments):
+    """Resume with auto continues from the journal."""
+
+    options = ['--resume', 'auto']
+    ctx = run.make_context('test-resume-journal',
+                           options + recipe_arguments)
+
+    assert ctx.params['resume'] == 'auto'
+
+
+def test_resume_without_value_does_not_take_recipe(runner,
+                                                   recipe_arguments):
+    """The recipe file after a bare --resume is rejected as its value."""
+
+    options = ['--resume']
+
+    with pytest.raises(click.BadParameter) as excinfo:
+        run.make_context('test-resume-bare', options + recipe_arguments)
+    assert '--resume auto' in str(excinfo.value)
+
+
 def test_invalid_resume(runner, recipe_arguments):
 
     options = ['--resume', 'start']
@@ -189,3 +212,108 @@ def test_simple_options(runner, recipe_arguments, option, value):
                            options + recipe_arguments)
 
     assert ctx.params[option.replace('-', '_')] == value
+
+
+def test_download_jobs_conversion(runner, recipe_arguments):
+    """Download jobs are converted into a positive integer."""
+
+    options = ['--download-jobs', '4']
+    ctx = run.make_context('test-download-jobs', options + recipe_arguments)
+
+    assert ctx.params['download_jobs'] == 4
+
+
+def test_invalid_download_jobs(runner, recipe_arguments):
+
+    options = ['--download-jobs', '0']
+
+    with pytest.raises(click.BadParameter):
+        run.make_context('test-download-jobs-error',
+                         options + recipe_arguments)
+
+
+def test_main_runs_build_by_default(recipe_arguments, monkeypatch):
+    """Without a command, the arguments are passed to the build command."""
+
+    build = mock.MagicMock()
+    monkeypatch.setattr(main.commands['build'], 'callback', build)
+
+    result = CliRunner().invoke(main, ['--build-jobs', '2'] +
+                                recipe_arguments)
+
+    assert result.exit_code == 0, result.output
+    assert build.call_args[1]['build_jobs'] == 2
+    assert build.call_args[1]['recipe_name'] == 'test'
+
+
+def test_main_help_lists_build_options():
+    result = CliRunner().invoke(main, ['--help'])
+
+    assert result.exit_code == 0, result.output
+    assert '--build-jobs' in result.output
+    assert 'rpmlb recipe --help' in result.output
+
+
+def test_main_recipe_file_named_as_command(monkeypatch):
+    """A recipe file named as a command is given after --."""
+
+    build = mock.MagicMock()
+    monkeypatch.setattr(main.commands['build'], 'callback', build)
+
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        Path('build').touch()
+        result = runner.invoke(main, ['--', 'build', 'test'])
+
+    assert result.exit_code == 0, result.output
+    assert os.path.basename(build.call_args[1]['recipe_file']) == 'build'
+
+
+def test_recipe_index_command(recipe_arguments, tmpdir, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmpdir.join('cache')))
+    recipe_file, recipe_name = recipe_arguments
+
+    result = CliRunner().invoke(main, ['recipe', 'index', recipe_file])
+
+    assert result.exit_code == 0, result.output
+    index = RecipeIndex(str(tmpdir.join('cache', 'rpmlb', 'recipes')))
+    assert os.listdir(index.recipe_dir(recipe_file))
+
+
+def test_verbose_before_command(recipe_arguments, tmpdir, monkeypatch):
+    """A --verbose before the command does not run the build command."""
+
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmpdir.join('cache')))
+    build = mock.MagicMock()
+    monkeypatch.setattr(main.commands['build'], 'callback', build)
+    recipe_file, recipe_name = recipe_arguments
+
+    with mock.patch('rpmlb.cli.configure_logging') as configure_logging:
+        result = CliRunner().invoke(main, ['-v', 'recipe', 'index',
+                                           recipe_file])
+
+    assert result.exit_code == 0, result.output
+    assert not build.called
+    configure_logging.assert_called_with(True)
+    index = RecipeIndex(str(tmpdir.join('cache', 'rpmlb', 'recipes')))
+    assert os.listdir(index.recipe_dir(recipe_file))
+
+
+def test_verbose_before_build_command(recipe_arguments, monkeypatch):
+    build = mock.MagicMock()
+    monkeypatch.setattr(main.commands['build'], 'callback', build)
+
+    with mock.patch('rpmlb.cli.configure_logging') as configure_logging:
+        result = CliRunner().invoke(main, ['-v', 'build'] + recipe_arguments)
+
+    assert result.exit_code == 0, result.output
+    assert build.called
+    assert configure_logging.call_args_list[-1] == mock.call(True)
+
+
+def test_invalid_build_type(runner, recipe_arguments):
+
+    options = ['--build', 'unknown']
+
+    with pytest.raises(click.BadParameter):
+        run.make_context('test-build-error', options + recipe_arguments)
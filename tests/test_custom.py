@@ -0,0 +1,92 @@
+import subprocess
+from textwrap import dedent
+
+import pytest
+
+from rpmlb import custom
+from rpmlb.custom import Custom
+
+
+def write_custom_file(tmpdir, content):
+    path = tmpdir.join('custom.yml')
+    path.write(dedent(content))
+    return str(path)
+
+
+def test_run_cmds_fixture(tmpdir):
+    custom_file = Custom('tests/fixtures/custom/echo.yml')
+
+    custom_file.run_cmds('download', cwd=str(tmpdir), name='foo')
+
+    assert tmpdir.join('foo', 'foo.spec').check()
+
+
+def test_run_cmds_in_subshells(tmpdir):
+    custom_file = Custom(write_custom_file(tmpdir, '''\
+        build:
+          - mkdir sub && cd sub && FOO=1
+          - echo "${FOO:-unset}" > "$(basename "$PWD").txt"
+        '''))
+
+    custom_file.run_cmds('build', cwd=str(tmpdir))
+
+    assert tmpdir.join('{0}.txt'.format(tmpdir.basename)).read() == 'unset\n'
+
+
+def test_run_cmds_stops_at_failure(tmpdir):
+    custom_file = Custom(write_custom_file(tmpdir, '''\
+        build:
+          - exit 3 # failed
+          - touch not-reached
+        '''))
+
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        custom_file.run_cmds('build', cwd=str(tmpdir))
+
+    assert excinfo.value.returncode == 3
+    assert not tmpdir.join('not-reached').check()
+
+
+def test_run_cmds_package_env(tmpdir):
+    custom_file = Custom(write_custom_file(tmpdir, '''\
+        build:
+          - echo "$PKG $PKG_BOOTSTRAP_POSITION" > env.txt
+        '''))
+
+    custom_file.run_cmds('build', cwd=str(tmpdir), name='foo',
+                         bootstrap_position=2, macros={'a': 1})
+
+    assert tmpdir.join('env.txt').read() == 'foo 2\n'
+
+
+def test_script_without_cmds(tmpdir):
+    custom_file = Custom(write_custom_file(tmpdir, '''\
+        build: []
+        '''))
+
+    assert custom_file.script('build') is None
+    assert custom_file.script('download') is None
+
+
+@pytest.mark.parametrize('content', [
+    '- echo a\n',
+    'build: echo a\n',
+    'build:\n  - echo: a\n',
+])
+def test_invalid_custom_file(tmpdir, content):
+    with pytest.raises(ValueError):
+        Custom(write_custom_file(tmpdir, content))
+
+
+def test_load_once(tmpdir):
+    custom_file = write_custom_file(tmpdir, 'build: [echo a]\n')
+
+    assert custom.load(custom_file) is custom.load(custom_file)
+
+
+def test_package_env():
+    assert custom.package_env({
+        'name': 'foo',
+        'bootstrap_position': None,
+        'macros': {'a': 1},
+    }) == {'PKG': 'foo'}
@@ -0,0 +1,90 @@
+import os
+from unittest import mock
+
+import pytest
+from helper import RecordingBuilder, SpecDownloader
+
+from rpmlb import journal
+from rpmlb.journal import Journal, fingerprint
+
+
+def test_record_is_loaded_again(tmpdir):
+    path = str(tmpdir.join(journal.JOURNAL_FILE_NAME))
+    Journal(path).record('1', 'a', journal.PREPARE, 'fingerprint-1')
+    Journal(path).record('1', 'a', journal.PREPARE, 'fingerprint-2')
+    with open(path, 'a') as journal_file:
+        journal_file.write('{"num": "2", "pha')
+
+    entry = Journal(path).entry('1', journal.PREPARE)
+
+    assert entry['name'] == 'a'
+    assert entry['fingerprint'] == 'fingerprint-2'
+    assert Journal(path).entry('2', journal.PREPARE) is None
+
+
+def test_next_phase(tmpdir):
+    package_dir = tmpdir.join('1', 'a')
+    package_dir.join('a.spec').write('Name: a\n', ensure=True)
+    package_dir = str(package_dir)
+    journal_file = Journal(str(tmpdir.join(journal.JOURNAL_FILE_NAME)))
+
+    assert journal_file.next_phase('1', 'a', package_dir) == journal.DOWNLOAD
+
+    journal_file.record('1', 'a', journal.DOWNLOAD)
+    assert journal_file.next_phase('1', 'a', package_dir) == journal.PREPARE
+    # Another package at the position is downloaded again.
+    assert journal_file.next_phase('1', 'b', package_dir) == journal.DOWNLOAD
+
+    journal_file.record('1', 'a', journal.PREPARE, fingerprint(package_dir))
+    assert journal_file.next_phase('1', 'a', package_dir) == journal.BUILD
+
+    journal_file.record('1', 'a', journal.BUILD, fingerprint(package_dir))
+    assert journal_file.next_phase('1', 'a', package_dir) is None
+
+    # A SPEC file fixed by hand is prepared and built again.
+    with open(os.path.join(package_dir, 'a.spec'), 'a') as spec:
+        spec.write('Version: 1\n')
+    assert journal_file.next_phase('1', 'a', package_dir) == journal.PREPARE
+
+
+def test_fingerprint_ignores_build_results(tmpdir):
+    tmpdir.join('a.spec').write('Name: a\n')
+    tmpdir.join('sources').write('SHA512 (a.tar.gz) = 1234\n')
+    expected = fingerprint(str(tmpdir))
+
+    tmpdir.join('a.tar.gz').write('source')
+    tmpdir.join('a-1-1.src.rpm').write('srpm')
+    tmpdir.join('results', 'build.log').write('log', ensure=True)
+    tmpdir.join('.stamp').write('stamp')
+
+    assert fingerprint(str(tmpdir)) == expected
+    assert fingerprint(str(tmpdir.join('missing'))) is None
+
+    tmpdir.join('a.spec').write('Name: other\n')
+    assert fingerprint(str(tmpdir)) != expected
+
+
+def test_resume_continues_from_failed_package(make_work, tmpdir):
+    downloader = SpecDownloader()
+    builder = RecordingBuilder(broken=['b'])
+
+    work = make_work(['a', 'b', 'c'], work_directory=str(tmpdir))
+    downloader.run(work)
+    with pytest.raises(RuntimeError):
+        builder.run(work, retry_attempts=1)
+    assert builder.built == ['a']
+
+    downloader = SpecDownloader()
+    builder = RecordingBuilder()
+    builder.before = mock.MagicMock()
+    # A lost package directory is downloaded again.
+    os.rename(os.path.join(work.working_dir, '3', 'c'),
+              os.path.join(work.working_dir, '3', 'c.lost'))
+
+    work = make_work(['a', 'b', 'c'], work_directory=str(tmpdir))
+    downloader.run(work, resume=journal.AUTO_RESUME)
+    builder.run(work, resume=journal.AUTO_RESUME)
+
+    assert downloader.downloaded == ['c']
+    assert not builder.before.called
+    assert builder.built == ['b', 'c']
@@ -0,0 +1,101 @@
+import os
+import threading
+from unittest import mock
+
+import pytest
+from helper import RecordingBuilder, SpecDownloader
+
+from rpmlb import journal, pipeline
+
+
+def test_build_starts_before_downloads_finish(make_work):
+    built_event = threading.Event()
+    downloader = SpecDownloader(wait_for={'c': (built_event,)})
+    builder = RecordingBuilder(built_event=built_event)
+
+    work = make_work(['a', 'b', 'c'])
+    assert pipeline.run(downloader, builder, work, download_jobs=3)
+
+    assert builder.built == ['a', 'b', 'c']
+
+
+def test_calls_before_and_after(make_work):
+    downloader = SpecDownloader()
+    downloader.before = mock.MagicMock()
+    downloader.after = mock.MagicMock()
+    builder = RecordingBuilder()
+    builder.before = mock.MagicMock()
+    builder.after = mock.MagicMock()
+
+    work = make_work(['a', 'b'])
+    pipeline.run(downloader, builder, work)
+
+    assert downloader.before.called
+    assert downloader.after.called
+    assert builder.before.called
+    assert builder.after.called
+
+
+def test_download_failure_stops_builds(make_work):
+    downloader = SpecDownloader()
+    builder = RecordingBuilder()
+
+    work = make_work(['a', 'broken', 'c'])
+    with pytest.raises(RuntimeError) as excinfo:
+        pipeline.run(downloader, builder, work, download_jobs=2)
+
+    assert 'num: 2' in str(excinfo.value)
+    assert 'c' not in builder.built
+
+
+def test_keep_going_builds_independent_packages(make_work):
+    downloader = SpecDownloader()
+    builder = RecordingBuilder()
+
+    work = make_work(['a', 'broken', 'c'])
+    assert not pipeline.run(downloader, builder, work, download_jobs=2,
+                            keep_going=True)
+
+    assert builder.built == ['a', 'c']
+    assert [(result.name, result.status, result.stage)
+            for result in work.report.results()] == [
+        ('a', 'succeeded', None),
+        ('broken', 'failed', 'download'),
+        ('c', 'succeeded', None),
+    ]
+
+
+def test_resume_from_journal(make_work, tmpdir):
+    work = make_work(['a', 'b', 'c'], work_directory=str(tmpdir))
+    with pytest.raises(RuntimeError):
+        pipeline.run(SpecDownloader(), RecordingBuilder(broken=['b']), work,
+                     retry_attempts=1)
+    # A lost package directory is downloaded again.
+    os.rename(os.path.join(work.working_dir, '3', 'c'),
+              os.path.join(work.working_dir, '3', 'c.lost'))
+
+    downloader = SpecDownloader()
+    builder = RecordingBuilder()
+    builder.before = mock.MagicMock()
+    work = make_work(['a', 'b', 'c'], work_directory=str(tmpdir))
+    assert pipeline.run(downloader, builder, work,
+                        resume=journal.AUTO_RESUME)
+
+    assert downloader.downloaded == ['c']
+    assert not builder.before.called
+    assert builder.built == ['b', 'c']
+
+
+def test_resume_from_package_number(make_work, tmpdir):
+    work = make_work(['a', 'b', 'c'], work_directory=str(tmpdir))
+    SpecDownloader().run(work)
+
+    downloader = SpecDownloader()
+    downloader.before = mock.MagicMock()
+    builder = RecordingBuilder()
+    work = make_work(['a', 'b', 'c'], work_directory=str(tmpdir))
+    assert pipeline.run(downloader, builder, work, resume=2)
+
+    assert not downloader.before.called
+    assert downloader.downloaded == []
+    assert builder.built == ['b', 'c']
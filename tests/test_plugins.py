@@ -0,0 +1,65 @@
+from unittest import mock
+
+import pytest
+
+from rpmlb import plugins
+from rpmlb.builder.base import BaseBuilder
+from rpmlb.builder.dummy import DummyBuilder
+from rpmlb.downloader.base import BaseDownloader
+from rpmlb.downloader.none import NoneDownloader
+
+
+class PluginBuilder(BaseBuilder):
+    pass
+
+
+@pytest.fixture
+def registry():
+    return plugins.Registry('builder', 'test.builders', [
+        ('dummy', 'rpmlb.builder.dummy:DummyBuilder'),
+    ])
+
+
+@pytest.fixture
+def entry_points(monkeypatch):
+    entry_point = mock.Mock()
+    entry_point.name = 'plugin'
+    entry_point.load.return_value = PluginBuilder
+    discover = mock.Mock(return_value=[entry_point])
+    monkeypatch.setattr(plugins, '_entry_points', discover)
+    return discover
+
+
+def test_builtin_without_discovery(registry, entry_points):
+    assert registry.load('dummy') is DummyBuilder
+    assert 'dummy' in registry
+    assert not entry_points.called
+
+
+def test_plugin_discovered_once(registry, entry_points):
+    assert isinstance(registry.create('plugin'), PluginBuilder)
+    assert 'plugin' in registry
+    assert registry.names() == ['dummy', 'plugin']
+    entry_points.assert_called_once_with('test.builders')
+
+
+def test_unknown_name(registry, entry_points):
+    assert 'unknown' not in registry
+    with pytest.raises(ValueError) as excinfo:
+        registry.load('unknown')
+    assert 'dummy, plugin' in str(excinfo.value)
+
+
+@pytest.mark.parametrize('name', plugins.BUILDERS.builtin_names)
+def test_builtin_builders(name):
+    assert issubclass(plugins.BUILDERS.load(name), BaseBuilder)
+
+
+@pytest.mark.parametrize('name', plugins.DOWNLOADERS.builtin_names)
+def test_builtin_downloaders(name):
+    assert issubclass(plugins.DOWNLOADERS.load(name), BaseDownloader)
+
+
+def test_get_instance():
+    assert isinstance(BaseBuilder.get_instance('dummy'), DummyBuilder)
+    assert isinstance(BaseDownloader.get_instance('none'), NoneDownloader)
@@ -185,3 +185,27 @@ def test_bootstrap_sequence_increments_correctly(bootstrap_recipe):
         sequences[pkg['name']].append(pkg['bootstrap_position'])
 
     assert sequences['pkg-a'] == [1, 2, None], sequences['pkg-a']
+
+
+def test_packages_are_normalized_once(ok_recipe):
+    first = list(ok_recipe.each_normalized_package())
+    second = list(ok_recipe.each_normalized_package())
+
+    assert all(a is b for a, b in zip(first, second))
+    assert [pkg.position for pkg in first] == \
+        list(range(1, ok_recipe.num_of_package + 1))
+
+
+def test_package_entry_is_immutable(ok_recipe):
+    ok_recipe.recipe['packages'] += [{'pkg-a': {'macros': {'m': 1}}}]
+    package = ok_recipe.packages[-1]
+
+    assert isinstance(package, Mapping)
+    assert package['macros'] is package.macros
+    assert not hasattr(package, '__dict__')
+    with pytest.raises(AttributeError):
+        package.name = 'other'
+    with pytest.raises(TypeError):
+        package['name'] = 'other'
+    with pytest.raises(TypeError):
+        package.macros['other'] = 1
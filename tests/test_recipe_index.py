@@ -0,0 +1,81 @@
+import os
+from textwrap import dedent
+
+import pytest
+
+from rpmlb.recipe import Recipe
+from rpmlb.recipe_index import RecipeIndex, default_directory
+
+
+@pytest.fixture
+def index(tmpdir):
+    return RecipeIndex(str(tmpdir.join('index')))
+
+
+@pytest.fixture
+def recipe_file(tmpdir):
+    path = tmpdir.join('recipe.yml')
+    path.write(dedent('''\
+        a:
+          name: a
+          packages:
+            - pkg-a
+        b:
+          name: b
+          packages:
+            - pkg-b:
+                macros:
+                  bootstrap: 1
+        '''))
+    return str(path)
+
+
+def test_default_directory(monkeypatch, tmpdir):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmpdir))
+    assert default_directory() == str(tmpdir.join('rpmlb', 'recipes'))
+
+
+def test_load(index, recipe_file):
+    collection = index.load(recipe_file, 'b')
+    assert collection == {
+        'name': 'b',
+        'packages': [{'pkg-b': {'macros': {'bootstrap': 1}}}],
+    }
+
+
+def test_load_unknown_collection(index, recipe_file):
+    with pytest.raises(KeyError):
+        index.load(recipe_file, 'c')
+
+
+def test_load_uses_index(index, recipe_file, monkeypatch):
+    index.build(recipe_file)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('The recipe file should not be parsed.')
+    monkeypatch.setattr('rpmlb.recipe_index.Yaml', fail)
+
+    assert index.load(recipe_file, 'a')['name'] == 'a'
+    # Touched, but same contents.
+    os.utime(recipe_file, (1, 1))
+    assert index.load(recipe_file, 'a')['name'] == 'a'
+
+
+def test_load_after_change(index, recipe_file):
+    assert index.load(recipe_file, 'a')['name'] == 'a'
+
+    with open(recipe_file, 'w') as f:
+        f.write('a:\n  name: changed\n  packages: [pkg-a]\n')
+
+    assert index.load(recipe_file, 'a')['name'] == 'changed'
+    with pytest.raises(KeyError):
+        index.load(recipe_file, 'b')
+    # Only the collections of the current contents are kept.
+    assert len(os.listdir(index.recipe_dir(recipe_file))) == 2
+
+
+def test_recipe_with_index(tmpdir, recipe_file):
+    recipe = Recipe(recipe_file, 'b',
+                    index_directory=str(tmpdir.join('index')))
+    assert recipe.verify()
+    assert recipe.num_of_package == 1
@@ -0,0 +1,88 @@
+import subprocess
+from unittest import mock
+
+import pytest
+
+from rpmlb.builder.base import BaseBuilder
+from rpmlb.custom import compile_script
+from rpmlb.report import FAILED, RunReport
+from rpmlb.retry import Attempt, RetryPolicy
+
+
+def test_summary_lines():
+    report = RunReport()
+    report.add_success('1', 'meta')
+    report.add_skip('10', 'app', ['3'])
+    report.add_failure('3', 'lib', 'build',
+                       RuntimeError('line 1\nerror: Bad exit status\n'))
+    report.add_success('2', 'tool')
+
+    assert report.failed
+    assert report.summary_lines() == [
+        'Summary: 1 failed, 1 skipped, 2 succeeded',
+        '  failed: lib (3) at build: RuntimeError: error: Bad exit status',
+        '  skipped: app (10), blocked by 3',
+        '  succeeded: meta (1), tool (2)',
+    ]
+
+
+@pytest.mark.parametrize('cmd,message', [
+    (compile_script(['make', 'make check\nmake install']),
+     "CalledProcessError: 'make' exited with status 2"),
+    (['mock', '-r', 'epel-7', '-n', 'a-1.0-1.src.rpm'],
+     "CalledProcessError: 'mock' exited with status 2"),
+])
+def test_summary_names_failed_command(cmd, message):
+    report = RunReport()
+    report.add_failure('1', 'a', 'build',
+                       subprocess.CalledProcessError(2, cmd))
+
+    assert report.summary_lines()[1] == (
+        '  failed: a (1) at build: ' + message)
+
+
+def test_later_result_replaces_earlier():
+    report = RunReport()
+    report.add_failure('1', 'a', 'download', ValueError())
+    report.add_success('1', 'a')
+
+    assert not report.failed
+    assert report.results(FAILED) == []
+
+
+def test_summary_lists_attempts():
+    report = RunReport()
+    report.add_success('1', 'a', attempts=[
+        Attempt('a', 1, 'network', 12.34),
+        Attempt('a', 2, None, 40.0),
+    ])
+    report.add_success('2', 'b', attempts=[Attempt('b', 1, None, 1.0)])
+
+    assert report.summary_lines()[-1] == (
+        '  attempts of a (1): #1 network failure in 12.3s, '
+        '#2 succeeded in 40.0s')
+    assert not any('attempts of b' in line
+                   for line in report.summary_lines())
+
+
+def test_build_attempts_are_reported():
+    builder = BaseBuilder()
+    builder.retry_policy = RetryPolicy(delay=0)
+    builder.build = mock.Mock(side_effect=[
+        subprocess.CalledProcessError(
+            1, ['mock'], output=b'Curl error (7): Failed to connect\n'),
+        subprocess.CalledProcessError(
+            1, ['mock'], output=b'error: Bad exit status from (%build)\n'),
+    ])
+    work = mock.MagicMock()
+    work.report = RunReport()
+
+    with pytest.raises(subprocess.CalledProcessError):
+        builder.build_and_record(work, {'name': 'a'}, '1', 'work_dir/1/a')
+
+    result = work.report.get('1')
+    assert result.status == FAILED
+    assert [(attempt.number, attempt.failure)
+            for attempt in result.attempts] == [(1, 'network'), (2, 'build')]
+    assert work.report.summary_lines()[-1].startswith(
+        '  attempts of a (1): #1 network failure in ')
@@ -0,0 +1,117 @@
+import subprocess
+from unittest import mock
+
+import pytest
+
+from rpmlb.builder.base import BaseBuilder
+from rpmlb.retry import RetryPolicy
+
+
+@pytest.mark.parametrize('log_text,failure', [
+    ('error: Bad exit status from /var/tmp/rpm-tmp.x (%build)', 'build'),
+    ('error: Failed build dependencies:\n\tfoo is needed', 'build'),
+    ('No matching package to install: foo', 'build'),
+    ('koji.ServerOffline: database outage', 'infrastructure'),
+    ('copr.v3.exceptions.CoprRequestException: 503', 'infrastructure'),
+    ('HTTP Error 503 - Service Unavailable', 'infrastructure'),
+    ('Curl error (6): Could not resolve host: mirror', 'network'),
+    ('fatal: unable to access https://example.com/', 'network'),
+    ('Connection timed out', 'network'),
+    ('something else', 'unknown'),
+    ('', 'unknown'),
+])
+def test_classify(log_text, failure):
+    assert RetryPolicy().classify(log_text) == failure
+
+
+def test_classify_build_before_network():
+    policy = RetryPolicy()
+    log_text = 'Connection refused\nerror: Bad exit status from (%check)'
+    assert policy.classify(log_text) == 'build'
+
+
+def test_should_retry():
+    policy = RetryPolicy(max_attempts=3)
+
+    assert policy.should_retry('network', 1)
+    assert policy.should_retry('infrastructure', 2)
+    assert not policy.should_retry('network', 3)
+    assert not policy.should_retry('build', 1)
+    assert not policy.should_retry('unknown', 1)
+
+
+def test_should_retry_unknown_if_requested():
+    policy = RetryPolicy(max_attempts=3, retry_unknown=True)
+
+    assert policy.should_retry('unknown', 2)
+    assert not policy.should_retry('unknown', 3)
+    assert not policy.should_retry('build', 1)
+
+
+def test_wait_time_backoff_with_jitter():
+    policy = RetryPolicy(delay=10, max_delay=35, jitter=0.5)
+
+    for attempt, full_wait in ((1, 10), (2, 20), (3, 35), (10, 35)):
+        wait = policy.wait_time(attempt)
+        assert full_wait * 0.5 <= wait <= full_wait
+
+
+def test_from_options():
+    policy = RetryPolicy.from_options(retry_attempts=5, retry_delay=0,
+                                      retry_unknown=True)
+
+    assert policy.max_attempts == 5
+    assert policy.delay == 0
+    assert policy.retry_unknown
+    assert RetryPolicy.from_options().max_attempts == 3
+    assert not RetryPolicy.from_options().retry_unknown
+
+
+def failed_build(output):
+    return subprocess.CalledProcessError(1, ['mock'], output=output)
+
+
+def test_build_failure_not_retried():
+    builder = BaseBuilder()
+    builder.retry_policy = RetryPolicy(delay=0)
+    builder.build = mock.Mock(side_effect=failed_build(
+        b'error: Bad exit status from /var/tmp/rpm-tmp.x (%build)\n'))
+
+    with pytest.raises(subprocess.CalledProcessError):
+        builder.build_with_retrying({'name': 'a'}, 'work_dir/1/a')
+
+    assert builder.build.call_count == 1
+    assert [(attempt.number, attempt.failure)
+            for attempt in builder.pop_attempts('work_dir/1/a')] == [
+        (1, 'build')]
+
+
+def test_network_failure_retried():
+    builder = BaseBuilder()
+    builder.retry_policy = RetryPolicy(delay=0)
+    builder.build = mock.Mock(side_effect=[
+        failed_build(b'Curl error (7): Failed to connect\n'),
+        None,
+    ])
+
+    builder.build_with_retrying({'name': 'a'}, 'work_dir/1/a')
+
+    assert builder.build.call_count == 2
+    assert [(attempt.name, attempt.number, attempt.failure)
+            for attempt in builder.pop_attempts('work_dir/1/a')] == [
+        ('a', 1, 'network'),
+        ('a', 2, None),
+    ]
+
+
+def test_retry_waits_with_policy():
+    builder = BaseBuilder()
+    builder.retry_policy = RetryPolicy(max_attempts=3, delay=4, jitter=0)
+    builder.retry_policy.sleep = mock.Mock()
+    builder.build = mock.Mock(side_effect=ValueError('Connection reset'))
+
+    with pytest.raises(ValueError):
+        builder.build_with_retrying({'name': 'a'}, 'work_dir/1/a')
+
+    assert builder.retry_policy.sleep.call_args_list == [
+        mock.call(4), mock.call(8)]
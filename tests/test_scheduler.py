@@ -0,0 +1,156 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from rpmlb.scheduler import Scheduler, package_dependencies
+
+
+def make_spec(build_requires=(), capabilities=()):
+    spec = mock.MagicMock()
+    spec.build_requires = list(build_requires)
+    spec.capabilities = list(capabilities)
+    return spec
+
+
+def test_tasks_run_after_dependencies():
+    finished = []
+    lock = threading.Lock()
+
+    def task(key, delay=0.0):
+        def run():
+            time.sleep(delay)
+            with lock:
+                finished.append(key)
+        return run
+
+    with Scheduler(jobs=3) as scheduler:
+        scheduler.add('a', task('a', 0.05))
+        scheduler.add('b', task('b'), dependencies=['a'])
+        scheduler.add('c', task('c'))
+        scheduler.add('d', task('d'), dependencies=['b', 'c'])
+        scheduler.wait()
+
+    assert sorted(finished) == ['a', 'b', 'c', 'd']
+    assert finished.index('a') < finished.index('b') < finished.index('d')
+    # The independent task does not wait for the slow one.
+    assert finished.index('c') < finished.index('a')
+
+
+def test_jobs_limit_running_tasks():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def task():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.pop()
+
+    with Scheduler(jobs=2) as scheduler:
+        for key in range(6):
+            scheduler.add(key, task)
+        scheduler.wait()
+
+    assert max(peak) == 2
+
+
+def test_failure_stops_dependent_tasks():
+    dependent = mock.MagicMock()
+
+    with Scheduler(jobs=2) as scheduler:
+        scheduler.add('a', mock.MagicMock(side_effect=ValueError('a')))
+        scheduler.add('b', dependent, dependencies=['a'])
+        with pytest.raises(ValueError):
+            scheduler.wait()
+
+    assert not dependent.called
+
+
+def test_keep_going_skips_only_dependent_tasks():
+    def fail():
+        raise ValueError('test')
+
+    done = []
+    with Scheduler(jobs=2, keep_going=True) as scheduler:
+        scheduler.add('a', fail)
+        scheduler.add('b', lambda: done.append('b'))
+        scheduler.add('c', mock.MagicMock(), dependencies=['a'])
+        scheduler.add('d', mock.MagicMock(), dependencies=['b', 'c'])
+        scheduler.add('e', lambda: done.append('e'), dependencies=['b'])
+        scheduler.wait()
+
+    assert done == ['b', 'e']
+    assert list(scheduler.errors) == ['a']
+    assert scheduler.skipped == {'c': {'a'}, 'd': {'a'}}
+
+
+def test_keep_going_with_added_failure():
+    with Scheduler(keep_going=True) as scheduler:
+        scheduler.add_failure('a', ValueError('download'))
+        scheduler.add('b', mock.MagicMock(), dependencies=['a'])
+        scheduler.wait()
+
+    assert scheduler.failed
+    assert scheduler.skipped == {'b': {'a'}}
+
+
+def test_unknown_dependency_is_rejected():
+    with Scheduler() as scheduler:
+        with pytest.raises(ValueError):
+            scheduler.add('a', mock.MagicMock(), dependencies=['b'])
+
+
+def test_package_dependencies():
+    packages = [
+        ('1', 'meta', make_spec(capabilities=['meta', 'meta-build'])),
+        ('2', 'lib', make_spec(capabilities=['lib', 'lib(api)'])),
+        ('3', 'app', make_spec(build_requires=['lib(api)'])),
+        ('4', 'tool', make_spec(build_requires=['unknown'])),
+        ('5', 'lib', make_spec(build_requires=['app'],
+                               capabilities=['lib', 'lib(api)'])),
+        ('6', 'plugin', make_spec(build_requires=['lib'])),
+    ]
+
+    assert package_dependencies(packages) == {
+        '1': frozenset(),
+        '2': {'1'},
+        '3': {'1', '2'},
+        '4': {'1'},
+        # Bootstrap stage of lib
+        '5': {'1', '2', '3'},
+        # The latest lib is used
+        '6': {'1', '5'},
+    }
+
+
+def test_package_without_spec_is_a_barrier():
+    packages = [
+        ('1', 'meta', make_spec()),
+        ('2', 'a', make_spec()),
+        ('3', 'unknown', None),
+        ('4', 'b', make_spec()),
+    ]
+
+    dependency_map = package_dependencies(packages)
+
+    assert dependency_map['3'] == {'1', '2'}
+    assert dependency_map['4'] == {'3'}
+
+
+def test_failed_package_without_spec_is_not_a_barrier():
+    packages = [
+        ('1', 'meta', make_spec()),
+        ('2', 'broken', None),
+        ('3', 'b', make_spec(build_requires=['broken'])),
+        ('4', 'c', make_spec()),
+    ]
+
+    dependency_map = package_dependencies(packages, failed_keys={'2'})
+
+    assert dependency_map['3'] == {'1', '2'}
+    assert dependency_map['4'] == {'1'}
@@ -0,0 +1,104 @@
+import hashlib
+import os
+
+import pytest
+
+from rpmlb.source_cache import SourceCache
+from rpmlb.sources import read_sources
+
+
+def _write_package(package_dir, files):
+    """Write lookaside files and the sources file listing them."""
+
+    package_dir.ensure(dir=True)
+    lines = []
+    for file_name, content in files.items():
+        checksum = hashlib.sha512(content).hexdigest()
+        lines.append('SHA512 ({0}) = {1}\n'.format(file_name, checksum))
+        package_dir.join(file_name).write_binary(content)
+    package_dir.join('sources').write(''.join(lines))
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return SourceCache(str(tmpdir.join('cache')))
+
+
+def test_store_and_link(cache, tmpdir):
+    first_dir = tmpdir.join('1', 'foo')
+    _write_package(first_dir, {'foo-1.0.tar.gz': b'tarball\n'})
+    assert cache.store(str(first_dir)) == 1
+    assert cache.store(str(first_dir)) == 0
+
+    second_dir = tmpdir.join('2', 'foo').ensure(dir=True)
+    second_dir.join('sources').write(first_dir.join('sources').read())
+
+    assert cache.link(str(second_dir)) == 1
+    assert second_dir.join('foo-1.0.tar.gz').read_binary() == b'tarball\n'
+    # Existing files are kept.
+    assert cache.link(str(second_dir)) == 0
+
+
+def test_link_miss(cache, tmpdir):
+    package_dir = tmpdir.join('foo')
+    _write_package(package_dir, {'foo-1.0.tar.gz': b'tarball\n'})
+    package_dir.join('foo-1.0.tar.gz').remove()
+
+    assert cache.link(str(package_dir)) == 0
+    assert not package_dir.join('foo-1.0.tar.gz').exists()
+
+
+def test_store_skips_checksum_mismatch(cache, tmpdir):
+    package_dir = tmpdir.join('foo')
+    _write_package(package_dir, {'foo-1.0.tar.gz': b'tarball\n'})
+    package_dir.join('foo-1.0.tar.gz').write_binary(b'broken\n')
+
+    assert cache.store(str(package_dir)) == 0
+
+
+def test_evict_least_recently_used(tmpdir):
+    cache = SourceCache(str(tmpdir.join('cache')), max_size=20)
+    package_dir = tmpdir.join('foo')
+    _write_package(package_dir, {
+        'a.tar.gz': b'a' * 10,
+        'b.tar.gz': b'b' * 10,
+    })
+    assert cache.store(str(package_dir)) == 2
+
+    cache_paths = {}
+    for file_name in ('a.tar.gz', 'b.tar.gz'):
+        content = package_dir.join(file_name).read_binary()
+        checksum = hashlib.sha512(content).hexdigest()
+        cache_paths[file_name] = os.path.join(
+            cache.directory, 'sha512', checksum[:2], checksum)
+    # a is older than b.
+    os.utime(cache_paths['a.tar.gz'], (1, 1))
+
+    _write_package(package_dir, {'c.tar.gz': b'c' * 10})
+    assert cache.store(str(package_dir)) == 1
+
+    assert not os.path.exists(cache_paths['a.tar.gz'])
+    assert os.path.exists(cache_paths['b.tar.gz'])
+
+
+def test_evict_skips_files_being_stored(tmpdir):
+    cache = SourceCache(str(tmpdir.join('cache')), max_size=5)
+    tmp_path = os.path.join(cache.directory, 'sha512', 'ab', 'abcd.tmp-1-2')
+    os.makedirs(os.path.dirname(tmp_path))
+    with open(tmp_path, 'wb') as f:
+        f.write(b'x' * 10)
+
+    cache.evict()
+
+    assert os.path.exists(tmp_path)
+
+
+def test_sources_with_path_names_are_ignored(cache, tmpdir):
+    package_dir = tmpdir.join('foo')
+    _write_package(package_dir, {'foo-1.0.tar.gz': b'tarball\n'})
+    with package_dir.join('sources').open('a') as sources_file:
+        sources_file.write('SHA512 (../escape.tar.gz) = 1234\n')
+        sources_file.write('SHA512 (sub/file.tar.gz) = 1234\n')
+
+    assert [entry.file_name for entry in read_sources(str(package_dir))] == [
+        'foo-1.0.tar.gz']
@@ -0,0 +1,193 @@
+from textwrap import dedent
+from unittest import mock
+
+import pytest
+
+from rpmlb.spec import Spec, SpecCache, dependency_names
+
+
+@pytest.fixture
+def scl_spec():
+    """SPEC file in the usual Software Collection form"""
+
+    return Spec(dedent('''\
+        %{?scl:%scl_package rubygem-%{gem_name}}
+        %{!?scl:%global pkg_name %{name}}
+
+        %global gem_name rspec-core
+
+        Name: %{?scl_prefix}rubygem-%{gem_name}
+        Version: 3.5.4
+        Release: 1%{?dist}
+        BuildRequires: %{?scl_prefix_ruby}ruby(release)
+        BuildRequires: %{?scl_prefix}rubygem(rspec-support) >= 3.5, \\
+            %{?scl_prefix}rubygem(minitest)
+        BuildRequires: (foo or bar)
+        Provides: %{?scl_prefix}rubygem(%{gem_name}) = %{version}
+        %{?scl:Requires: %{scl}-runtime}
+
+        %description
+        A test package.
+
+        %package doc
+        Summary: Documentation
+
+        %package -n %{?scl_prefix}rspec
+        Summary: Executables
+        '''))
+
+
+def test_name_is_expanded(scl_spec):
+    assert scl_spec.name == 'rubygem-rspec-core'
+
+
+def test_build_requires(scl_spec):
+    assert scl_spec.build_requires == [
+        'ruby(release)',
+        'rubygem(rspec-support)',
+        'rubygem(minitest)',
+    ]
+
+
+def test_capabilities(scl_spec):
+    assert scl_spec.capabilities == [
+        'rubygem-rspec-core',
+        'rubygem-rspec-core-doc',
+        'rspec',
+        'rubygem(rspec-core)',
+    ]
+
+
+@pytest.mark.parametrize('text,expected', [
+    ('%{gem_name}', 'rspec-core'),
+    ('%gem_name-doc', 'rspec-core-doc'),
+    ('%{?undefined}', ''),
+    ('%{?gem_name:yes}', 'yes'),
+    ('%{!?undefined:no}', 'no'),
+    ('%{undefined}', '%{undefined}'),
+    ('100%%', '100%'),
+])
+def test_expand(scl_spec, text, expected):
+    assert scl_spec.expand(text) == expected
+
+
+def test_dependency_names():
+    names = dependency_names('foo >= 1.0, bar baz = 2')
+    assert list(names) == ['foo', 'bar', 'baz']
+
+
+def test_version_release_sources(scl_spec):
+    assert scl_spec.version == '3.5.4'
+    assert scl_spec.release == '1'
+
+    spec = Spec(dedent('''\
+        Name: foo
+        Version: 1.0
+        Source0: https://example.com/%{name}-%{version}.tar.gz
+        Source1: foo.conf
+        Patch0: foo-fix.patch
+        '''))
+    assert spec.sources == [
+        'https://example.com/foo-1.0.tar.gz',
+        'foo.conf',
+    ]
+    assert spec.patches == ['foo-fix.patch']
+
+
+@pytest.mark.parametrize('condition,expected', [
+    # Known macros are evaluated.
+    ('%{with_tests}', ['tests']),
+    ('!%{with_tests}', ['no-tests']),
+    ('0%{?with_tests} && "%{name}" == "foo"', ['tests']),
+    ('%{with tests}', ['tests']),
+    ('%{without docs}', ['tests']),
+    ('%{with docs}', ['no-tests']),
+    ('0%{?bootstrap} || (1 < 2)', ['tests']),
+    # Undefined macros may be defined at build time.
+    ('0%{?scl:1}', ['tests', 'no-tests']),
+    ('%{with other}', ['tests', 'no-tests']),
+    ('0%{?rhel} >= 7', ['tests', 'no-tests']),
+    # Unsupported
+    ('%{version} > 1', ['tests', 'no-tests']),
+])
+def test_conditionals(condition, expected):
+    spec = Spec(dedent('''\
+        %global with_tests 1
+        %bcond_with docs
+        %undefine bootstrap
+        Name: foo
+        Version: 1.0
+        %if {0}
+        BuildRequires: tests
+        %else
+        BuildRequires: no-tests
+        %endif
+        ''').format(condition))
+    assert spec.build_requires == expected
+
+
+def test_nested_conditionals():
+    spec = Spec(dedent('''\
+        %global enabled 1
+        Name: foo
+        %if 0
+        %if %{enabled}
+        BuildRequires: a
+        %endif
+        %global enabled 0
+        %elif %{enabled}
+        BuildRequires: b
+        %ifarch x86_64
+        BuildRequires: c
+        %else
+        BuildRequires: d
+        %endif
+        %else
+        BuildRequires: e
+        %endif
+        '''))
+    assert spec.build_requires == ['b', 'c', 'd']
+    assert spec.macros['enabled'] == '1'
+
+
+def test_tags_only_in_preamble():
+    spec = Spec(dedent('''\
+        Name: foo
+        BuildRequires: a
+        %description
+        Provides: fake-description
+        %package devel
+        Summary: Development files
+        Provides: foo-headers
+        %description devel
+        BuildRequires: fake-description-devel
+        %build
+        Name: fake
+        %changelog
+        * Mon Jan 01 2018 Someone - 1-1
+        - Provides: fake-changelog
+        Provides: fake-changelog
+        '''))
+
+    assert spec.name == 'foo'
+    assert spec.build_requires == ['a']
+    assert spec.capabilities == ['foo', 'foo-devel', 'foo-headers']
+
+
+def test_spec_cache(tmpdir):
+    spec_path = tmpdir.join('foo.spec')
+    spec_path.write('Name: foo\nBuildRequires: bar\n')
+    cache = SpecCache(str(tmpdir.join('cache')))
+
+    spec = Spec.from_file(str(spec_path), cache=cache)
+    assert spec.build_requires == ['bar']
+
+    with mock.patch('rpmlb.spec.Spec.__init__') as init:
+        cached = Spec.from_file(str(spec_path), cache=cache)
+    assert not init.called
+    assert cached.name == 'foo'
+    assert cached.build_requires == ['bar']
+
+    spec_path.write('Name: foo\nBuildRequires: baz\n')
+    assert Spec.from_file(str(spec_path), cache=cache).build_requires == \
+        ['baz']
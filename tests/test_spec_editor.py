@@ -0,0 +1,131 @@
+import itertools
+import random
+from typing import Match
+
+import pytest
+from helper import MACRO_REGEX
+
+from rpmlb.spec_editor import edit_lines
+
+
+def reference_replace(contents, macros):
+    """The whole-file replacement by MACRO_REGEX of the replaced macros."""
+
+    def replacement(match: Match) -> str:
+        macro_name = match.group('name')
+        if macro_name not in macros:
+            return match.group(0)
+        return '%global {} {}'.format(macro_name, macros[macro_name])
+
+    return MACRO_REGEX.sub(replacement, contents)
+
+
+def edit(contents, **kwargs):
+    lines = contents.splitlines(keepends=True)
+    return ''.join(edit_lines(lines, **kwargs))
+
+
+SPEC_LINES = [
+    '%global a value\n',
+    '%global   b   spaced   value  \n',
+    '%global\tc\ttabbed\n',
+    '%global d multi \\\n',
+    '    line \\\n',
+    '    value\n',
+    '%global e continued \\\n',
+    '\n',
+    'Name: %{a}\n',
+    'BuildRequires: foo \\\n',
+    '%global f after continuation\n',
+    '  %global g indented\n',
+    '%globalh not a definition\n',
+    '%if 0%{?scl:1}\n',
+    '%global scl_prefix %{scl}-\n',
+    '%endif\n',
+    '# %global i commented\n',
+    '%define j defined\n',
+    '\n',
+]
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_replace_matches_reference(seed):
+    randomizer = random.Random(seed)
+    lines = [randomizer.choice(SPEC_LINES) for _ in range(30)]
+    contents = ''.join(lines)
+    if seed % 2:
+        contents = contents.rstrip('\n')  # no newline at the end
+    macros = dict.fromkeys(
+        randomizer.sample('abcdefghi', 4) + ['scl_prefix'], 'REPLACED')
+
+    expected = reference_replace(contents, macros)
+    assert edit(contents, replaced_macros=macros) == expected
+
+
+def test_replace_all_matches_reference():
+    macros = dict.fromkeys('abcdef', 'NEW \\\n  VALUE')
+
+    for lines in itertools.permutations(SPEC_LINES[:8], 4):
+        contents = ''.join(lines)
+        expected = reference_replace(contents, macros)
+        assert edit(contents, replaced_macros=macros) == expected, contents
+
+
+@pytest.mark.parametrize('contents', [
+    '%global g h \\\n',
+    '%global g \\\n',
+    '%global g h \\\n  more \\\n',
+    'Name: g\n%global g h \\\n',
+    '%global g h \\\n\n',
+])
+@pytest.mark.parametrize('macros', [
+    {'g': 'NEW'},
+    {'g': 'NEW \\\n  VALUE'},
+    {'other': 'NEW'},
+])
+def test_escaped_newline_at_end_matches_reference(contents, macros):
+    expected = reference_replace(contents, macros)
+    assert edit(contents, replaced_macros=macros) == expected
+
+
+def test_replace_escaped_newline_at_end():
+    result = edit('%global g h \\\n', replaced_macros={'g': 'NEW'})
+
+    assert result == '%global g NEW'
+
+
+def test_other_definitions_are_kept():
+    contents = '%global   a   spaced  \n%define\tb\ttabbed\n%global c old\n'
+
+    result = edit(contents, replaced_macros={'c': 'new'})
+
+    assert result == contents.replace('%global c old', '%global c new')
+
+
+def test_replace_define():
+    contents = '%define a old \\\n  value\n%define b kept\n'
+
+    result = edit(contents, replaced_macros={'a': 'new'})
+
+    assert result == '%define a new\n%define b kept\n'
+
+
+def test_add_and_replace():
+    contents = '%global a old\nName: a\n'
+
+    result = edit(contents, replaced_macros={'a': 'new'},
+                  added_macros={'a': 'added', 'b': 1})
+
+    assert result == '%global a added\n%global b 1\n%global a new\nName: a\n'
+
+
+def test_edit_is_streaming():
+    def source():
+        yield '%global a old\n'
+        yield 'Name: a\n'
+        raise AssertionError('Read too far.')
+
+    result = edit_lines(source(), replaced_macros={'a': 'new'})
+
+    assert next(result) == '%global a new\n'
+    assert next(result) == 'Name: a\n'
@@ -0,0 +1,104 @@
+import json
+import threading
+
+import pytest
+
+from rpmlb import trace
+from rpmlb.builder.base import BaseBuilder
+from rpmlb.retry import RetryPolicy
+
+
+@pytest.fixture
+def tracing():
+    trace.enable()
+    try:
+        yield
+    finally:
+        trace.disable()
+
+
+def read_jsonl(path):
+    with open(str(path)) as trace_file:
+        return [json.loads(line) for line in trace_file]
+
+
+def test_span_not_recorded_when_disabled(tmpdir):
+    with trace.span('a', 'build'):
+        pass
+
+    trace.enable()
+    trace.disable()
+    path = tmpdir.join('trace.jsonl')
+    trace.write(str(path))
+
+    assert read_jsonl(path) == []
+
+
+def test_span_records_error(tmpdir, tracing):
+    with pytest.raises(ValueError):
+        with trace.span('a', 'build', num='01'):
+            raise ValueError('failed')
+    with trace.span('b', 'download'):
+        pass
+
+    path = tmpdir.join('trace.jsonl')
+    trace.write(str(path))
+
+    spans = read_jsonl(path)
+    assert [(span['name'], span['category']) for span in spans] == [
+        ('a', 'build'), ('b', 'download')]
+    assert spans[0]['args'] == {'num': '01', 'error': 'ValueError'}
+    assert spans[0]['start'] <= spans[1]['start']
+    assert all(span['duration'] >= 0 for span in spans)
+
+
+def test_write_chrome_trace_events(tmpdir, tracing):
+    with trace.span('main', 'build'):
+        pass
+    thread = threading.Thread(name='worker', target=_record_span)
+    thread.start()
+    thread.join()
+
+    path = tmpdir.join('trace.json')
+    trace.write(str(path))
+
+    events = json.loads(path.read())['traceEvents']
+    complete = [event for event in events if event['ph'] == 'X']
+    assert [event['name'] for event in complete] == ['main', 'other']
+    assert [event['tid'] for event in complete] == [1, 2]
+    thread_names = {event['tid']: event['args']['name']
+                    for event in events if event['ph'] == 'M'}
+    assert thread_names[2] == 'worker'
+
+
+def _record_span():
+    with trace.span('other', 'build'):
+        pass
+
+
+class RetriedBuilder(BaseBuilder):
+    retry_policy = RetryPolicy(delay=0)
+
+    def __init__(self):
+        super().__init__()
+        self.attempts = 0
+
+    def build(self, package_dict, package_dir, **kwargs):
+        self.attempts += 1
+        if self.attempts < 2:
+            raise RuntimeError('Connection timed out')
+
+
+def test_build_attempts_recorded(tmpdir, tracing):
+    builder = RetriedBuilder()
+
+    builder.build_package({'name': 'a'}, str(tmpdir))
+
+    path = tmpdir.join('trace.jsonl')
+    trace.write(str(path))
+    spans = read_jsonl(path)
+    attempts = [span for span in spans
+                if span['category'] == 'build attempt']
+    assert [span['args'].get('error') for span in attempts] == [
+        'RuntimeError', None]
+    assert [span['category'] for span in spans].count('build') == 1
@@ -1,3 +1,4 @@
+import hashlib
 import os
 import subprocess
 import sys
@@ -36,6 +37,13 @@ def test_run_cmd():
     assert result.stderr == b''
 
 
+def test_run_cmd_cwd():
+    original_dir = os.getcwd()
+    result = utils.run_cmd_with_capture('pwd', cwd='/tmp')
+    assert result.stdout == b'/tmp\n'
+    assert os.getcwd() == original_dir
+
+
 def test_run_cmd_exception():
     exception = False
     result_e = None
@@ -54,3 +62,88 @@ def test_run_cmd_exception():
     if sys.version_info >= (3, 5):
         assert result_e.stdout == b''
         assert b'No such file or directory' in result_e.stderr
+
+
+def test_run_cmd_argv_without_shell():
+    result = utils.run_cmd_with_capture(['echo', 'a  b', '*', '$HOME'])
+    assert result.stdout == b'a  b * $HOME\n'
+
+
+def test_run_cmd_argv_env():
+    result = utils.run_cmd_with_capture(['printenv', 'LC_ALL', 'PKG'],
+                                        env={'PKG': 'foo'})
+    assert result.stdout == b'C.utf-8\nfoo\n'
+    assert 'PKG' not in utils.command_env()
+
+
+def test_glob_paths(tmpdir):
+    for name in ('b.src.rpm', 'a.src.rpm', 'a.spec'):
+        tmpdir.join(name).write('')
+
+    assert utils.glob_paths('*.rpm', str(tmpdir)) == [
+        'a.src.rpm', 'b.src.rpm']
+    assert utils.glob_paths('*.tar.gz', str(tmpdir)) == ['*.tar.gz']
+
+
+def test_run_cmd_log_file(tmpdir):
+    log_file = tmpdir.join('build.log')
+    log_file.write('previous\n')
+
+    result = utils.run_cmd('seq 1 5; echo error >&2', log_file=str(log_file),
+                           tail_lines=2)
+
+    assert result.returncode == 0
+    assert result.stdout == b'5\nerror\n'
+    assert log_file.read() == (
+        'previous\n$ seq 1 5; echo error >&2\n1\n2\n3\n4\n5\nerror\n')
+
+
+def test_run_cmd_log_file_exception(tmpdir):
+    log_file = tmpdir.join('build.log')
+    cmd = 'seq 1 1000; exit 3'
+    try:
+        utils.run_cmd(cmd, log_file=str(log_file), tail_lines=3)
+    except subprocess.CalledProcessError as e:
+        result_e = e
+    else:
+        raise AssertionError('CalledProcessError is not raised')
+
+    assert result_e.returncode == 3
+    assert result_e.output == b'998\n999\n1000\n'
+    assert len(log_file.readlines()) == 1001
+
+
+def test_reflink_or_copy(tmpdir):
+    src = tmpdir.join('src')
+    src.write('content\n')
+    dst = tmpdir.join('dst')
+    dst.write('old\n')
+
+    # Either cloned or copied, depending on the file system.
+    utils.reflink_or_copy(str(src), str(dst))
+
+    assert dst.read() == 'content\n'
+    assert not os.path.samefile(str(src), str(dst))
+
+
+def test_hash_file(tmpdir):
+    path = tmpdir.join('file')
+    path.write_binary(b'x' * (utils.HASH_BLOCK_SIZE + 1))
+
+    digest = utils.hash_file(str(path))
+
+    assert digest.hexdigest() == hashlib.sha256(
+        b'x' * (utils.HASH_BLOCK_SIZE + 1)).hexdigest()
+
+
+def test_package_files(tmpdir):
+    tmpdir.join('a.spec').write('Name: a\n')
+    tmpdir.join('fix.patch').write('patch\n')
+    tmpdir.join('sources').write('SHA512 (a.tar.gz) = 1234\n')
+    tmpdir.join('a.tar.gz').write('source')
+    tmpdir.join('a-1-1.src.rpm').write('srpm')
+    tmpdir.join('results', 'build.log').write('log', ensure=True)
+    tmpdir.join('.stamp').write('stamp')
+
+    assert utils.package_files(str(tmpdir)) == [
+        'a.spec', 'fix.patch', 'sources']
@@ -77,14 +77,41 @@ def test_each_num_dir():
         work = Work(mock_recipe)
         assert work
 
-        for package_dict, num_name in work.each_num_dir():
+        current_dir = os.getcwd()
+        for package_dict, num_name, num_dir in work.each_num_dir():
             assert package_dict
             assert num_name
             assert re.match('^[12]$', num_name)
-            assert re.match('^.+/[12]$', os.getcwd())
+            assert num_dir == os.path.join(work.working_dir, num_name)
+            assert os.getcwd() == current_dir
 
         with helper.pushd(work.working_dir):
             assert os.path.isdir('1')
             assert os.path.isdir('2')
     finally:
         work.close()
+
+
+def test_each_package_dir():
+    work = None
+
+    try:
+        mock_recipe = mock.MagicMock()
+        type(mock_recipe).num_of_package = mock.PropertyMock(return_value=2)
+        package_dicts = [
+            {'name': 'a'},
+            {'name': 'b'},
+        ]
+        mock_recipe.each_normalized_package.return_value = iter(package_dicts)
+
+        work = Work(mock_recipe)
+
+        package_dirs = [
+            package_dir for _, _, package_dir in work.each_package_dir()
+        ]
+        assert package_dirs == [
+            os.path.join(work.working_dir, '1', 'a'),
+            os.path.join(work.working_dir, '2', 'b'),
+        ]
+    finally:
+        work.close()
@@ -0,0 +1,60 @@
+from textwrap import dedent
+
+import pytest
+
+from rpmlb.yaml import Yaml, _EventLoader
+
+
+@pytest.fixture
+def yaml_file(tmpdir):
+    path = tmpdir.join('recipe.yml')
+    path.write(dedent('''\
+        base: &base
+          name: base
+          packages: [a]
+        1:
+          name: number
+        c:
+          name: c
+          packages: [&b b, *b, {d: {macros: {m: 1}}}]
+        e:
+          <<: *base
+          name: e
+        '''))
+    return str(path)
+
+
+@pytest.mark.parametrize('key', ['base', 'c', 'e'])
+def test_key(yaml_file, key):
+    """Same as loading the whole file."""
+
+    expected = Yaml(yaml_file).content[key]
+    assert Yaml(yaml_file, key=key).content == {key: expected}
+
+
+def test_key_not_found(yaml_file):
+    assert Yaml(yaml_file, key='f').content == {}
+    # Not a string
+    assert Yaml(yaml_file, key='1').content == {}
+
+
+def test_key_skips_other_values(yaml_file, monkeypatch):
+    constructed = []
+    original = _EventLoader.construct_document
+
+    def construct_document(self, node):
+        constructed.append(node)
+        return original(self, node)
+    monkeypatch.setattr('rpmlb.yaml._EventLoader.construct_document',
+                        construct_document)
+
+    assert Yaml(yaml_file, key='c').content['c']['name'] == 'c'
+    assert len(constructed) == 1
+    assert [key.value for key, _ in constructed[0].value] == \
+        ['name', 'packages']
+
+
+def test_key_not_mapping(tmpdir):
+    path = tmpdir.join('list.yml')
+    path.write('- a\n')
+    assert Yaml(str(path), key='a').content == {}